@@ -0,0 +1,226 @@
+"""
+End-to-end throughput benchmark for send_digest.main(), fully offline.
+
+Starts the fake Apps Script, the fake weather/news/quote/Gemini APIs and
+the SMTP sink, loads a synthetic subscriber list, then runs send_digest
+in a fresh interpreter and scratch directory per size.
+
+    python bench/digest_bench.py --sizes 1k,10k,100k
+    python bench/digest_bench.py --sizes 10k --all-due --concurrent --latency 0.05 --error-rate 0.02
+    python bench/digest_bench.py --sizes 10k --json results.json   # append for later comparison
+
+By default only subscribers whose local time is 7 AM right now are due,
+as in production; --all-due runs send_digest with --test so everyone is.
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_apps_script import FakeAppsScript, make_subscriber
+from fake_services import FakeServices
+from locations import LocationIndex
+from smtp_sink import SMTPSink
+
+CHILD = """
+import json, resource, sys, time
+sys.argv = ["send_digest.py"] + {flags!r}
+start = time.perf_counter()
+import send_digest
+totals = send_digest.main() or {{}}
+print("BENCH " + json.dumps({{
+    "elapsed_s": time.perf_counter() - start,
+    "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "totals": totals,
+    "gemini_calls": send_digest.gemini_calls
+}}))
+"""
+
+# Limits high enough that the benchmark measures the code, not the limiter
+UNLIMITED = {
+    f"RATE_LIMIT_{provider}": "100000/100000"
+    for provider in ("SMTP", "NEWSAPI", "OPEN_METEO", "ZENQUOTES", "GEMINI")
+}
+
+
+def parse_size(text):
+    text = text.strip().lower()
+    if text.endswith("k"):
+        return int(float(text[:-1]) * 1000)
+    return int(text)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def check_digest_keys(rows, workdir):
+    """
+    Canonicalise the synthetic rows the way send_digest does. Raises if
+    that yields more digest keys than there are raw location strings,
+    i.e. if one city is being split over several digests.
+    """
+    index = LocationIndex(path=os.path.join(workdir, "bench_location_index.json"))
+    raw = {row[4] for row in rows}
+    keys = {index.canonical(row[4], row[2], row[3]) for row in rows}
+    if len(keys) > len(raw):
+        raise RuntimeError(f"{len(raw)} location strings became {len(keys)} digest keys")
+    return len(raw), len(keys)
+
+
+def run_size(size, args):
+    rng = random.Random(args.seed)
+    rows = [make_subscriber(row_id, rng) for row_id in range(2, size + 2)]
+
+    apps_script = FakeAppsScript(rows=rows).start()
+    services = FakeServices(latency=args.latency, error_rate=args.error_rate, seed=args.seed).start()
+    sink = SMTPSink(latency=args.smtp_latency, fail_rate=args.smtp_fail_rate).start()
+    workdir = tempfile.mkdtemp(prefix="smartbrief-bench-")
+    locations, digest_keys = check_digest_keys(rows, workdir)
+
+    env = dict(os.environ)
+    env.update(services.env())
+    if not args.keep_limits:
+        env.update(UNLIMITED)
+    env.update({
+        "PYTHONPATH": ROOT,
+        "APPS_SCRIPT_URL": apps_script.url,
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": str(sink.port),
+        "SMTP_USE_SSL": "0",
+        "SENDER_EMAIL": "bench@example.com",
+        "SENDER_PASSWORD": "bench",
+        "GEMINI_API_KEY": "bench",
+        "NEWS_API_KEY": "bench",
+        # The fake Apps Script understands mark_sent
+        "LEDGER_WRITE_BACK": "1",
+    })
+
+    flags = []
+    if args.all_due:
+        flags.append("--test")
+    for flag in ("concurrent", "tldr_cache", "structured"):
+        if getattr(args, flag):
+            flags.append("--" + flag.replace("_", "-"))
+
+    try:
+        start = time.perf_counter()
+        child = subprocess.run(
+            [sys.executable, "-c", CHILD.format(flags=flags)],
+            cwd=workdir, env=env, capture_output=True, text=True
+        )
+        wall = time.perf_counter() - start
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        for server in (apps_script, services):
+            server.shutdown()
+
+    if args.verbose:
+        print(child.stdout)
+    stats = next(
+        (json.loads(line[6:]) for line in child.stdout.splitlines() if line.startswith("BENCH ")),
+        None
+    )
+    if child.returncode != 0 or stats is None:
+        tail = (child.stderr or child.stdout).strip().splitlines()[-5:]
+        raise RuntimeError(f"send_digest failed for {size} subscribers:\n" + "\n".join(tail))
+
+    totals = stats["totals"]
+    served = totals.get("sent", 0) + totals.get("failed", 0)
+    calls = dict(services.calls)
+    calls["apps_script"] = apps_script.sheet.requests
+    calls["smtp"] = sink.received
+    return {
+        "subscribers": size,
+        "due": served,
+        "sent": totals.get("sent", 0),
+        "failed": totals.get("failed", 0),
+        "elapsed_s": round(stats["elapsed_s"], 3),
+        "wall_s": round(wall, 3),
+        "sends_per_s": round(totals.get("sent", 0) / stats["elapsed_s"], 1) if stats["elapsed_s"] else 0.0,
+        "api_calls": calls,
+        "api_errors": dict(services.errors),
+        "calls_per_subscriber": {
+            name: round(count / served, 3) if served else 0.0
+            for name, count in calls.items()
+        },
+        "gemini_calls": stats["gemini_calls"],
+        "locations": locations,
+        "digest_keys": digest_keys,
+        "peak_rss_mb": round(stats["peak_rss_kb"] / 1024, 1),
+    }
+
+
+def print_result(result):
+    print(f"\n📊 {result['subscribers']:,} subscribers ({result['due']:,} due)")
+    print(f"   ✅ Sent: {result['sent']:,}   ❌ Failed: {result['failed']:,}")
+    print(f"   ⏱️  {result['elapsed_s']}s in send_digest → {result['sends_per_s']} sends/s")
+    print(f"   🧠 Peak RSS: {result['peak_rss_mb']} MB")
+    print(f"   📍 {result['locations']} location string(s) -> {result['digest_keys']} digest key(s)")
+    per_sub = ", ".join(
+        f"{name} {value}" for name, value in result["calls_per_subscriber"].items() if value
+    )
+    print(f"   🌐 Calls per due subscriber: {per_sub or 'none'}")
+    errors = {name: count for name, count in result["api_errors"].items() if count}
+    if errors:
+        print(f"   ⚠️  Injected errors: {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline send_digest benchmark")
+    parser.add_argument("--sizes", default="1k", help="comma separated, e.g. 1k,10k,100k")
+    parser.add_argument("--all-due", action="store_true", help="send to everyone (runs with --test)")
+    parser.add_argument("--concurrent", action="store_true")
+    parser.add_argument("--tldr-cache", action="store_true")
+    parser.add_argument("--structured", action="store_true")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to each API call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of API calls answered 429")
+    parser.add_argument("--smtp-latency", type=float, default=0.0)
+    parser.add_argument("--smtp-fail-rate", type=float, default=0.0)
+    parser.add_argument("--keep-limits", action="store_true", help="use the real RATE_LIMIT_* settings")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="append results to this file")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    results = []
+    for size in (parse_size(part) for part in args.sizes.split(",")):
+        print(f"🏁 Running {size:,} subscribers...")
+        result = run_size(size, args)
+        print_result(result)
+        results.append(result)
+
+    if args.json:
+        try:
+            with open(args.json, 'r') as f:
+                history = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            history = []
+        history.append({
+            "revision": git_revision(),
+            "run_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "options": {key: value for key, value in vars(args).items() if key not in ("json", "verbose")},
+            "results": results,
+        })
+        with open(args.json, 'w') as f:
+            json.dump(history, f, indent=2)
+        print(f"\n💾 Appended to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
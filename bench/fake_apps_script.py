@@ -0,0 +1,214 @@
+"""
+Local stand-in for the Apps Script subscriber endpoint.
+
+Serves the same JSON as the deployed doGet() and also understands the
+incremental protocol used by read_sheets.sync_subscribers():
+
+    GET /              -> {"success": true, "revision": R, "subscribers": [...]}
+    GET /?since=R0     -> {"success": true, "revision": R, "changes": [...]}
+    If-None-Match: R   -> 304 when nothing changed
+    POST {"action": "mark_sent", "updates": [...]}
+                       -> last_sent written back (see read_sheets.mark_sent_in_sheets)
+
+    python bench/fake_apps_script.py --port 8765 --subscribers 1000
+    APPS_SCRIPT_URL=http://127.0.0.1:8765/ python read_sheets.py
+"""
+import argparse
+import json
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# (location, latitude, longitude, relative weight) spread over every
+# major UTC offset, weighted roughly by where English-language readers live
+CITIES = [
+    ("Honolulu, United States", 21.31, -157.86, 1),
+    ("Anchorage, United States", 61.22, -149.90, 1),
+    ("Los Angeles, United States", 34.05, -118.24, 6),
+    ("Vancouver, Canada", 49.28, -123.12, 2),
+    ("Denver, United States", 39.74, -104.99, 2),
+    ("Mexico City, Mexico", 19.43, -99.13, 2),
+    ("Dallas, United States", 32.78, -96.80, 4),
+    ("Chicago, United States", 41.88, -87.63, 4),
+    ("New York, United States", 40.71, -74.01, 8),
+    ("Toronto, Canada", 43.65, -79.38, 3),
+    ("Bogotá, Colombia", 4.71, -74.07, 1),
+    ("Santiago, Chile", -33.45, -70.67, 1),
+    ("São Paulo, Brazil", -23.55, -46.63, 2),
+    ("Buenos Aires, Argentina", -34.60, -58.38, 1),
+    ("Reykjavik, Iceland", 64.15, -21.94, 1),
+    ("London, United Kingdom", 51.51, -0.13, 6),
+    ("Lisbon, Portugal", 38.72, -9.14, 1),
+    ("Lagos, Nigeria", 6.52, 3.38, 3),
+    ("Paris, France", 48.86, 2.35, 2),
+    ("Berlin, Germany", 52.52, 13.40, 2),
+    ("Rome, Italy", 41.90, 12.50, 1),
+    ("Cairo, Egypt", 30.04, 31.24, 1),
+    ("Johannesburg, South Africa", -26.20, 28.05, 2),
+    ("Nairobi, Kenya", -1.29, 36.82, 2),
+    ("Istanbul, Turkey", 41.01, 28.98, 1),
+    ("Moscow, Russia", 55.76, 37.62, 1),
+    ("Dubai, United Arab Emirates", 25.20, 55.27, 2),
+    ("Tehran, Iran", 35.69, 51.39, 1),
+    ("Karachi, Pakistan", 24.86, 67.01, 2),
+    ("Mumbai, India", 19.08, 72.88, 6),
+    ("Bengaluru, India", 12.97, 77.59, 6),
+    ("Delhi, India", 28.70, 77.10, 5),
+    ("Kathmandu, Nepal", 27.72, 85.32, 1),
+    ("Dhaka, Bangladesh", 23.81, 90.41, 1),
+    ("Bangkok, Thailand", 13.76, 100.50, 1),
+    ("Singapore, Singapore", 1.35, 103.82, 2),
+    ("Jakarta, Indonesia", -6.21, 106.85, 1),
+    ("Manila, Philippines", 14.60, 120.98, 2),
+    ("Hong Kong, China", 22.32, 114.17, 1),
+    ("Perth, Australia", -31.95, 115.86, 1),
+    ("Seoul, South Korea", 37.57, 126.98, 1),
+    ("Tokyo, Japan", 35.68, 139.69, 2),
+    ("Adelaide, Australia", -34.93, 138.60, 1),
+    ("Sydney, Australia", -33.87, 151.21, 3),
+    ("Auckland, New Zealand", -36.85, 174.76, 1),
+]
+CITY_WEIGHTS = [city[3] for city in CITIES]
+
+
+def make_subscriber(row_id, rng=random):
+    location, lat, lon, _ = rng.choices(CITIES, weights=CITY_WEIGHTS)[0]
+    return [
+        row_id,
+        f"user{row_id}@example.com",
+        round(lat + rng.uniform(-0.05, 0.05), 5),
+        round(lon + rng.uniform(-0.05, 0.05), 5),
+        location,
+        "2026-01-01T00:00:00Z",
+        ""
+    ]
+
+
+class SubscriberSheet:
+    """In-memory sheet with a change log keyed by revision"""
+
+    def __init__(self, rows=()):
+        self.lock = threading.Lock()
+        self.rows = {row[0]: row for row in rows}
+        self.revision = 1
+        self.log = []  # (revision, change)
+        self.requests = 0
+        self.write_backs = 0
+
+    def subscribe(self, row):
+        with self.lock:
+            self.revision += 1
+            self.rows[row[0]] = row
+            self.log.append((self.revision, {"op": "upsert", "row": row}))
+
+    def unsubscribe(self, row_id):
+        with self.lock:
+            self.revision += 1
+            self.rows.pop(row_id, None)
+            self.log.append((self.revision, {"op": "delete", "row_id": row_id}))
+
+    def mark_sent(self, updates):
+        with self.lock:
+            self.write_backs += 1
+            for update in updates:
+                row = self.rows.get(update["row_id"])
+                if row is None:
+                    continue
+                row = list(row)
+                row[6] = update["last_sent"]
+                self.revision += 1
+                self.rows[row[0]] = row
+                self.log.append((self.revision, {"op": "upsert", "row": row}))
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "success": True,
+                "revision": self.revision,
+                "subscribers": list(self.rows.values())
+            }
+
+    def changes_since(self, since):
+        with self.lock:
+            return {
+                "success": True,
+                "revision": self.revision,
+                "changes": [change for rev, change in self.log if rev > since]
+            }
+
+
+class FakeAppsScriptHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", f'"{self.server.sheet.revision}"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        sheet = self.server.sheet
+        sheet.requests += 1
+        query = parse_qs(urlparse(self.path).query)
+
+        if self.headers.get("If-None-Match") == f'"{sheet.revision}"':
+            self.send_response(304)
+            self.end_headers()
+            return
+
+        since = query.get("since", [None])[0]
+        if since and since.isdigit():
+            self.send_json(sheet.changes_since(int(since)))
+        else:
+            self.send_json(sheet.snapshot())
+
+
+    def do_POST(self):
+        sheet = self.server.sheet
+        sheet.requests += 1
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+
+        if payload.get("action") != "mark_sent":
+            self.send_json({"success": False, "message": "unknown action"}, status=400)
+            return
+        sheet.mark_sent(payload.get("updates", []))
+        self.send_json({"success": True, "updated": len(payload.get("updates", []))})
+
+
+class FakeAppsScript(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, rows=()):
+        super().__init__((host, port), FakeAppsScriptHandler)
+        self.sheet = SubscriberSheet(rows)
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/"
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Apps Script endpoint")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--subscribers", type=int, default=100)
+    args = parser.parse_args()
+
+    rows = [make_subscriber(i) for i in range(2, args.subscribers + 2)]
+    server = FakeAppsScript(args.host, args.port, rows)
+    print(f"📋 Fake Apps Script serving {len(rows)} subscribers at {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 Served {server.sheet.requests} requests ({server.sheet.write_backs} write-backs)")
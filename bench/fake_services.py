@@ -0,0 +1,214 @@
+"""
+Local stand-ins for the HTTP APIs send_digest.py talks to, on one port:
+
+    GET  /v1/forecast                     Open-Meteo (single or multi-coordinate)
+    GET  /v2/everything, /v2/top-headlines NewsAPI
+    GET  /api/today                        ZenQuotes
+    POST /v1beta/models/<m>:generateContent Gemini (REST transport)
+
+Point send_digest.py at it with:
+
+    OPEN_METEO_URL=http://127.0.0.1:8766/v1/forecast
+    NEWS_API_URL=http://127.0.0.1:8766/v2
+    ZENQUOTES_URL=http://127.0.0.1:8766/api/today
+    GEMINI_API_ENDPOINT=http://127.0.0.1:8766
+
+    python bench/fake_services.py --port 8766 --latency 0.05 --error-rate 0.02
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+SERVICES = ("open_meteo", "newsapi", "zenquotes", "gemini")
+
+
+def forecast(lat, lon):
+    base = 25 - abs(float(lat)) * 0.4
+    return {
+        "latitude": float(lat),
+        "longitude": float(lon),
+        "current_weather": {"temperature": round(base, 1)},
+        "daily": {
+            "temperature_2m_max": [round(base + 4, 1)],
+            "temperature_2m_min": [round(base - 5, 1)],
+            "apparent_temperature_max": [round(base + 3, 1)],
+            "apparent_temperature_min": [round(base - 6, 1)],
+            "sunrise": ["2026-01-01T06:40"],
+            "sunset": ["2026-01-01T18:10"],
+            "precipitation_sum": [0.0],
+            "uv_index_max": [5.0],
+            "cloudcover_mean": [40]
+        }
+    }
+
+
+def articles(query, count):
+    return [
+        {
+            "title": f"{query} story {i}",
+            "description": f"What happened with {query} today, item {i}.",
+            "url": f"https://news.example.com/{re.sub(r'[^a-z0-9]+', '-', query.lower())}/{i}"
+        }
+        for i in range(count)
+    ]
+
+
+def gemini_text(prompt):
+    """Answer in whatever shape the prompt asks for"""
+    ids = re.findall(r"\[([aw]:[0-9a-f]+)\]", prompt)
+    if ids:
+        return json.dumps({key: f"Summary for {key}." for key in ids})
+    expected = re.search(r"exactly (\d+) objects", prompt)
+    if expected:
+        return json.dumps({
+            "weather": "A mild day; a light jacket will do.",
+            "articles": [
+                {"headline": f"Headline {i}", "tldr": f"Short summary {i}."}
+                for i in range(int(expected.group(1)))
+            ]
+        })
+    return "<h2>Good morning</h2><p>Your synthetic SmartBrief.</p>"
+
+
+class FakeServicesHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def service(self, path):
+        if path.startswith("/v1/forecast"):
+            return "open_meteo"
+        if path.startswith("/v2/"):
+            return "newsapi"
+        if path.startswith("/api/today"):
+            return "zenquotes"
+        if ":generateContent" in path:
+            return "gemini"
+        return None
+
+    def begin(self):
+        """Count the call, apply latency and maybe fail; True if handled"""
+        server = self.server
+        name = self.service(urlparse(self.path).path)
+        if name is None:
+            self.send_json({"error": "not found"}, status=404)
+            return None
+        server.record(name)
+        if server.latency:
+            time.sleep(server.latency)
+        if server.error_rate and server.rng.random() < server.error_rate:
+            server.record(name, "errors")
+            self.send_json({"status": "error", "code": "rateLimited"}, status=429,
+                           headers={"Retry-After": "0"})
+            return None
+        return name
+
+    def do_GET(self):
+        name = self.begin()
+        if name is None:
+            return
+        query = parse_qs(urlparse(self.path).query)
+
+        if name == "open_meteo":
+            lats = query.get("latitude", ["0"])[0].split(",")
+            lons = query.get("longitude", ["0"])[0].split(",")
+            results = [forecast(lat, lon) for lat, lon in zip(lats, lons)]
+            self.send_json(results if len(results) > 1 else results[0])
+        elif name == "newsapi":
+            topic = query.get("q", query.get("country", query.get("category", ["world"])))[0]
+            size = int(query.get("pageSize", ["5"])[0])
+            self.send_json({"status": "ok", "totalResults": size, "articles": articles(topic, size)})
+        else:
+            self.send_json([{"q": "Well begun is half done.", "a": "Aristotle"}])
+
+    def do_POST(self):
+        name = self.begin()
+        if name is None:
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        prompt = "".join(
+            part.get("text", "")
+            for content in request.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        text = gemini_text(prompt)
+        self.send_json({
+            "candidates": [{
+                "content": {"parts": [{"text": text}], "role": "model"},
+                "finishReason": "STOP",
+                "index": 0
+            }],
+            "usageMetadata": {
+                "promptTokenCount": len(prompt) // 4,
+                "candidatesTokenCount": len(text) // 4,
+                "totalTokenCount": (len(prompt) + len(text)) // 4
+            }
+        })
+
+
+class FakeServices(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, error_rate=0.0, seed=1):
+        super().__init__((host, port), FakeServicesHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = {name: 0 for name in SERVICES}
+        self.errors = {name: 0 for name in SERVICES}
+
+    def record(self, name, kind="calls"):
+        with self.lock:
+            getattr(self, kind)[name] += 1
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def env(self):
+        """Environment variables that point send_digest.py at this server"""
+        return {
+            "OPEN_METEO_URL": f"{self.url}/v1/forecast",
+            "NEWS_API_URL": f"{self.url}/v2",
+            "ZENQUOTES_URL": f"{self.url}/api/today",
+            "GEMINI_API_ENDPOINT": self.url,
+        }
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake weather/news/quote/Gemini APIs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = FakeServices(args.host, args.port, args.latency, args.error_rate)
+    print(f"🧪 Fake services at {server.url}")
+    for key, value in server.env().items():
+        print(f"   {key}={value}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 Calls: {server.calls}  Errors: {server.errors}")
@@ -0,0 +1,58 @@
+"""
+Load-test SMTPPool against the local SMTP sink.
+
+    python bench/smtp_load.py --messages 500 --pool-size 4 --threads 8 --drop-after 40
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from smtp_pool import SMTPPool
+from smtp_sink import SMTPSink
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SMTPPool load test")
+    parser.add_argument("--messages", type=int, default=500)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--max-per-connection", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.005)
+    parser.add_argument("--drop-after", type=int, default=0)
+    args = parser.parse_args()
+
+    sink = SMTPSink(latency=args.latency, drop_after=args.drop_after).start()
+    pool = SMTPPool(
+        "127.0.0.1", sink.port,
+        username="bench@example.com", password="x",
+        use_ssl=False,
+        size=args.pool_size,
+        max_per_connection=args.max_per_connection
+    )
+
+    body = "Subject: SmartBrief load test\r\n\r\n" + ("x" * 20000)
+
+    def send_one(i):
+        pool.send("bench@example.com", f"user{i}@example.com", body)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as ex:
+        list(ex.map(send_one, range(args.messages)))
+    elapsed = time.perf_counter() - start
+    pool.close()
+
+    stats = pool.latency_stats()
+    print(f"📤 {args.messages} messages in {elapsed:.2f}s ({args.messages / elapsed:.1f} msg/s)")
+    print(f"   Sink received: {sink.received}")
+    print(f"   Latency: avg {stats['avg_ms']}ms, p50 {stats['p50_ms']}ms, "
+          f"p95 {stats['p95_ms']}ms, max {stats['max_ms']}ms")
+    print(f"   Connections: {stats['connects']} (reconnects: {stats['reconnects']})")
+    sink.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Local SMTP stand-in that accepts and discards mail.
+
+    python bench/smtp_sink.py --port 2525 --latency 0.02 --drop-after 50
+
+--latency     seconds to wait before answering each DATA
+--drop-after  close the connection after this many messages (simulates
+              Gmail dropping long-lived sessions)
+--fail-rate   fraction of messages answered with "421" instead of 250
+"""
+import argparse
+import random
+import socketserver
+import threading
+import time
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write((line + "\r\n").encode())
+
+    def handle(self):
+        server = self.server
+        sent_here = 0
+        self.reply("220 smartbrief-sink ESMTP")
+
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line.decode(errors="replace").strip().upper()
+
+            if cmd.startswith(("EHLO", "HELO")):
+                self.wfile.write(b"250-smartbrief-sink\r\n250-AUTH PLAIN LOGIN\r\n250 OK\r\n")
+            elif cmd.startswith("AUTH"):
+                self.reply("235 Authentication successful")
+            elif cmd.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self.reply("250 OK")
+            elif cmd == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                while True:
+                    chunk = self.rfile.readline()
+                    if not chunk or chunk == b".\r\n":
+                        break
+                    size += len(chunk)
+
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if server.fail_rate and random.random() < server.fail_rate:
+                    self.reply("421 Service not available, closing channel")
+                    return
+
+                with server.lock:
+                    server.received += 1
+                    server.bytes_received += size
+                sent_here += 1
+                self.reply("250 OK queued")
+
+                if server.drop_after and sent_here >= server.drop_after:
+                    return
+            elif cmd == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, drop_after=0, fail_rate=0.0):
+        super().__init__((host, port), SMTPSinkHandler)
+        self.latency = latency
+        self.drop_after = drop_after
+        self.fail_rate = fail_rate
+        self.lock = threading.Lock()
+        self.received = 0
+        self.bytes_received = 0
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start(self):
+        """Serve from a background thread (for use inside other scripts)"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local SMTP sink")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--drop-after", type=int, default=0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.host, args.port, args.latency, args.drop_after, args.fail_rate)
+    print(f"📭 SMTP sink listening on {args.host}:{sink.port}")
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n📊 Received {sink.received} messages ({sink.bytes_received} bytes)")
@@ -0,0 +1,107 @@
+"""
+Measure send_digest start-up cost: the bare import, and a full hourly run
+in which nobody is at 7 AM (the common case for the scheduled workflow).
+
+Each run is a fresh interpreter in a scratch directory, reading
+subscribers from the local fake Apps Script endpoint.
+
+    python bench/startup_time.py --runs 5 --subscribers 2000
+    python bench/startup_time.py --importtime     # slowest imports
+"""
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import pytz
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from fake_apps_script import FakeAppsScript, make_subscriber
+
+RUN_MAIN = "import send_digest; send_digest.main()"
+
+
+def not_due_rows(count):
+    """Synthetic subscribers, dropping any that are at 7 AM right now"""
+    from timezonefinder import TimezoneFinder
+    tf = TimezoneFinder()
+    now_utc = datetime.now(pytz.utc)
+    rows = []
+    row_id = 2
+    while len(rows) < count:
+        row = make_subscriber(row_id)
+        row_id += 1
+        tz = pytz.timezone(tf.timezone_at(lat=row[2], lng=row[3]))
+        if now_utc.astimezone(tz).hour != 7:
+            rows.append(row)
+    return rows
+
+
+def timed(code, workdir, env):
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=workdir, env=env, capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return elapsed
+
+
+def importtime(env, top=10):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import send_digest"],
+        cwd=ROOT, env=env, capture_output=True, text=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    rows.sort(reverse=True)
+    print(f"\n📦 Slowest imports (cumulative)")
+    for cumulative_us, name in rows[:top]:
+        print(f"   {cumulative_us / 1000:8.1f} ms  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="send_digest start-up benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--importtime", action="store_true")
+    args = parser.parse_args()
+
+    server = FakeAppsScript(rows=not_due_rows(args.subscribers)).start()
+    env = dict(os.environ, PYTHONPATH=ROOT, APPS_SCRIPT_URL=server.url)
+    workdir = tempfile.mkdtemp(prefix="smartbrief-startup-")
+
+    try:
+        imports = [timed("import send_digest", workdir, env) for _ in range(args.runs)]
+
+        # First run has no timezone index or subscriber snapshot yet
+        cold = timed(RUN_MAIN, workdir, env)
+        warm = [timed(RUN_MAIN, workdir, env) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+        server.shutdown()
+
+    print(f"\n⏱️  send_digest start-up ({args.runs} runs, {args.subscribers} subscribers, nobody due)")
+    print(f"   import:           median {statistics.median(imports) * 1000:7.0f} ms")
+    print(f"   no-op run (cold): {cold * 1000:14.0f} ms")
+    print(f"   no-op run (warm): median {statistics.median(warm) * 1000:7.0f} ms")
+
+    if args.importtime:
+        importtime(env)
+
+
+if __name__ == "__main__":
+    main()
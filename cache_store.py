@@ -0,0 +1,470 @@
+import json
+import os
+import re
+import sqlite3
+import threading
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta, timezone
+
+from fragments import FRAGMENT_FILE, FragmentStore, entry_refs, pack_entry, unpack_entry
+
+CACHE_DIR = "digest_cache"
+LEGACY_CACHE_FILE = "digest_cache.json"
+CACHE_RETENTION_DAYS = int(os.environ.get("CACHE_RETENTION_DAYS", "7"))
+
+# The legacy JSON cache is read in blocks of this many bytes
+LEGACY_CHUNK_BYTES = 1 << 16
+
+# Tokens for walking the legacy JSON object by hand. UTF-8 continuation
+# bytes never look like ASCII, so scanning bytes is safe.
+_JSON_SPACE = re.compile(rb"\s*")
+_JSON_SEPARATOR = re.compile(rb"[\s,]*")
+_JSON_STRING_END = re.compile(rb'[^"\\]*(?:\\.[^"\\]*)*"')
+_JSON_STRUCTURE = re.compile(rb'["{}\[\]]')
+_JSON_SCALAR = re.compile(rb"[^\s,}\]]*")
+# Day shards are named by date; the fragment store shares the directory
+_SHARD_NAME = re.compile(r"^\d{4}-\d{2}-\d{2}\.db$")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS locations (
+    location TEXT PRIMARY KEY,
+    entry TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+
+class CacheStore(MutableMapping):
+    """
+    Day-sharded digest cache: one small SQLite file per date.
+
+    Behaves like the old `{date: {"quote": ..., "locations": {...}}}` dict,
+    but every read and write touches a single row, so saving one location
+    no longer rewrites the whole cache. Shards older than `retention_days`
+    are deleted when the store is opened.
+
+    Digest HTML and news articles live in a FragmentStore shared by all
+    days (`fragments.db`); rows keep only the hashes, so text repeated
+    across locations and days is stored once.
+    """
+
+    def __init__(self, directory=CACHE_DIR, retention_days=CACHE_RETENTION_DAYS):
+        self.directory = directory
+        self.retention_days = retention_days
+        self._shards = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        self.fragments = FragmentStore(os.path.join(directory, FRAGMENT_FILE))
+
+    # ------------------
+    # SHARDS
+    # ------------------
+    def shard_path(self, date):
+        return os.path.join(self.directory, f"{date}.db")
+
+    def _open(self, date, create=False):
+        shard = self._shards.get(date)
+        if shard is not None:
+            return shard
+
+        path = self.shard_path(date)
+        if not create and not os.path.exists(path):
+            return None
+
+        conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        shard = DayShard(conn, self._lock, self.fragments)
+        self._shards[date] = shard
+        return shard
+
+    def dates(self):
+        return sorted(
+            name[:-3] for name in os.listdir(self.directory)
+            if _SHARD_NAME.match(name)
+        )
+
+    def evict(self, today=None):
+        """Delete shards older than the retention window"""
+        if self.retention_days <= 0:
+            return []
+        today = today or datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        cutoff = (
+            datetime.strptime(today, "%Y-%m-%d") - timedelta(days=self.retention_days)
+        ).strftime("%Y-%m-%d")
+
+        evicted = []
+        for date in self.dates():
+            if date >= cutoff:
+                continue
+            shard = self._shards.pop(date, None)
+            if shard is not None:
+                shard.close()
+            for suffix in ("", "-wal", "-shm"):
+                try:
+                    os.remove(self.shard_path(date) + suffix)
+                except FileNotFoundError:
+                    pass
+            evicted.append(date)
+        if evicted:
+            self.sweep_fragments()
+        return evicted
+
+    def sweep_fragments(self):
+        """Drop fragments no remaining day refers to; returns how many went"""
+        live = set()
+        for date in self.dates():
+            for (entry,) in self._open(date).conn.execute(
+                "SELECT entry FROM locations WHERE SUBSTR(entry, 1, 1) = '{'"
+            ):
+                live.update(entry_refs(json.loads(entry)))
+        return self.fragments.sweep(live)
+
+    def close(self):
+        for shard in self._shards.values():
+            shard.close()
+        self._shards = {}
+        self.fragments.close()
+
+    # ------------------
+    # MAPPING
+    # ------------------
+    def __getitem__(self, date):
+        shard = self._open(date)
+        if shard is None:
+            raise KeyError(date)
+        return shard
+
+    def __setitem__(self, date, day):
+        shard = self._open(date, create=True)
+        shard["quote"] = day.get("quote")
+        shard["locations"] = day.get("locations", {})
+
+    def __delitem__(self, date):
+        if date not in self:
+            raise KeyError(date)
+        shard = self._shards.pop(date, None)
+        if shard is not None:
+            shard.close()
+        os.remove(self.shard_path(date))
+
+    def __contains__(self, date):
+        return date in self._shards or os.path.exists(self.shard_path(date))
+
+    def __iter__(self):
+        return iter(self.dates())
+
+    def __len__(self):
+        return len(self.dates())
+
+
+class DayShard(MutableMapping):
+    """One date's cache: `quote` plus a write-through `locations` mapping"""
+
+    KEYS = ("quote", "locations")
+
+    def __init__(self, conn, lock, fragments):
+        self.conn = conn
+        self.lock = lock
+        self.locations = LocationsView(conn, lock, fragments)
+
+    def __getitem__(self, key):
+        if key == "locations":
+            return self.locations
+        if key == "quote":
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'quote'").fetchone()
+            return json.loads(row[0]) if row else None
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        if key == "locations":
+            with self.lock:
+                self.conn.execute("BEGIN")
+                self.conn.execute("DELETE FROM locations")
+                for location, entry in value.items():
+                    self.locations._write(location, entry)
+                self.conn.execute("COMMIT")
+        elif key == "quote":
+            with self.lock:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('quote', ?)",
+                    (json.dumps(value),)
+                )
+        else:
+            raise KeyError(key)
+
+    def __delitem__(self, key):
+        raise TypeError("Cache days always have a quote and locations")
+
+    def __iter__(self):
+        return iter(self.KEYS)
+
+    def __len__(self):
+        return len(self.KEYS)
+
+    def close(self):
+        self.conn.close()
+
+
+class LocationsView(MutableMapping):
+    """
+    location -> entry (expanded dict or legacy HTML string), one row each.
+    Expanded entries are packed into fragments on write and rebuilt on read.
+    """
+
+    def __init__(self, conn, lock, fragments):
+        self.conn = conn
+        self.lock = lock
+        self.fragments = fragments
+
+    def _write(self, location, entry):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO locations (location, entry, updated_at) VALUES (?, ?, ?)",
+            (location, json.dumps(pack_entry(entry, self.fragments)),
+             datetime.now(timezone.utc).isoformat(timespec="seconds"))
+        )
+
+    def __getitem__(self, location):
+        row = self.conn.execute(
+            "SELECT entry FROM locations WHERE location = ?", (location,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(location)
+        return unpack_entry(json.loads(row[0]), self.fragments)
+
+    def __setitem__(self, location, entry):
+        with self.lock:
+            self._write(location, entry)
+
+    def __delitem__(self, location):
+        with self.lock:
+            cur = self.conn.execute("DELETE FROM locations WHERE location = ?", (location,))
+        if cur.rowcount == 0:
+            raise KeyError(location)
+
+    def __contains__(self, location):
+        return self.conn.execute(
+            "SELECT 1 FROM locations WHERE location = ?", (location,)
+        ).fetchone() is not None
+
+    def __iter__(self):
+        rows = self.conn.execute("SELECT location FROM locations ORDER BY location").fetchall()
+        return iter([r[0] for r in rows])
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM locations").fetchone()[0]
+
+    def _where(self, match):
+        if not match:
+            return "", ()
+        escaped = match.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        return " WHERE location LIKE ? ESCAPE '\\'", (f"%{escaped}%",)
+
+    def rows(self, match=None):
+        """Stream (location, entry) pairs, optionally only locations containing `match`"""
+        where, params = self._where(match)
+        query = "SELECT location, entry FROM locations" + where + " ORDER BY location"
+        for location, entry in self.conn.execute(query, params):
+            yield location, unpack_entry(json.loads(entry), self.fragments)
+
+    def names(self, match=None):
+        where, params = self._where(match)
+        query = "SELECT location FROM locations" + where + " ORDER BY location"
+        return [row[0] for row in self.conn.execute(query, params)]
+
+    def stats(self, match=None):
+        """
+        Entry counts and stored row bytes, computed in SQLite without
+        decoding entries. Fragment bytes are reported by FragmentStore.stats().
+        """
+        where, params = self._where(match)
+        count, size, expanded = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(CAST(entry AS BLOB))), 0), "
+            "COALESCE(SUM(SUBSTR(entry, 1, 1) = '{'), 0) FROM locations" + where,
+            params
+        ).fetchone()
+        return {"entries": count, "bytes": size, "expanded": expanded, "legacy": count - expanded}
+
+
+def merge_store(source, target):
+    """
+    Copy every day from one store into another (used to fold per-shard
+    caches back into the main one). Locations from `source` win; the
+    target's quote is kept when it has one. Returns locations copied.
+    """
+    copied = 0
+    for date in source:
+        day = source[date]
+        if date not in target:
+            target[date] = {"quote": day["quote"], "locations": {}}
+        elif not target[date]["quote"]:
+            target[date]["quote"] = day["quote"]
+
+        locations = target[date]["locations"]
+        for location, entry in day["locations"].items():
+            locations[location] = entry
+            copied += 1
+    return copied
+
+
+class _LegacyScanner:
+    """
+    Walks a legacy JSON cache block by block without decoding it,
+    keeping only the unread part of the current block in memory.
+    """
+
+    def __init__(self, f, chunk_size=LEGACY_CHUNK_BYTES):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = b""
+        self.base = 0  # file offset of buf[0]
+        self.pos = 0
+
+    def offset(self):
+        return self.base + self.pos
+
+    def error(self, message):
+        return json.JSONDecodeError(message, "", self.offset())
+
+    def more(self):
+        data = self.f.read(self.chunk_size)
+        if not data:
+            raise self.error("Unterminated JSON object")
+        self.base += self.pos
+        self.buf = self.buf[self.pos:] + data
+        self.pos = 0
+
+    def skip(self, pattern):
+        """Move past `pattern` and return the next byte"""
+        while True:
+            self.pos = pattern.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos:self.pos + 1]
+            self.more()
+
+    def string(self):
+        """The raw string literal starting at pos"""
+        while True:
+            match = _JSON_STRING_END.match(self.buf, self.pos + 1)
+            if match:
+                start, self.pos = self.pos, match.end()
+                return self.buf[start:self.pos]
+            self.more()
+
+    def skip_value(self):
+        first = self.buf[self.pos:self.pos + 1]
+        if first == b'"':
+            self.string()
+            return
+        if first not in (b"{", b"["):
+            while True:
+                self.pos = _JSON_SCALAR.match(self.buf, self.pos).end()
+                if self.pos < len(self.buf):
+                    return
+                self.more()
+
+        depth = 0
+        while True:
+            match = _JSON_STRUCTURE.search(self.buf, self.pos)
+            if not match:
+                self.pos = len(self.buf)
+                self.more()
+                continue
+            self.pos = match.start()
+            token = match.group()
+            if token == b'"':
+                self.string()
+                continue
+            self.pos += 1
+            depth += 1 if token in (b"{", b"[") else -1
+            if depth == 0:
+                return
+
+
+def legacy_cache_days(f, chunk_size=LEGACY_CHUNK_BYTES):
+    """[(date, start, end)]: the byte span of each day in a legacy cache file"""
+    scan = _LegacyScanner(f, chunk_size)
+    if scan.skip(_JSON_SPACE) != b"{":
+        raise scan.error("Expected a JSON object")
+    scan.pos += 1
+
+    days = []
+    while True:
+        token = scan.skip(_JSON_SEPARATOR)
+        if token == b"}":
+            break
+        if token != b'"':
+            raise scan.error("Expected a date key")
+        date = json.loads(scan.string())
+        if scan.skip(_JSON_SPACE) != b":":
+            raise scan.error("Expected ':'")
+        scan.pos += 1
+        scan.skip(_JSON_SPACE)
+        start = scan.offset()
+        scan.skip_value()
+        days.append((date, start, scan.offset()))
+    return days
+
+
+def iter_legacy_cache(path=LEGACY_CACHE_FILE, select=None, newest_first=False, chunk_size=LEGACY_CHUNK_BYTES):
+    """
+    Yield (date, day) from an old whole-file JSON cache one day at a time.
+    The file is first scanned in blocks for each day's position; only the
+    dates are filtered (`select(date)`) and sorted, and a day is decoded
+    when it is yielded.
+    """
+    with open(path, 'rb') as f:
+        days = [day for day in legacy_cache_days(f, chunk_size) if select is None or select(day[0])]
+        if newest_first:
+            days.sort(key=lambda day: day[0], reverse=True)
+        for date, start, end in days:
+            f.seek(start)
+            yield date, json.loads(f.read(end - start))
+
+
+def migrate_legacy_cache(store, path=LEGACY_CACHE_FILE):
+    """
+    Import an old whole-file JSON cache into the store, once.
+    Dates already present in the store are left alone and the JSON file
+    is renamed to `<name>.migrated` afterwards.
+    """
+    if not os.path.exists(path):
+        return 0
+
+    try:
+        with open(path, 'r') as f:
+            legacy = json.load(f)
+    except json.JSONDecodeError:
+        legacy = {}
+
+    imported = 0
+    for date, day in legacy.items():
+        if date in store or not isinstance(day, dict):
+            continue
+        store[date] = {
+            "quote": day.get("quote"),
+            "locations": day.get("locations") or {}
+        }
+        imported += 1
+
+    os.replace(path, path + ".migrated")
+    return imported
+
+
+def open_cache(today=None, directory=CACHE_DIR):
+    """Open the store, importing the legacy JSON cache and evicting old days"""
+    store = CacheStore(directory)
+    # Shard stores start empty; only the main store owns the legacy file
+    if directory == CACHE_DIR:
+        imported = migrate_legacy_cache(store)
+        if imported:
+            print(f"📦 Migrated {imported} day(s) from {LEGACY_CACHE_FILE}")
+    evicted = store.evict(today)
+    if evicted:
+        print(f"🧹 Evicted {len(evicted)} cached day(s) older than {store.retention_days} days")
+    return store
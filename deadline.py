@@ -0,0 +1,177 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures import wait
+
+# Seconds a recipient waits for Gemini before the local fallback digest is sent
+GEMINI_DEADLINE = float(os.environ.get("GEMINI_DEADLINE_SECONDS", "20"))
+# Hard client-side timeout, so a hung request cannot outlive the run
+GEMINI_TIMEOUT = float(os.environ.get("GEMINI_TIMEOUT_SECONDS", "120"))
+# Max seconds the end of a run waits for late results to land in the cache
+BACKFILL_WAIT = float(os.environ.get("BACKFILL_WAIT_SECONDS", "30"))
+GEMINI_WORKERS = int(os.environ.get("GEMINI_WORKERS", "4"))
+
+
+class DeadlineExceeded(Exception):
+    """The call is still running; its result is parked for backfill"""
+
+
+def _quantile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class DaemonPool:
+    """
+    Minimal executor on daemon threads. ThreadPoolExecutor joins its
+    workers at interpreter exit, so a single hung request would keep the
+    process alive for up to GEMINI_TIMEOUT after the run is done.
+    """
+
+    def __init__(self, workers, name="gemini"):
+        self.workers = workers
+        self._queue = queue.SimpleQueue()
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True).start()
+
+    def submit(self, func, *args, **kwargs):
+        future = Future()
+        self._queue.put((future, func, args, kwargs))
+        return future
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            future, func, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def shutdown(self):
+        """Cancel queued calls and stop idle workers; running calls are abandoned"""
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item[0].cancel()
+        for _ in range(self.workers):
+            self._queue.put(None)
+
+
+class DeadlineRunner:
+    """
+    Runs generation calls on a small thread pool and waits at most
+    `deadline` seconds for each.
+
+    A call that misses the deadline keeps running. Its future is parked
+    under the caller's key, and collect() later hands back the finished
+    result so it can replace the fallback in the cache. Every call's
+    latency is recorded, late ones included. Waiting for a rate-limit
+    token happens before the clock starts and counts toward neither.
+    """
+
+    def __init__(self, deadline=GEMINI_DEADLINE, workers=GEMINI_WORKERS):
+        self.deadline = deadline
+        self.workers = workers
+        self.latencies = []
+        self.missed = 0
+        self._late = {}
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = DaemonPool(self.workers)
+        return self._executor
+
+    def shutdown(self):
+        """
+        Abandon parked and queued calls at the end of a run so they cannot
+        hold the process open. A later run starts a fresh pool.
+        """
+        with self._lock:
+            self._late = {}
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def _timed(self, func, args, kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            with self._lock:
+                self.latencies.append(time.perf_counter() - start)
+
+    def run(self, key, finish, func, *args, acquire=None, **kwargs):
+        """
+        finish(func(*args, **kwargs)) if the call returns in time. Otherwise
+        raise DeadlineExceeded; with a `key`, the call is parked and its
+        finished result can be collected later. `acquire()` (a rate-limit
+        token) is waited for in the caller before the deadline starts.
+        """
+        if acquire is not None:
+            acquire()
+        future = self.executor.submit(self._timed, func, args, kwargs)
+        try:
+            result = future.result(timeout=self.deadline)
+        except FutureTimeout:
+            with self._lock:
+                self.missed += 1
+                if key is not None:
+                    self._late[key] = (future, finish)
+            raise DeadlineExceeded(f"no response within {self.deadline:g}s")
+        return finish(result)
+
+    @property
+    def pending(self):
+        return len(self._late)
+
+    def collect(self, wait_s=0, accept=None):
+        """
+        [(key, result)] for parked calls that have finished, waiting up to
+        `wait_s` seconds for the rest. Keys that `accept(key)` turns down
+        stay parked; failed calls are dropped.
+        """
+        with self._lock:
+            late = dict(self._late)
+        if not late:
+            return []
+        if wait_s:
+            wait([future for future, _ in late.values()], timeout=wait_s)
+
+        ready = []
+        for key, (future, finish) in late.items():
+            if not future.done() or (accept and not accept(key)):
+                continue
+            with self._lock:
+                self._late.pop(key, None)
+            try:
+                ready.append((key, finish(future.result())))
+            except Exception as e:
+                print(f"   ⚠️ Late result for {key} unusable: {e}")
+        return ready
+
+    def report(self):
+        """Latency quantiles in ms over every call so far"""
+        with self._lock:
+            ordered = sorted(self.latencies)
+        if not ordered:
+            return None
+        return {
+            "count": len(ordered),
+            "missed": self.missed,
+            "p50_ms": round(_quantile(ordered, 0.5) * 1000, 1),
+            "p95_ms": round(_quantile(ordered, 0.95) * 1000, 1),
+            "p99_ms": round(_quantile(ordered, 0.99) * 1000, 1),
+        }
@@ -0,0 +1,212 @@
+from html import escape
+from string import Template
+
+# ----------------------------
+# TEMPLATES (compiled once at import)
+# ----------------------------
+NEWS_ITEM_TEMPLATE = Template("""
+<div style="margin-bottom:18px;padding-bottom:18px;$border">
+<p style="font-weight:700;margin:0 0 8px 0;font-size:1rem;color:#0F172A;line-height:1.5">$headline</p>
+<p style="font-size:0.95rem;color:#334155;margin:0 0 10px 0;line-height:1.6">$tldr</p>
+<a href="$url" style="color:#0D9488;font-size:0.9rem;text-decoration:none;font-weight:600">Read more →</a>
+</div>
+""")
+
+DIGEST_TEMPLATE = Template("""
+<h2 style="color:#0F172A;margin:0 0 10px 0;font-size:1.75rem;font-weight:700">Hello! 👋</h2>
+<p style="color:#334155;font-size:1rem;margin:0 0 32px 0">$today • $location</p>
+
+<div style="margin-bottom:28px;padding:20px;background:#F8FAFC;border-radius:12px;border-left:4px solid #6366F1">
+<p style="font-size:1.1rem;font-style:italic;color:#1E293B;margin:0 0 8px 0">"$quote_text"</p>
+<p style="font-size:0.9rem;color:#64748B;margin:0;font-weight:600">— $quote_author</p>
+</div>
+
+<div style="background:#ECFDF5;padding:28px;border-radius:16px;margin-bottom:28px;border-left:5px solid #14B8A6">
+<h3 style="color:#0D9488;font-size:1.2rem;margin:0 0 16px 0;font-weight:700">🌤️ Weather</h3>
+<div style="margin-bottom:14px">
+<span style="font-size:1rem;color:#0F172A;margin-right:20px"><strong>High:</strong> $max°C</span>
+<span style="font-size:1rem;color:#0F172A;margin-right:20px"><strong>Low:</strong> $min°C</span>
+<span style="font-size:1rem;color:#0F172A;margin-right:20px"><strong>Feels:</strong> $feels_like°C</span>
+<span style="font-size:1rem;color:#0F172A"><strong>UV:</strong> $uv_index</span>
+</div>
+<p style="font-size:1rem;color:#1E293B;line-height:1.7;margin:0 0 12px 0">$weather_note</p>
+<p style="font-size:0.9rem;color:#334155;margin:0">☀️ $sunrise • 🌙 $sunset</p>
+</div>
+
+<div style="background:#ffffff;padding:28px;border-radius:16px;border-left:5px solid #EF4444;box-shadow:0 4px 12px rgba(0,0,0,0.06)">
+<h3 style="color:#DC2626;font-size:1.2rem;margin:0 0 20px 0;font-weight:700">📰 Top 5 News • TLDR</h3>
+$news_html
+</div>
+
+<p style="text-align:center;color:#334155;font-size:1rem;margin:24px 0 0 0;font-weight:600">Have a great day! 🚀</p>
+""")
+
+# Email shell around the digest body, using much darker colors that show
+# up in dark mode
+EMAIL_TEMPLATE = Template("""
+<!DOCTYPE html>
+<html>
+<head>
+  <meta charset="UTF-8">
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <meta name="color-scheme" content="light only">
+  <meta name="supported-color-schemes" content="light">
+  <style>
+    * { color-scheme: light only !important; }
+    body { background-color: #F0FDFA !important; }
+  </style>
+</head>
+<body style="margin:0;padding:0;font-family:'Segoe UI',Arial,sans-serif;background-color:#F0FDFA !important;padding:40px 20px">
+  
+  <div style="max-width:700px;margin:0 auto;background-color:#ffffff !important;border-radius:24px;overflow:hidden;box-shadow:0 10px 40px rgba(0,0,0,0.1);border:1px solid #14B8A6">
+    
+    <!-- Header -->
+    <div style="background:linear-gradient(135deg,#14B8A6 0%,#1E40AF 100%);padding:40px 36px;text-align:center">
+      <div style="margin-bottom:14px">
+        <div style="display:inline-block;width:56px;height:56px;background-color:#ffffff !important;border-radius:14px;line-height:56px;text-align:center">
+          <span style="font-family:'Segoe UI',Arial,sans-serif;font-weight:900;font-size:1.7rem;color:#14B8A6 !important">SB</span>
+        </div>
+      </div>
+      <h1 style="color:#ffffff !important;font-size:2rem;font-weight:800;margin:0 0 6px 0">SmartBrief</h1>
+      <p style="color:#ffffff !important;font-size:1.05rem;margin:0">Start Your Day Smart</p>
+    </div>
+    
+    <!-- Content -->
+    <div style="padding:40px 36px;background-color:#ffffff !important;color:#0F172A !important">
+      $html_content
+    </div>
+    
+    <!-- Footer -->
+    <div style="background-color:#F8FAFC !important;padding:24px 36px;border-top:1px solid #CBD5E1;text-align:center">
+      <p style="color:#334155 !important;font-size:0.9rem;margin:0">
+        <a href="$unsubscribe_url" style="color:#0D9488 !important;text-decoration:none;font-weight:600">Unsubscribe</a> • © 2026 SmartBrief
+      </p>
+    </div>
+    
+  </div>
+  
+</body>
+</html>
+        """)
+
+# ----------------------------
+# STRUCTURED OUTPUT SCHEMA
+# ----------------------------
+# What the model returns instead of HTML: one weather sentence plus one
+# headline/TLDR per input article, in input order. URLs never come from
+# the model; they are taken from the news list when rendering.
+DIGEST_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "weather": {"type": "string"},
+        "articles": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "headline": {"type": "string"},
+                    "tldr": {"type": "string"}
+                },
+                "required": ["headline", "tldr"]
+            }
+        }
+    },
+    "required": ["weather", "articles"]
+}
+
+
+def validate_payload(payload, article_count, schema=DIGEST_SCHEMA):
+    """Check a model payload against DIGEST_SCHEMA; raises ValueError"""
+    _check(payload, schema, "payload")
+    if len(payload["articles"]) != article_count:
+        raise ValueError(
+            f"expected {article_count} articles, got {len(payload['articles'])}"
+        )
+    if not payload["weather"].strip():
+        raise ValueError("empty weather sentence")
+    return payload
+
+
+def _check(value, schema, path):
+    kind = schema["type"]
+    if kind == "object":
+        if not isinstance(value, dict):
+            raise ValueError(f"{path}: expected object")
+        for key in schema.get("required", []):
+            if key not in value:
+                raise ValueError(f"{path}: missing '{key}'")
+        for key, sub in schema.get("properties", {}).items():
+            if key in value:
+                _check(value[key], sub, f"{path}.{key}")
+    elif kind == "array":
+        if not isinstance(value, list):
+            raise ValueError(f"{path}: expected array")
+        for i, item in enumerate(value):
+            _check(item, schema["items"], f"{path}[{i}]")
+    elif kind == "string":
+        if not isinstance(value, str):
+            raise ValueError(f"{path}: expected string")
+
+
+# ----------------------------
+# RENDER
+# ----------------------------
+def news_items(news_list, tldrs=None):
+    """
+    Headline/TLDR/URL items straight from the news list. `tldrs` maps an
+    article's URL to a generated summary; the description is used otherwise.
+    """
+    items = []
+    for article in news_list[:5]:
+        tldr = tldrs.get(article["url"]) if tldrs else None
+        if not tldr:
+            tldr = article['description'][:180] if article['description'] else 'Full story available.'
+        items.append({
+            "headline": article['title'][:120],
+            "tldr": tldr,
+            "url": article['url']
+        })
+    return items
+
+
+def payload_items(payload, news_list):
+    """Pair a validated model payload with the input URLs"""
+    return [
+        {
+            "headline": generated["headline"][:160],
+            "tldr": generated["tldr"][:400],
+            "url": article["url"]
+        }
+        for generated, article in zip(payload["articles"], news_list[:5])
+    ]
+
+
+def render_digest(today, location, weather, quote, items, weather_note=None):
+    """Fill the digest template; shared by the AI, TLDR-cache and fallback paths"""
+    if not weather_note:
+        weather_note = f"Temperature from {weather['min']}°C to {weather['max']}°C. Conditions look good."
+
+    news_html = ''.join(
+        NEWS_ITEM_TEMPLATE.substitute(
+            border='' if idx == len(items) - 1 else 'border-bottom:1px solid #E2E8F0;',
+            headline=escape(item["headline"], quote=False),
+            tldr=escape(item["tldr"], quote=False),
+            url=escape(item["url"])
+        )
+        for idx, item in enumerate(items)
+    )
+
+    return DIGEST_TEMPLATE.substitute(
+        today=today,
+        location=escape(location, quote=False),
+        quote_text=escape(quote['q'], quote=False),
+        quote_author=escape(quote['a'], quote=False),
+        max=weather['max'],
+        min=weather['min'],
+        feels_like=weather['feels_like'],
+        uv_index=weather['uv_index'],
+        sunrise=weather['sunrise'],
+        sunset=weather['sunset'],
+        weather_note=escape(weather_note, quote=False),
+        news_html=news_html
+    )
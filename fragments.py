@@ -0,0 +1,169 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import zlib
+
+FRAGMENT_FILE = "fragments.db"
+# Fragments shorter than this are stored as they are; zlib only pays off above it
+COMPRESS_MIN_BYTES = 64
+# Decoded fragments kept in memory; a day's distinct blocks fit easily
+MEMO_SIZE = 4096
+
+# Digest HTML is cut before each top-level block (a line that opens a div
+# or heading), so the quote box, the weather and news headers, every news
+# item and the sign-off become separate fragments. The pieces concatenate
+# back to the exact original string.
+_BLOCK_START = re.compile(r"(?m)^(?=<(?:div|h[1-6]|table|section|ul|ol|hr)\b)")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fragments (
+    hash TEXT PRIMARY KEY,
+    data BLOB NOT NULL,
+    compressed INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+"""
+
+
+def split_html(html):
+    return [piece for piece in _BLOCK_START.split(html) if piece]
+
+
+def fragment_hash(text):
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=12).hexdigest()
+
+
+class FragmentStore:
+    """
+    Content-addressed blobs shared by every day of the digest cache.
+
+    Each text is stored once under its hash, zlib-compressed when that
+    makes it smaller. Cache rows hold lists of hashes and are rebuilt on
+    read, so identical quote boxes, headers and news items cost one row
+    however many locations and days use them. Unreferenced fragments are
+    removed by sweep().
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._memo = {}
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def put_many(self, texts):
+        """Store texts not seen yet in one transaction; returns their hashes in order"""
+        hashes = [fragment_hash(text) for text in texts]
+        with self._lock:
+            new = [(h, text) for h, text in zip(hashes, texts) if h not in self._memo]
+            if new:
+                self.conn.execute("BEGIN")
+                for h, text in new:
+                    raw = text.encode("utf-8")
+                    packed = zlib.compress(raw) if len(raw) >= COMPRESS_MIN_BYTES else raw
+                    compressed = len(packed) < len(raw)
+                    self.conn.execute(
+                        "INSERT OR IGNORE INTO fragments (hash, data, compressed, size) VALUES (?, ?, ?, ?)",
+                        (h, packed if compressed else raw, int(compressed), len(raw))
+                    )
+                    self._remember(h, text)
+                self.conn.execute("COMMIT")
+        return hashes
+
+    def get_many(self, hashes):
+        """Texts for `hashes`, in order; KeyError if one is missing"""
+        with self._lock:
+            found = {h: self._memo[h] for h in hashes if h in self._memo}
+            missing = [h for h in set(hashes) if h not in found]
+            for start in range(0, len(missing), 500):
+                batch = missing[start:start + 500]
+                rows = self.conn.execute(
+                    f"SELECT hash, data, compressed FROM fragments WHERE hash IN ({','.join('?' * len(batch))})",
+                    batch
+                ).fetchall()
+                for h, data, compressed in rows:
+                    found[h] = (zlib.decompress(data) if compressed else data).decode("utf-8")
+                    self._remember(h, found[h])
+        return [found[h] for h in hashes]
+
+    def _remember(self, h, text):
+        if len(self._memo) >= MEMO_SIZE:
+            self._memo.clear()
+        self._memo[h] = text
+
+    def sweep(self, live):
+        """Delete fragments whose hash is not in `live`; returns how many went"""
+        with self._lock:
+            self.conn.execute("CREATE TEMP TABLE IF NOT EXISTS live (hash TEXT PRIMARY KEY)")
+            self.conn.execute("BEGIN")
+            self.conn.execute("DELETE FROM live")
+            self.conn.executemany("INSERT OR IGNORE INTO live (hash) VALUES (?)", ((h,) for h in live))
+            removed = self.conn.execute(
+                "DELETE FROM fragments WHERE hash NOT IN (SELECT hash FROM live)"
+            ).rowcount
+            self.conn.execute("DELETE FROM live")
+            self.conn.execute("COMMIT")
+            self._memo.clear()
+        return removed
+
+    def stats(self):
+        """Fragment count, bytes on disk and bytes once decompressed"""
+        count, stored, raw = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0), COALESCE(SUM(size), 0) FROM fragments"
+        ).fetchone()
+        return {"fragments": count, "bytes": stored, "raw_bytes": raw}
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# ----------------------------
+# ENTRY ENCODING
+# ----------------------------
+def pack_entry(entry, store):
+    """
+    Expanded cache entry -> the form kept in a cache row: `html` becomes
+    `html_refs` (its blocks) and `news` becomes `news_refs` (one per
+    article). Legacy HTML strings are kept as they are.
+    """
+    if not isinstance(entry, dict):
+        return entry
+    packed = dict(entry)
+    if isinstance(packed.get("html"), str):
+        packed["html_refs"] = store.put_many(split_html(packed.pop("html")))
+    if isinstance(packed.get("news"), list):
+        packed["news_refs"] = store.put_many([
+            json.dumps(article, sort_keys=True, ensure_ascii=False) for article in packed.pop("news")
+        ])
+    return packed
+
+
+def unpack_entry(entry, store):
+    """Rebuild an entry written by pack_entry(); other entries pass through"""
+    if not isinstance(entry, dict) or not ("html_refs" in entry or "news_refs" in entry):
+        return entry
+    entry = dict(entry)
+    if "html_refs" in entry:
+        entry["html"] = "".join(store.get_many(entry.pop("html_refs")))
+    if "news_refs" in entry:
+        entry["news"] = [json.loads(text) for text in store.get_many(entry.pop("news_refs"))]
+    return entry
+
+
+def entry_refs(entry):
+    """Every fragment hash a packed entry points at"""
+    if not isinstance(entry, dict):
+        return []
+    return entry.get("html_refs", []) + entry.get("news_refs", [])
@@ -0,0 +1,55 @@
+import os
+from datetime import datetime, timedelta, timezone
+
+# How old a cached digest's inputs may be at send time before it is rebuilt
+WEATHER_MAX_AGE_HOURS = float(os.environ.get("DIGEST_WEATHER_MAX_AGE_HOURS", "3"))
+NEWS_MAX_AGE_HOURS = float(os.environ.get("DIGEST_NEWS_MAX_AGE_HOURS", "6"))
+
+MAX_AGE = {
+    "weather": timedelta(hours=WEATHER_MAX_AGE_HOURS),
+    "news": timedelta(hours=NEWS_MAX_AGE_HOURS),
+}
+
+
+def now_iso():
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def make_entry(html, weather, news, weather_at=None, news_at=None):
+    """Expanded cache entry, stamped with when its weather and news were fetched"""
+    stamp = now_iso()
+    return {
+        "html": html,
+        "weather": weather,
+        "news": news,
+        "weather_at": weather_at or stamp,
+        "news_at": news_at or stamp,
+    }
+
+
+def is_fresh(entry, part, at_utc):
+    """
+    Whether `part` ("weather" or "news") of a cache entry is still young
+    enough at `at_utc`. Entries without a timestamp were generated at send
+    time by older code and count as fresh.
+    """
+    if not isinstance(entry, dict):
+        return True
+    stamp = entry.get(f"{part}_at")
+    if not stamp:
+        return True
+    try:
+        fetched = datetime.fromisoformat(stamp)
+    except ValueError:
+        return False
+    return at_utc - fetched <= MAX_AGE[part]
+
+
+def stale_parts(entry, at_utc):
+    """Parts of the entry that must be fetched again before it is sent at `at_utc`"""
+    return [part for part in MAX_AGE if not is_fresh(entry, part, at_utc)]
+
+
+def horizon_hours(requested):
+    """Pre-generate no further ahead than the shortest max age, or it would be stale on arrival"""
+    return min(requested, WEATHER_MAX_AGE_HOURS, NEWS_MAX_AGE_HOURS)
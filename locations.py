@@ -0,0 +1,246 @@
+import json
+import os
+import re
+
+import pytz
+
+from read_sheets import Subscriber
+
+LOCATION_INDEX_FILE = "location_index.json"
+# Geohash length for the shared-digest cell (3 ≈ 156 x 156 km, 4 ≈ 39 x 20 km)
+LOCATION_PRECISION = int(os.environ.get("LOCATION_GEOHASH_PRECISION", "4"))
+
+# Digest keys are "<display name> @<geohash cell>"
+_CELL_SUFFIX = re.compile(r" @[0-9b-hjkmnp-z]+$")
+
+# Countries NewsAPI's /top-headlines accepts; others use a keyword search
+NEWSAPI_COUNTRIES = frozenset(
+    "ae ar at au be bg br ca ch cn co cu cz de eg fr gb gr hk hu id ie il in it "
+    "jp kr lt lv ma mx my ng nl no nz ph pl pt ro rs ru sa se sg si sk th tr tw "
+    "ua us ve za".split()
+)
+
+# Everyday and native spellings on top of the ISO 3166 names
+COUNTRY_ALIASES = {
+    "usa": "us", "us": "us", "u.s.": "us", "u.s.a.": "us", "america": "us",
+    "united states of america": "us",
+    "uk": "gb", "u.k.": "gb", "united kingdom": "gb", "great britain": "gb",
+    "england": "gb", "scotland": "gb", "wales": "gb", "northern ireland": "gb",
+    "south korea": "kr", "republic of korea": "kr", "north korea": "kp",
+    "uae": "ae", "czechia": "cz", "viet nam": "vn", "burma": "mm",
+    "russian federation": "ru", "the netherlands": "nl", "holland": "nl",
+    "ivory coast": "ci", "dr congo": "cd", "democratic republic of the congo": "cd",
+    "republic of the congo": "cg", "swaziland": "sz", "türkiye": "tr", "turkiye": "tr",
+    "deutschland": "de", "españa": "es", "méxico": "mx", "brasil": "br",
+    "italia": "it", "nederland": "nl", "österreich": "at", "schweiz": "ch",
+    "suisse": "ch", "polska": "pl", "sverige": "se", "norge": "no",
+    "danmark": "dk", "suomi": "fi", "россия": "ru", "日本": "jp", "中国": "cn",
+    "भारत": "in", "bharat": "in", "hong kong sar": "hk", "macau sar": "mo",
+}
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Built once per process from pytz's ISO 3166 / zone.tab data
+_country_index = None
+_tz_countries = None
+
+
+def _grid(lat, lon, precision):
+    """Geohash cell as integer (lon, lat) indices, cheap enough to run per subscriber"""
+    lon_bits = (precision * 5 + 1) // 2
+    lat_bits = precision * 5 // 2
+    x = min(int((lon + 180.0) / 360.0 * (1 << lon_bits)), (1 << lon_bits) - 1)
+    y = min(int((lat + 90.0) / 180.0 * (1 << lat_bits)), (1 << lat_bits) - 1)
+    return max(x, 0), max(y, 0)
+
+
+def _encode(x, y, precision):
+    lon_bits = (precision * 5 + 1) // 2
+    lat_bits = precision * 5 // 2
+    code = 0
+    # Bits alternate longitude, latitude, starting with longitude
+    for i in range(lon_bits - 1, -1, -1):
+        code = (code << 1) | ((x >> i) & 1)
+        j = i - (lon_bits - lat_bits)
+        if j >= 0:
+            code = (code << 1) | ((y >> j) & 1)
+    return "".join(
+        _BASE32[(code >> shift) & 31]
+        for shift in range((precision - 1) * 5, -1, -5)
+    )
+
+
+def geohash(lat, lon, precision=LOCATION_PRECISION):
+    """Standard base-32 geohash of a coordinate"""
+    return _encode(*_grid(lat, lon, precision), precision)
+
+
+def country_index():
+    """casefolded country name or alias -> ISO 3166-1 alpha-2 code"""
+    global _country_index
+    if _country_index is None:
+        index = {}
+        for code, name in pytz.country_names.items():
+            code = code.lower()
+            index[name.casefold()] = code
+            # "Korea (South)" -> also "korea south" and, if free, "korea"
+            base, _, qualifier = name.partition(" (")
+            if qualifier:
+                index.setdefault(f"{base} {qualifier.rstrip(')')}".casefold(), code)
+                index.setdefault(base.casefold(), code)
+            index.setdefault(code, code)
+        index.update(COUNTRY_ALIASES)
+        _country_index = index
+    return _country_index
+
+
+def tz_country(tz_name):
+    """Country for an IANA timezone (zone.tab), e.g. Asia/Kolkata -> in"""
+    global _tz_countries
+    if _tz_countries is None:
+        _tz_countries = {
+            tz: code.lower()
+            for code in pytz.country_timezones
+            for tz in pytz.country_timezones[code]
+        }
+    return _tz_countries.get(tz_name)
+
+
+def country_name(code):
+    """Plain English name for a code, without the ISO qualifier"""
+    name = pytz.country_names.get(code.upper(), code)
+    return name.split(" (")[0]
+
+
+def parse_country(location):
+    """Country code from the last comma-separated part of a location string"""
+    if not location:
+        return None
+    part = location.rsplit(",", 1)[-1].strip().casefold()
+    return country_index().get(part)
+
+
+def clean_name(location):
+    """Tidy spacing around commas; the text itself is kept as the subscriber wrote it"""
+    text = re.sub(r"\s*,\s*", ", ", location or "").strip(" ,")
+    return re.sub(r"\s+", " ", text)
+
+
+def name_key(location):
+    """'New York,USA' and 'new york, United States' -> 'new york, us'"""
+    parts = clean_name(location).casefold().split(", ")
+    code = parse_country(location)
+    if code and len(parts) > 1:
+        parts[-1] = code
+    return ", ".join(parts)
+
+
+def cell_key(name, cell):
+    return f"{name} @{cell}"
+
+
+def _adjacent(grid, other, precision):
+    """True when two cells are the same or touch (across the antimeridian too)"""
+    width = 1 << ((precision * 5 + 1) // 2)
+    dx = abs(grid[0] - other[0])
+    return abs(grid[1] - other[1]) <= 1 and min(dx, width - dx) <= 1
+
+
+def display_name(location):
+    """The human-readable part of a digest key (plain names pass through)"""
+    return _CELL_SUFFIX.sub("", location or "")
+
+
+class LocationIndex:
+    """
+    Maps subscribers to one digest key per place, persisted between runs.
+
+    A place is a normalised name (case, spacing and country spelling
+    folded, so "New York,USA" and "new york, United States" match) around
+    the coarse geohash cell where it was first seen. Subscribers with that
+    name in the same or a touching cell share its key, so a city split by
+    a cell edge is still one digest, while same-named places far apart
+    (Portland, Oregon and Portland, Maine) stay separate. The key is the
+    first spelling seen plus the cell ("New York, USA @dr5r"). The digest
+    cache, pipeline and shards are keyed by it; display_name() recovers
+    the name for the email and the news search.
+    """
+
+    def __init__(self, path=LOCATION_INDEX_FILE, precision=LOCATION_PRECISION, tz_lookup=None):
+        self.path = path
+        self.precision = precision
+        self.tz_lookup = tz_lookup
+        self.dirty = False
+        self.merged = 0
+        self._data = None
+        self._memo = {}
+
+    @property
+    def data(self):
+        if self._data is None:
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                data = {}
+            # Cells (and keys) depend on the precision they were built with;
+            # version 3 groups cells under each normalised name
+            if data.get("precision") != self.precision or data.get("version") != 3:
+                data = {"version": 3, "precision": self.precision, "places": {}, "countries": {}}
+            self._data = data
+        return self._data
+
+    def canonical(self, location, lat, lon):
+        """Digest key for a subscriber: the place's display name plus its cell"""
+        norm = name_key(location)
+        grid = _grid(lat, lon, self.precision)
+        key = self._memo.get((norm, grid))
+        if key is None:
+            # [cell, display name, x, y] for every place with this name
+            places = self.data["places"].setdefault(norm, [])
+            for cell, name, x, y in places:
+                if _adjacent(grid, (x, y), self.precision):
+                    break
+            else:
+                cell = _encode(*grid, self.precision)
+                name = clean_name(location) or f"{round(lat, 2)}, {round(lon, 2)}"
+                places.append([cell, name, *grid])
+                self.dirty = True
+            key = cell_key(name, cell)
+            self._memo[(norm, grid)] = key
+
+        countries = self.data["countries"]
+        if key not in countries:
+            code = parse_country(display_name(key))
+            if code is None and self.tz_lookup is not None:
+                code = tz_country(self.tz_lookup(lat, lon))
+            countries[key] = code
+            self.dirty = True
+        return key
+
+    def canonicalise(self, subscribers):
+        """Subscriber records with `location` replaced by their digest key"""
+        result = []
+        for sub in subscribers:
+            key = self.canonical(sub[4], sub[2], sub[3])
+            if display_name(key) != clean_name(sub[4]):
+                self.merged += 1
+            result.append(Subscriber(*sub[:4], key, *sub[5:]))
+        return result
+
+    def country(self, location):
+        """ISO code for a digest key (falls back to parsing the name)"""
+        code = self.data["countries"].get(location)
+        return code or parse_country(display_name(location))
+
+    def save(self):
+        if self._data is None or not self.dirty:
+            return
+        try:
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self._data, f, separators=(",", ":"), ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except Exception as e:
+            print(f"⚠️ Failed to save location index: {e}")
@@ -0,0 +1,113 @@
+import glob
+import os
+import shutil
+import sys
+
+from cache_store import CACHE_DIR, CacheStore, merge_store
+from retry_queue import RETRY_FILE, RetryQueue
+from run_journal import JOURNAL_FILE, merge_journals
+from send_ledger import LEDGER_FILE, SendLedger
+from sharding import shard_glob
+from weather import WEATHER_CACHE_FILE, WeatherCache
+
+# Check for keep flag (leave shard files in place after merging)
+KEEP_SHARDS = '--keep' in sys.argv
+
+
+def shard_outputs(path):
+    """Every per-shard copy of `path` in the working directory"""
+    return sorted(glob.glob(shard_glob(path)))
+
+
+def remove_database(path):
+    """Delete an SQLite file along with its WAL side files"""
+    for suffix in ("", "-wal", "-shm"):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+def merge_caches():
+    target = CacheStore(CACHE_DIR)
+    merged = 0
+    for directory in shard_outputs(CACHE_DIR):
+        source = CacheStore(directory)
+        copied = merge_store(source, target)
+        source.close()
+        print(f"   ✓ {directory}: {copied} location(s)")
+        merged += 1
+        if not KEEP_SHARDS:
+            shutil.rmtree(directory)
+    target.close()
+    return merged
+
+
+def merge_ledgers():
+    ledger = SendLedger(LEDGER_FILE)
+    merged = 0
+    for path in shard_outputs(LEDGER_FILE):
+        rows = ledger.merge(path)
+        print(f"   ✓ {path}: {rows} send(s)")
+        merged += 1
+        if not KEEP_SHARDS:
+            remove_database(path)
+    ledger.close()
+    return merged
+
+
+def merge_retry_queues():
+    queue = RetryQueue(RETRY_FILE)
+    merged = 0
+    for path in shard_outputs(RETRY_FILE):
+        items = queue.merge(path)
+        print(f"   ✓ {path}: {items} queued item(s)")
+        merged += 1
+        if not KEEP_SHARDS:
+            remove_database(path)
+    queue.close()
+    return merged
+
+
+def merge_weather():
+    cache = WeatherCache(WEATHER_CACHE_FILE)
+    merged = 0
+    for path in shard_outputs(WEATHER_CACHE_FILE):
+        cells = cache.merge(path)
+        print(f"   ✓ {path}: {cells} forecast(s)")
+        merged += 1
+        if not KEEP_SHARDS:
+            os.remove(path)
+    cache.save()
+    return merged
+
+
+def merge_run_journals():
+    paths = shard_outputs(JOURNAL_FILE)
+    if not paths:
+        return 0
+    merged = merge_journals(paths, JOURNAL_FILE)
+    print(f"   ✓ {merged} of {len(paths)} journal(s) from the latest day")
+    if not KEEP_SHARDS:
+        for path in paths:
+            os.remove(path)
+    return merged
+
+
+def main():
+    print("\n🧩 Merging shard outputs...")
+    caches = merge_caches()
+    ledgers = merge_ledgers()
+    queues = merge_retry_queues()
+    forecasts = merge_weather()
+    journals = merge_run_journals()
+    if not caches and not ledgers and not queues and not forecasts and not journals:
+        print("   Nothing to merge")
+        return
+    print(f"✅ Merged {caches} cache(s) into {CACHE_DIR}/, {ledgers} ledger(s) into {LEDGER_FILE}, "
+          f"{queues} retry queue(s) into {RETRY_FILE}, {forecasts} weather cache(s) into {WEATHER_CACHE_FILE} "
+          f"and {journals} journal(s) into {JOURNAL_FILE}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+# Off unless asked for; disabled spans and counters are no-ops
+ENABLED = os.environ.get("SMARTBRIEF_METRICS", "0") == "1" or '--metrics' in sys.argv
+METRICS_JSON = os.environ.get("SMARTBRIEF_METRICS_JSON", "metrics.json")
+# Prometheus node_exporter textfile collector format
+METRICS_PROM = os.environ.get("SMARTBRIEF_METRICS_PROM", "smartbrief.prom")
+
+_NOOP = nullcontext()
+
+
+def _quantile(ordered, q):
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+    return "{" + inner + "}"
+
+
+class Span:
+    __slots__ = ("registry", "name", "start")
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.registry.observe(self.name, time.perf_counter() - self.start, failed=exc_type is not None)
+        return False
+
+
+class Registry:
+    """Span durations and labelled counters for one run"""
+
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self.durations = {}   # span -> [seconds]
+        self.errors = {}      # span -> count
+        self.counters = {}    # (name, labels) -> value
+        self.gauges = {}      # (name, labels) -> value
+        self._lock = threading.Lock()
+
+    def observe(self, name, seconds, failed=False):
+        with self._lock:
+            self.durations.setdefault(name, []).append(seconds)
+            if failed:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def count(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def gauge(self, name, value, **labels):
+        with self._lock:
+            self.gauges[(name, tuple(sorted(labels.items())))] = value
+
+    # ------------------
+    # REPORTS
+    # ------------------
+    def snapshot(self):
+        spans = {}
+        for name, durations in sorted(self.durations.items()):
+            ordered = sorted(durations)
+            spans[name] = {
+                "count": len(ordered),
+                "errors": self.errors.get(name, 0),
+                "total_s": round(sum(ordered), 6),
+                "p50_ms": round(_quantile(ordered, 0.5) * 1000, 2),
+                "p95_ms": round(_quantile(ordered, 0.95) * 1000, 2),
+                "p99_ms": round(_quantile(ordered, 0.99) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2),
+            }
+
+        def flatten(values):
+            return [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(values.items())
+            ]
+
+        return {
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "duration_s": round((datetime.now(timezone.utc) - self.started_at).total_seconds(), 3),
+            "spans": spans,
+            "counters": flatten(self.counters),
+            "gauges": flatten(self.gauges),
+        }
+
+    def prometheus(self, report):
+        lines = [
+            "# HELP smartbrief_span_seconds Time spent in instrumented calls",
+            "# TYPE smartbrief_span_seconds summary",
+        ]
+        for name, span in report["spans"].items():
+            ordered = sorted(self.durations[name])
+            for quantile in (0.5, 0.95, 0.99):
+                lines.append(f'smartbrief_span_seconds{{span="{name}",quantile="{quantile}"}} {_quantile(ordered, quantile):.6f}')
+            lines.append(f'smartbrief_span_seconds_sum{{span="{name}"}} {span["total_s"]}')
+            lines.append(f'smartbrief_span_seconds_count{{span="{name}"}} {span["count"]}')
+        lines.append("# TYPE smartbrief_span_errors_total counter")
+        for name, span in report["spans"].items():
+            lines.append(f'smartbrief_span_errors_total{{span="{name}"}} {span["errors"]}')
+
+        for kind, suffix in (("counters", "_total"), ("gauges", "")):
+            seen = set()
+            for item in report[kind]:
+                metric = f"smartbrief_{item['name']}{suffix}"
+                if metric not in seen:
+                    seen.add(metric)
+                    lines.append(f"# TYPE {metric} {'counter' if suffix else 'gauge'}")
+                lines.append(f"{metric}{_labels(item['labels'])} {item['value']}")
+
+        lines.append("# TYPE smartbrief_run_duration_seconds gauge")
+        lines.append(f"smartbrief_run_duration_seconds {report['duration_s']}")
+        lines.append("# TYPE smartbrief_last_run_timestamp_seconds gauge")
+        lines.append(f"smartbrief_last_run_timestamp_seconds {int(time.time())}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path=METRICS_JSON, prom_path=METRICS_PROM):
+        report = self.snapshot()
+        for path, text in (
+            (json_path, json.dumps(report, indent=2)),
+            (prom_path, self.prometheus(report)),
+        ):
+            # Write-then-rename so a collector never reads half a file
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+        return report
+
+
+registry = Registry()
+
+
+# ----------------------------
+# PUBLIC HELPERS
+# ----------------------------
+def span(name):
+    """`with span("fetch_weather"):` times a block"""
+    if not ENABLED:
+        return _NOOP
+    return Span(registry, name)
+
+
+def timed(name):
+    """Decorator form of span(); returns the function untouched when disabled"""
+    def decorate(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Span(registry, name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name, value=1, **labels):
+    if ENABLED:
+        registry.count(name, value, **labels)
+
+
+def gauge(name, value, **labels):
+    if ENABLED:
+        registry.gauge(name, value, **labels)
+
+
+def write_report():
+    """Write the JSON and Prometheus reports (no-op when disabled)"""
+    if not ENABLED:
+        return None
+    try:
+        report = registry.write()
+        print(f"📈 Metrics written to {METRICS_JSON} and {METRICS_PROM}")
+        return report
+    except Exception as e:
+        print(f"⚠️ Failed to write metrics: {e}")
+        return None
@@ -0,0 +1,100 @@
+import base64
+import threading
+from collections import OrderedDict
+from email.mime.multipart import MIMEMultipart
+from email.mime.nonmultipart import MIMENonMultipart
+from urllib.parse import quote
+
+from digest_template import EMAIL_TEMPLATE
+
+UNSUBSCRIBE_URL = "https://surya8055.github.io/SmartBrief/unsubscribe.html?email={}"
+# Prepared messages kept per run (one per location digest + subject)
+MAX_PREPARED = 256
+
+TO_TOKEN = "smartbrief-recipient@placeholder.invalid"
+LINK_TOKEN = "SMARTBRIEF_UNSUBSCRIBE_LINK"
+BODY_TOKEN = "SMARTBRIEF_BODY"
+
+
+def _b64(data):
+    return base64.encodebytes(data).decode("ascii")
+
+
+def _pad3(data):
+    """Pad with spaces to a multiple of 3 bytes so base64 chunks concatenate"""
+    return data + b" " * (-len(data) % 3)
+
+
+class PreparedMessage:
+    """
+    A fully encoded message with two holes: the To header and the
+    unsubscribe link. The HTML body is split around the link and each
+    piece is base64-encoded on its own; pieces are padded to whole 3-byte
+    groups (with HTML-insignificant spaces) so their encodings can simply
+    be concatenated.
+    """
+
+    def __init__(self, sender, subject, html_content):
+        full_html = EMAIL_TEMPLATE.substitute(
+            html_content=html_content,
+            unsubscribe_url=LINK_TOKEN
+        )
+        before, after = full_html.split(LINK_TOKEN)
+        tag_start = before.rindex("<a ")
+
+        # [body ...] [<a href="URL" ] [rest of body]
+        self.link_prefix = before[tag_start:].encode("utf-8")
+        self.body_head = _b64(_pad3(before[:tag_start].encode("utf-8")))
+        self.body_tail = _b64(after[1:].encode("utf-8"))
+        self.link_suffix = after[:1].encode("utf-8")
+
+        msg = MIMEMultipart("alternative")
+        msg["From"] = sender
+        msg["To"] = TO_TOKEN
+        msg["Subject"] = subject
+
+        part = MIMENonMultipart("text", "html", charset="utf-8")
+        part["Content-Transfer-Encoding"] = "base64"
+        part.set_payload(BODY_TOKEN)
+        msg.attach(part)
+
+        envelope = msg.as_string()
+        head, self.envelope_tail = envelope.split(BODY_TOKEN)
+        self.envelope_head, self.envelope_mid = head.split(TO_TOKEN)
+
+    def stamp(self, to_email):
+        """Serialized message for one recipient"""
+        if not to_email.isascii() or "\n" in to_email or "\r" in to_email:
+            raise ValueError(f"Unsupported recipient address: {to_email!r}")
+
+        link = (
+            self.link_prefix +
+            UNSUBSCRIBE_URL.format(quote(to_email)).encode("ascii") +
+            self.link_suffix
+        )
+        return "".join((
+            self.envelope_head, to_email, self.envelope_mid,
+            self.body_head, _b64(_pad3(link)), self.body_tail,
+            self.envelope_tail
+        ))
+
+
+_prepared = OrderedDict()
+_lock = threading.Lock()
+
+
+def prepare_message(sender, subject, html_content):
+    """Prepared message for this subject + digest, built on first use"""
+    key = (sender, subject, html_content)
+    with _lock:
+        prepared = _prepared.get(key)
+        if prepared is not None:
+            _prepared.move_to_end(key)
+            return prepared
+
+    prepared = PreparedMessage(sender, subject, html_content)
+    with _lock:
+        _prepared[key] = prepared
+        if len(_prepared) > MAX_PREPARED:
+            _prepared.popitem(last=False)
+    return prepared
@@ -0,0 +1,114 @@
+import json
+import os
+import threading
+import time
+
+import requests
+
+from rate_limit import Throttled, limiter, parse_retry_after
+
+NEWS_CACHE_FILE = "news_cache.json"
+# Seconds a NewsAPI response stays valid
+NEWS_CACHE_TTL = int(os.environ.get("NEWS_CACHE_TTL", "3600"))
+# Keep responses on disk between runs (off = per-run memo only)
+NEWS_CACHE_PERSIST = os.environ.get("NEWS_CACHE_PERSIST", "0") == "1"
+
+TIERS = ("city", "country", "global")
+
+
+def _request_news(url, params, timeout):
+    resp = requests.get(url, params=params, timeout=timeout)
+    if resp.status_code == 429:
+        raise Throttled("NewsAPI 429", parse_retry_after(resp.headers.get("Retry-After")))
+    return resp.json()
+
+
+class NewsCache:
+    """
+    Memoizes NewsAPI responses per cascade tier, keyed by endpoint and
+    query parameters (the API key is left out of the key). Fifty cities in
+    one country cost fifty city queries, one country query and at most
+    one global query.
+    """
+
+    def __init__(self, path=NEWS_CACHE_FILE, ttl=NEWS_CACHE_TTL, persist=NEWS_CACHE_PERSIST):
+        self.path = path
+        self.ttl = ttl
+        self.persist = persist
+        self.dirty = False
+        self.calls = {tier: 0 for tier in TIERS}
+        self.saved = {tier: 0 for tier in TIERS}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._entries = None
+
+    @property
+    def entries(self):
+        """Memoized responses, read from disk on first use when persisted"""
+        with self._lock:
+            if self._entries is None:
+                entries = {}
+                if self.persist:
+                    try:
+                        with open(self.path, 'r') as f:
+                            entries = json.load(f)
+                    except (FileNotFoundError, json.JSONDecodeError):
+                        entries = {}
+                now = time.time()
+                self._entries = {
+                    key: entry for key, entry in entries.items()
+                    if now - entry.get("fetched_at", 0) < self.ttl
+                }
+        return self._entries
+
+    @staticmethod
+    def key(tier, url, params):
+        query = "&".join(
+            f"{k}={v}" for k, v in sorted(params.items()) if k != "apiKey"
+        )
+        return f"{tier}|{url}?{query}"
+
+    def _key_lock(self, key):
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def fetch(self, tier, url, params, timeout=10):
+        """Return the `articles` list for a query, hitting NewsAPI only on a miss"""
+        key = self.key(tier, url, params)
+
+        # Concurrent callers for the same query wait for one request
+        with self._key_lock(key):
+            entry = self.entries.get(key)
+            if entry and time.time() - entry["fetched_at"] < self.ttl:
+                self.saved[tier] += 1
+                return entry["articles"]
+
+            self.calls[tier] += 1
+            data = limiter.call("newsapi", _request_news, url, params, timeout, max_retries=1)
+            articles = data.get("articles", [])
+
+            # Don't memoize errors such as rate limiting
+            if data.get("status") == "ok":
+                self.entries[key] = {"fetched_at": time.time(), "articles": articles}
+                self.dirty = True
+            return articles
+
+    def save(self):
+        if not self.persist or self._entries is None or not self.dirty:
+            return
+        try:
+            with open(self.path, 'w') as f:
+                json.dump(self.entries, f, separators=(",", ":"))
+            self.dirty = False
+        except Exception as e:
+            print(f"⚠️ Failed to save news cache: {e}")
+
+    def report(self):
+        """Calls made and calls saved per tier"""
+        return {
+            tier: {"calls": self.calls[tier], "saved": self.saved[tier]}
+            for tier in TIERS
+        }
@@ -0,0 +1,140 @@
+import asyncio
+import os
+
+# Per-stage worker counts and the size of the queue feeding each stage.
+# Override from the environment, e.g. SMARTBRIEF_GENERATE_CONCURRENCY=4
+FETCH_CONCURRENCY = int(os.environ.get("SMARTBRIEF_FETCH_CONCURRENCY", "4"))
+GENERATE_CONCURRENCY = int(os.environ.get("SMARTBRIEF_GENERATE_CONCURRENCY", "2"))
+SEND_CONCURRENCY = int(os.environ.get("SMARTBRIEF_SEND_CONCURRENCY", "4"))
+QUEUE_SIZE = int(os.environ.get("SMARTBRIEF_QUEUE_SIZE", "50"))
+
+
+def run_pipeline(subscribers, is_due, get_cached, fetch, generate, store, send, on_failed=None):
+    """
+    Run a distribution as three concurrent stages: fetch -> generate -> send.
+
+    The stage callables are the plain blocking functions from send_digest.py
+    and are run in worker threads:
+      is_due(sub)                       -> bool
+      get_cached(location)              -> html or None
+      fetch(sub)                        -> (weather, news) or None
+      generate(sub, weather, news)      -> html
+      store(location, html, weather, news)
+      send(sub, html)                   -> bool
+      on_failed(sub, html or None)      optional, for each subscriber that failed
+
+    Subscribers sharing a location wait on a single in-flight generation.
+    Returns a dict with sent / skipped / failed counts.
+    """
+    return asyncio.run(_run(subscribers, is_due, get_cached, fetch, generate, store, send, on_failed))
+
+
+async def _run(subscribers, is_due, get_cached, fetch, generate, store, send, on_failed):
+    stats = {"sent": 0, "skipped": 0, "failed": 0}
+
+    def fail(subs, message=None):
+        stats["failed"] += len(subs)
+        if on_failed:
+            for sub in subs:
+                try:
+                    on_failed(sub, message)
+                except Exception as e:
+                    print(f"   ⚠️ Failure hook error: {e}")
+
+    fetch_q = asyncio.Queue(maxsize=QUEUE_SIZE)
+    generate_q = asyncio.Queue(maxsize=QUEUE_SIZE)
+    send_q = asyncio.Queue(maxsize=QUEUE_SIZE)
+
+    # location -> subscribers waiting for that location's digest
+    pending = {}
+
+    # Each worker handles its whole item inside try/except, so an error in
+    # any callable fails the subscribers it affects instead of killing the
+    # worker and stranding the location's waiters (and the queue joins).
+    async def fetch_worker():
+        while True:
+            sub = await fetch_q.get()
+            location = sub[4]
+            owner = False
+            try:
+                message = get_cached(location)
+                if message:
+                    await send_q.put((sub, message))
+                    continue
+
+                if location in pending:
+                    pending[location].append(sub)
+                    continue
+
+                pending[location] = [sub]
+                owner = True
+                result = await asyncio.to_thread(fetch, sub)
+                if not result:
+                    fail(pending.pop(location))
+                    continue
+
+                weather, news = result
+                await generate_q.put((sub, weather, news))
+            except Exception as e:
+                print(f"   ❌ FAILED: {e}")
+                fail(pending.pop(location, [sub]) if owner else [sub])
+            finally:
+                fetch_q.task_done()
+
+    async def generate_worker():
+        while True:
+            sub, weather, news = await generate_q.get()
+            location = sub[4]
+            try:
+                message = await asyncio.to_thread(generate, sub, weather, news)
+                if not message:
+                    fail(pending.pop(location, [sub]))
+                    continue
+
+                # Cache before releasing waiters so later arrivals hit it
+                store(location, message, weather, news)
+                for waiting in pending.pop(location, [sub]):
+                    await send_q.put((waiting, message))
+            except Exception as e:
+                print(f"   ❌ FAILED: {e}")
+                fail(pending.pop(location, []))
+            finally:
+                generate_q.task_done()
+
+    async def send_worker():
+        while True:
+            sub, message = await send_q.get()
+            try:
+                ok = await asyncio.to_thread(send, sub, message)
+                if ok:
+                    stats["sent"] += 1
+                else:
+                    fail([sub], message)
+            except Exception as e:
+                print(f"   ❌ FAILED: {e}")
+                fail([sub], message)
+            finally:
+                send_q.task_done()
+
+    workers = (
+        [asyncio.create_task(fetch_worker()) for _ in range(FETCH_CONCURRENCY)] +
+        [asyncio.create_task(generate_worker()) for _ in range(GENERATE_CONCURRENCY)] +
+        [asyncio.create_task(send_worker()) for _ in range(SEND_CONCURRENCY)]
+    )
+
+    for sub in subscribers:
+        if not is_due(sub):
+            stats["skipped"] += 1
+            continue
+        await fetch_q.put(sub)
+
+    # Each stage only feeds the next one, so draining them in order is enough
+    await fetch_q.join()
+    await generate_q.join()
+    await send_q.join()
+
+    for w in workers:
+        w.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+
+    return stats
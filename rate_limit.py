@@ -0,0 +1,168 @@
+import os
+import random
+import smtplib
+import threading
+import time
+
+import metrics
+
+# provider -> "tokens per second/burst"; override with RATE_LIMIT_<PROVIDER>,
+# e.g. RATE_LIMIT_GEMINI=0.5/4
+DEFAULT_LIMITS = {
+    "smtp": "5/10",
+    "newsapi": "2/5",
+    "open_meteo": "5/10",
+    "zenquotes": "0.2/1",
+    "gemini": "0.16/2",
+}
+
+# Jittered exponential retry: base * 2^attempt seconds, capped
+BACKOFF_BASE = float(os.environ.get("RATE_LIMIT_BACKOFF_BASE", "1"))
+BACKOFF_CAP = float(os.environ.get("RATE_LIMIT_BACKOFF_CAP", "30"))
+
+
+class Throttled(Exception):
+    """Raised by a provider call that was rate limited (429 / Retry-After)"""
+
+    def __init__(self, message="rate limited", retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_throttle(exc):
+    """True for 429s from any client library and SMTP 4xx replies"""
+    if isinstance(exc, Throttled):
+        return True
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return 400 <= exc.smtp_code < 500
+    return getattr(exc, "code", None) == 429 or getattr(exc, "status_code", None) == 429
+
+
+class TokenBucket:
+    """
+    Token bucket whose rate halves when the provider throttles us and
+    creeps back towards the configured rate on each success.
+    """
+
+    def __init__(self, rate, burst):
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.waited = 0.0
+        self.throttles = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            # Reserve a token now and sleep off any deficit outside the lock
+            self.tokens -= 1
+            wait = max(0.0, -self.tokens / self.rate, self.blocked_until - now)
+            self.waited += wait
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def throttled(self, retry_after=None):
+        with self.lock:
+            self.throttles += 1
+            self.rate = max(self.base_rate / 16, self.rate / 2)
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+
+    def succeeded(self):
+        with self.lock:
+            if self.rate < self.base_rate:
+                self.rate = min(self.base_rate, self.rate + self.base_rate * 0.1)
+
+
+class RateLimiter:
+    """Shared token buckets for every external provider"""
+
+    def __init__(self, limits):
+        self.buckets = {}
+        for provider, spec in limits.items():
+            rate, _, burst = spec.partition("/")
+            self.buckets[provider] = TokenBucket(float(rate), float(burst or 1))
+
+    @classmethod
+    def from_env(cls):
+        limits = {
+            provider: os.environ.get(f"RATE_LIMIT_{provider.upper()}", spec)
+            for provider, spec in DEFAULT_LIMITS.items()
+        }
+        return cls(limits)
+
+    def scale(self, factor):
+        """Scale every provider's rate, e.g. 1/N when N processes share one quota"""
+        for bucket in self.buckets.values():
+            with bucket.lock:
+                bucket.base_rate *= factor
+                bucket.rate *= factor
+
+    def acquire(self, provider):
+        return self.buckets[provider].acquire()
+
+    def call(self, provider, func, *args, max_retries=2, retry_on=(), acquired=False, **kwargs):
+        """
+        Call `func` once a token is available. Throttles (and any exception
+        in `retry_on`) are retried up to `max_retries` times with jittered
+        exponential backoff; throttles also slow the provider's bucket.
+        `acquired` means the caller already took the first attempt's token.
+        """
+        bucket = self.buckets[provider]
+        for attempt in range(max_retries + 1):
+            if attempt or not acquired:
+                bucket.acquire()
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                throttle = is_throttle(e)
+                if not throttle and not isinstance(e, retry_on):
+                    raise
+                retry_after = getattr(e, "retry_after", None)
+                if throttle:
+                    bucket.throttled(retry_after)
+                    metrics.count("throttles", provider=provider)
+                if attempt == max_retries:
+                    metrics.count("retries_exhausted", provider=provider)
+                    raise
+                metrics.count("retries", provider=provider)
+
+                delay = retry_after or min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+                print(f"         ⏳ {provider}: retry {attempt + 1}/{max_retries} in {delay:.1f}s")
+                with bucket.lock:
+                    bucket.waited += delay
+                time.sleep(delay)
+                continue
+
+            bucket.succeeded()
+            return result
+
+    def report(self):
+        """Seconds spent waiting and throttles seen, per provider"""
+        return {
+            provider: {
+                "wait_s": round(bucket.waited, 2),
+                "throttles": bucket.throttles,
+                "rate": round(bucket.rate, 3)
+            }
+            for provider, bucket in self.buckets.items()
+        }
+
+
+limiter = RateLimiter.from_env()
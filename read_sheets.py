@@ -1,9 +1,62 @@
+import os
+import sqlite3
+from collections import namedtuple
 import requests
 
+import metrics
+
 # 🔹 Replace with your deployed Apps Script doGet URL
-APPS_SCRIPT_URL = "https://script.google.com/macros/s/AKfycbzVOQldUHHDhvtA0wk_6ZPF85I-e6OxfwObHPbjVhyNQzTIaulYT0BLwmcMEpErh-ueGQ/exec"
+APPS_SCRIPT_URL = os.environ.get(
+    "APPS_SCRIPT_URL",
+    "https://script.google.com/macros/s/AKfycbzVOQldUHHDhvtA0wk_6ZPF85I-e6OxfwObHPbjVhyNQzTIaulYT0BLwmcMEpErh-ueGQ/exec"
+)
 
-def get_subscribers_from_sheets():
+# "incremental" keeps a local snapshot and asks only for changes;
+# "full" downloads the whole list every run
+SYNC_MODE = os.environ.get("SUBSCRIBER_SYNC", "incremental")
+SNAPSHOT_FILE = "subscribers.db"
+# Subscribers per page when streaming the list
+PAGE_SIZE = int(os.environ.get("SUBSCRIBER_PAGE_SIZE", "1000"))
+
+# Compact record (a tuple with __slots__ = ()), same field order as the
+# original 7-tuple so `row_id, email, lat, lon, ... = sub` keeps working
+Subscriber = namedtuple(
+    "Subscriber",
+    ["row_id", "email", "lat", "lon", "location", "subscribed_at", "last_sent"]
+)
+
+SNAPSHOT_SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscribers (
+    row_id INTEGER PRIMARY KEY,
+    email TEXT NOT NULL,
+    latitude REAL NOT NULL,
+    longitude REAL NOT NULL,
+    location TEXT,
+    subscribed_at TEXT,
+    last_sent TEXT
+);
+CREATE TABLE IF NOT EXISTS sync_state (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def parse_subscriber(sub):
+    """Apps Script row -> the tuple format send_digest.py expects"""
+    return Subscriber(
+        sub[0],            # row_id
+        sub[1],            # email (plaintext)
+        float(sub[2]),     # latitude
+        float(sub[3]),     # longitude
+        sub[4],            # location
+        sub[5],            # subscribed_at
+        sub[6] if sub[6] else None  # last_sent_date
+    )
+
+
+@metrics.timed("sheet_fetch")
+def fetch_all_subscribers():
     """
     Fetch subscribers from Apps Script doGet() endpoint.
     Returns a list of tuples:
@@ -19,34 +72,214 @@ def get_subscribers_from_sheets():
             print(f"❌ Apps Script returned error: {data.get('message')}")
             return []
 
-        subscribers = []
-
-        for sub in data.get("subscribers", []):
-            # Keep exact same tuple format for send_digest.py
-            subscribers.append((
-                sub[0],            # row_id
-                sub[1],            # email (plaintext)
-                float(sub[2]),     # latitude
-                float(sub[3]),     # longitude
-                sub[4],            # location
-                sub[5],            # subscribed_at
-                sub[6] if sub[6] else None  # last_sent_date
-            ))
-
-        return subscribers
+        # Keep exact same tuple format for send_digest.py
+        return [parse_subscriber(sub) for sub in data.get("subscribers", [])]
 
     except Exception as e:
         print(f"❌ Failed to fetch subscribers: {e}")
         return []
 
 
-def update_last_sent_in_sheets(row_number, date_str):
+# ----------------------------
+# INCREMENTAL SYNC
+# ----------------------------
+def open_snapshot(path=SNAPSHOT_FILE):
+    conn = sqlite3.connect(path)
+    conn.executescript(SNAPSHOT_SCHEMA)
+    return conn
+
+
+def _get_state(conn, key):
+    row = conn.execute("SELECT value FROM sync_state WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+def _set_state(conn, key, value):
+    conn.execute(
+        "INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)", (key, value)
+    )
+
+
+def apply_changes(conn, changes):
     """
-    Optional: Update last_sent_date for subscriber.
-    This requires enabling Google Sheets API write access.
-    For now, we'll skip this in favor of checking last_sent in Python.
+    Apply delta rows to the snapshot:
+      {"op": "upsert", "row": [...]}        new subscriber or edited row
+      {"op": "delete", "row_id": 12}        unsubscribed
     """
-    pass
+    for change in changes:
+        op = change.get("op")
+        if op in ("upsert", "subscribe"):
+            conn.execute(
+                "INSERT OR REPLACE INTO subscribers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                parse_subscriber(change["row"])
+            )
+        elif op in ("delete", "unsubscribe"):
+            conn.execute("DELETE FROM subscribers WHERE row_id = ?", (change["row_id"],))
+
+
+@metrics.timed("sheet_sync")
+def sync_subscribers(path=SNAPSHOT_FILE):
+    """
+    Bring the local snapshot up to date with the sheet.
+
+    Sends the last revision as `?since=` and the last ETag as If-None-Match.
+    The endpoint may answer 304 (nothing changed), a delta
+    {"success": true, "revision": R, "changes": [...]}, or the classic full
+    {"success": true, "subscribers": [...]} list, which replaces the
+    snapshot. Returns True when the snapshot is current.
+    """
+    conn = open_snapshot(path)
+    try:
+        params = {}
+        headers = {}
+        revision = _get_state(conn, "revision")
+        etag = _get_state(conn, "etag")
+        if revision:
+            params["since"] = revision
+        if etag:
+            headers["If-None-Match"] = etag
+
+        response = requests.get(APPS_SCRIPT_URL, params=params, headers=headers, timeout=15)
+        if response.status_code == 304:
+            print("   ✓ Subscribers unchanged since last sync")
+            return True
+        response.raise_for_status()
+
+        data = response.json()
+        if not data.get("success"):
+            print(f"❌ Apps Script returned error: {data.get('message')}")
+            return False
+
+        with conn:
+            if "changes" in data and revision and not data.get("full"):
+                apply_changes(conn, data["changes"])
+                print(f"   ✓ Applied {len(data['changes'])} subscriber change(s)")
+            else:
+                conn.execute("DELETE FROM subscribers")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO subscribers VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (parse_subscriber(sub) for sub in data.get("subscribers", []))
+                )
+                print("   ✓ Full subscriber snapshot downloaded")
+
+            _set_state(conn, "revision", str(data["revision"]) if data.get("revision") is not None else None)
+            _set_state(conn, "etag", response.headers.get("ETag"))
+        return True
+
+    except Exception as e:
+        print(f"❌ Failed to sync subscribers: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def iter_snapshot_pages(path=SNAPSHOT_FILE, page_size=PAGE_SIZE):
+    """Stream the snapshot in row_id order, one page at a time"""
+    conn = open_snapshot(path)
+    try:
+        last_row_id = -1
+        while True:
+            with metrics.span("snapshot_page"):
+                rows = conn.execute(
+                    "SELECT row_id, email, latitude, longitude, location, subscribed_at, last_sent "
+                    "FROM subscribers WHERE row_id > ? ORDER BY row_id LIMIT ?",
+                    (last_row_id, page_size)
+                ).fetchall()
+            if not rows:
+                return
+            last_row_id = rows[-1][0]
+            yield [Subscriber._make(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def iter_snapshot_rows(row_ids, path=SNAPSHOT_FILE, page_size=PAGE_SIZE):
+    """Pages of just the given subscribers from the snapshot (gone rows are skipped)"""
+    row_ids = sorted(row_ids)
+    conn = open_snapshot(path)
+    try:
+        for start in range(0, len(row_ids), page_size):
+            chunk = row_ids[start:start + page_size]
+            rows = conn.execute(
+                "SELECT row_id, email, latitude, longitude, location, subscribed_at, last_sent "
+                f"FROM subscribers WHERE row_id IN ({','.join('?' * len(chunk))}) ORDER BY row_id",
+                chunk
+            ).fetchall()
+            if rows:
+                yield [Subscriber._make(row) for row in rows]
+    finally:
+        conn.close()
+
+
+def snapshot_version(path=SNAPSHOT_FILE):
+    """(revision, etag) of the last sync; changes whenever the snapshot does"""
+    conn = open_snapshot(path)
+    try:
+        return _get_state(conn, "revision"), _get_state(conn, "etag")
+    finally:
+        conn.close()
+
+
+def iter_subscriber_pages(page_size=PAGE_SIZE):
+    """
+    Subscribers in pages of `Subscriber` records. Incremental mode syncs
+    once and then streams the local snapshot, so only one page is held in
+    memory at a time.
+    """
+    if SYNC_MODE == "full":
+        subscribers = fetch_all_subscribers()
+        for start in range(0, len(subscribers), page_size):
+            yield subscribers[start:start + page_size]
+        return
+
+    # Never send from a snapshot that may be missing unsubscribes
+    if not sync_subscribers():
+        return
+    yield from iter_snapshot_pages(page_size=page_size)
+
+
+def get_subscribers_from_sheets():
+    """
+    Subscribers as a list of tuples:
+    (row_id, email, latitude, longitude, location, subscribed_at, last_sent_date)
+    """
+    return [sub for page in iter_subscriber_pages() for sub in page]
+
+
+@metrics.timed("sheet_write_back")
+def mark_sent_in_sheets(updates):
+    """
+    Write last_sent back for many subscribers in one Apps Script call.
+    `updates` is a list of (row_id, date_str). The doPost() handler is
+    expected to accept {"action": "mark_sent", "updates": [...]} and
+    answer {"success": true}. Returns True on success.
+    """
+    if not updates:
+        return True
+    try:
+        response = requests.post(
+            APPS_SCRIPT_URL,
+            json={
+                "action": "mark_sent",
+                "updates": [{"row_id": row_id, "last_sent": date_str} for row_id, date_str in updates]
+            },
+            timeout=30
+        )
+        response.raise_for_status()
+        data = response.json()
+        if not data.get("success"):
+            print(f"❌ Apps Script returned error: {data.get('message')}")
+            return False
+        return True
+
+    except Exception as e:
+        print(f"❌ Failed to write back last_sent: {e}")
+        return False
+
+
+def update_last_sent_in_sheets(row_number, date_str):
+    """Update last_sent_date for a single subscriber"""
+    return mark_sent_in_sheets([(row_number, date_str)])
 
 
 if __name__ == "__main__":
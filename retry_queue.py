@@ -0,0 +1,200 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+RETRY_FILE = "retry_queue.db"
+# Attempts (including the original failure) before an item is dead-lettered
+RETRY_MAX_ATTEMPTS = int(os.environ.get("RETRY_MAX_ATTEMPTS", "5"))
+# Backoff after the n-th failure: base * 2^(n-1) minutes, capped
+RETRY_BACKOFF_MINUTES = float(os.environ.get("RETRY_BACKOFF_MINUTES", "5"))
+RETRY_BACKOFF_CAP_MINUTES = float(os.environ.get("RETRY_BACKOFF_CAP_MINUTES", "120"))
+# Dead letters are kept this long for inspection
+RETRY_RETENTION_DAYS = int(os.environ.get("RETRY_RETENTION_DAYS", "7"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS retries (
+    email TEXT NOT NULL,
+    local_date TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    cache_date TEXT NOT NULL,
+    subscriber TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    next_at TEXT NOT NULL,
+    last_error TEXT,
+    dead INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (email, local_date)
+);
+CREATE INDEX IF NOT EXISTS retries_due ON retries (dead, next_at);
+"""
+
+# kind is "send" (the digest is in cache[cache_date]) or "fetch" (no digest yet)
+RetryItem = namedtuple(
+    "RetryItem",
+    ["email", "local_date", "kind", "cache_date", "subscriber", "attempts", "last_error"]
+)
+
+
+def _iso(moment):
+    return moment.isoformat(timespec="seconds")
+
+
+class RetryQueue:
+    """
+    Durable queue of sends that failed, keyed by email and the
+    subscriber's local date.
+
+    An item points at the cached digest rather than holding the HTML, so a
+    retry is a cache read plus SMTP. Items come due with exponential
+    backoff and are dead-lettered after `max_attempts`.
+    """
+
+    def __init__(self, path=RETRY_FILE, max_attempts=RETRY_MAX_ATTEMPTS,
+                 backoff_minutes=RETRY_BACKOFF_MINUTES, cap_minutes=RETRY_BACKOFF_CAP_MINUTES):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.backoff_minutes = backoff_minutes
+        self.cap_minutes = cap_minutes
+        self.queued = 0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    @property
+    def conn(self):
+        # Created on the first failure; clean runs never touch the file
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def exists(self):
+        return self._conn is not None or os.path.exists(self.path)
+
+    def backoff(self, attempts):
+        minutes = min(self.cap_minutes, self.backoff_minutes * 2 ** max(attempts - 1, 0))
+        return timedelta(minutes=minutes)
+
+    def add(self, sub, local_date, kind, cache_date, error=None):
+        """Queue a failed send; a later failure of a queued item goes through failed()"""
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            self.conn.execute(
+                "INSERT INTO retries (email, local_date, kind, cache_date, subscriber, attempts, next_at, last_error) "
+                "VALUES (?, ?, ?, ?, ?, 1, ?, ?) "
+                "ON CONFLICT (email, local_date) DO NOTHING",
+                (sub[1], local_date, kind, cache_date, json.dumps(list(sub)),
+                 _iso(now + self.backoff(1)), error)
+            )
+            self.queued += 1
+
+    def due(self, now_utc=None):
+        """Live items whose backoff has elapsed, oldest first"""
+        if not self.exists():
+            return []
+        now_utc = now_utc or datetime.now(timezone.utc)
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT email, local_date, kind, cache_date, subscriber, attempts, last_error "
+                "FROM retries WHERE dead = 0 AND next_at <= ? ORDER BY next_at",
+                (_iso(now_utc),)
+            ).fetchall()
+        return [RetryItem(*row[:4], json.loads(row[4]), *row[5:]) for row in rows]
+
+    def succeeded(self, item):
+        with self._lock:
+            self.conn.execute(
+                "DELETE FROM retries WHERE email = ? AND local_date = ?", (item.email, item.local_date)
+            )
+
+    def failed(self, item, error, kind=None, cache_date=None):
+        """
+        Back off again, or dead-letter the item once it is out of attempts.
+        `kind`/`cache_date` record a digest generated during the retry.
+        Returns True if the item is now dead.
+        """
+        attempts = item.attempts + 1
+        dead = attempts >= self.max_attempts
+        next_at = datetime.now(timezone.utc) + self.backoff(attempts)
+        with self._lock:
+            self.conn.execute(
+                "UPDATE retries SET attempts = ?, next_at = ?, last_error = ?, dead = ?, kind = ?, cache_date = ? "
+                "WHERE email = ? AND local_date = ?",
+                (attempts, _iso(next_at), error, int(dead), kind or item.kind,
+                 cache_date or item.cache_date, item.email, item.local_date)
+            )
+        return dead
+
+    def expire(self, item, reason):
+        """Dead-letter an item that can no longer be delivered (e.g. its day is over)"""
+        with self._lock:
+            self.conn.execute(
+                "UPDATE retries SET dead = 1, last_error = ? WHERE email = ? AND local_date = ?",
+                (reason, item.email, item.local_date)
+            )
+
+    def counts(self):
+        """{"pending": n, "dead": n}"""
+        if not self.exists():
+            return {"pending": 0, "dead": 0}
+        with self._lock:
+            rows = dict(self.conn.execute("SELECT dead, COUNT(*) FROM retries GROUP BY dead").fetchall())
+        return {"pending": rows.get(0, 0), "dead": rows.get(1, 0)}
+
+    def dead_letters(self):
+        if not self.exists():
+            return []
+        with self._lock:
+            return self.conn.execute(
+                "SELECT email, local_date, kind, attempts, last_error FROM retries "
+                "WHERE dead = 1 ORDER BY local_date, email"
+            ).fetchall()
+
+    def prune(self, retention_days=RETRY_RETENTION_DAYS):
+        if not self.exists():
+            return
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=retention_days)).strftime("%Y-%m-%d")
+        with self._lock:
+            self.conn.execute("DELETE FROM retries WHERE local_date < ?", (cutoff,))
+
+    def merge(self, path):
+        """Fold another queue file (e.g. one shard's) into this one; the further-along copy of an item wins"""
+        source = sqlite3.connect(path)
+        try:
+            rows = source.execute(
+                "SELECT email, local_date, kind, cache_date, subscriber, attempts, next_at, last_error, dead "
+                "FROM retries"
+            ).fetchall()
+        finally:
+            source.close()
+
+        with self._lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT INTO retries (email, local_date, kind, cache_date, subscriber, attempts, next_at, last_error, dead) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (email, local_date) DO UPDATE SET "
+                "kind = excluded.kind, cache_date = excluded.cache_date, attempts = excluded.attempts, "
+                "next_at = excluded.next_at, last_error = excluded.last_error, dead = excluded.dead "
+                "WHERE excluded.attempts > retries.attempts",
+                rows
+            )
+            self.conn.execute("COMMIT")
+        return len(rows)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+if __name__ == "__main__":
+    # python retry_queue.py [path]: show what is queued and what was dead-lettered
+    queue = RetryQueue(sys.argv[1] if len(sys.argv) > 1 else RETRY_FILE)
+    counts = queue.counts()
+    print(f"🔁 {counts['pending']} pending, ☠️  {counts['dead']} dead-lettered")
+    for email, local_date, kind, attempts, error in queue.dead_letters():
+        print(f"   {local_date}  {email}  {kind} x{attempts}: {error}")
@@ -0,0 +1,168 @@
+import json
+import os
+import threading
+from datetime import datetime, timezone
+
+from read_sheets import Subscriber
+
+JOURNAL_FILE = "run_journal.jsonl"
+# fsync after every batch of records (slower, survives power loss too)
+JOURNAL_FSYNC = os.environ.get("JOURNAL_FSYNC", "0") == "1"
+
+
+def read_records(path):
+    """Every intact record in a journal file ([] if there is none)"""
+    try:
+        with open(path, 'r') as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return []
+
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            # A kill mid-write leaves at most one torn line at the end
+            continue
+    return records
+
+
+def merge_journals(paths, target=JOURNAL_FILE):
+    """
+    Fold shard journals into one run at `target`, so an unsharded
+    --resume sees every shard's progress. Only shards that ran on the
+    latest day count, and the merged run is finished only if all of
+    them finished. Returns the number of journals merged.
+    """
+    runs = [records for records in map(read_records, paths)
+            if records and records[0].get("event") == "start"]
+    if not runs:
+        return 0
+    day = max(records[0].get("day") or "" for records in runs)
+    runs = [records for records in runs if (records[0].get("day") or "") == day]
+
+    merged = [{"event": "start", "run": runs[0][0].get("run"), "day": day, "resumes": None}]
+    totals = {}
+    for records in runs:
+        merged += [record for record in records if record.get("event") not in ("start", "end")]
+        for key, value in (records[-1].get("totals") or {}).items():
+            if isinstance(value, (int, float)):
+                totals[key] = totals.get(key, 0) + value
+    if all(records[-1].get("event") == "end" for records in runs):
+        merged.append({"event": "end", "totals": totals})
+
+    with open(target, 'w', encoding='utf-8') as f:
+        f.write("".join(json.dumps(record, separators=(",", ":")) + "\n" for record in merged))
+    return len(runs)
+
+
+class RunJournal:
+    """
+    Append-only record of one distribution run, one JSON object per line:
+
+        {"event": "start", "run": "...", "day": "2026-10-18"}
+        {"event": "queued", "sub": [...]}          due at 7 AM, not yet sent
+        {"event": "fetched", "location": "...", "weather": {...}, "news": [...]}
+        {"event": "generated", "location": "..."}
+        {"event": "sent", "email": "..."}
+        {"event": "end", "totals": {...}}
+
+    A run killed partway through leaves no "end" line. Opening the journal
+    with resume=True replays it so the next run can skip finished steps.
+    """
+
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = path
+        self.run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        self.day = None
+        self._file = None
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        # A long-lived process reuses one journal for many runs
+        self.resumed_from = None
+        self.queued = {}     # email -> Subscriber
+        self.fetched = {}    # location -> (weather, news)
+        self.generated = set()
+        self.sent = set()
+
+    # ------------------
+    # REPLAY
+    # ------------------
+    def replay(self, day):
+        """
+        Load the previous run's progress if it was interrupted on `day`.
+        Returns True when there is something to resume.
+        """
+        self._reset()
+        records = read_records(self.path)
+        if not records or records[0].get("event") != "start" or records[0].get("day") != day:
+            return False
+        if records[-1].get("event") == "end":
+            return False
+
+        for record in records:
+            event = record.get("event")
+            if event == "queued":
+                sub = Subscriber._make(record["sub"])
+                self.queued[sub.email] = sub
+            elif event == "fetched":
+                self.fetched[record["location"]] = (record["weather"], record["news"])
+            elif event == "generated":
+                self.generated.add(record["location"])
+            elif event == "sent":
+                self.sent.add(record["email"])
+
+        self.resumed_from = records[0].get("run")
+        return True
+
+    def unsent(self):
+        """Subscribers the interrupted run picked but never reached"""
+        return [sub for email, sub in self.queued.items() if email not in self.sent]
+
+    # ------------------
+    # APPEND
+    # ------------------
+    def start(self, day, resume=False):
+        """
+        Begin a run; resuming appends to the interrupted run's journal.
+        A fresh run starts from empty state.
+        """
+        if not resume:
+            self._reset()
+        self.day = day
+        self._file = open(self.path, 'a' if resume else 'w', encoding='utf-8')
+        self._write([{"event": "start", "run": self.run_id, "day": day, "resumes": self.resumed_from}])
+
+    def _write(self, records):
+        if self._file is None:
+            return
+        lines = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+        with self._lock:
+            self._file.write(lines)
+            self._file.flush()
+            if JOURNAL_FSYNC:
+                os.fsync(self._file.fileno())
+
+    def mark_queued(self, subscribers):
+        self._write([{"event": "queued", "sub": list(sub)} for sub in subscribers])
+
+    def mark_fetched(self, location, weather, news):
+        self.fetched[location] = (weather, news)
+        self._write([{"event": "fetched", "location": location, "weather": weather, "news": news}])
+
+    def mark_generated(self, location):
+        self.generated.add(location)
+        self._write([{"event": "generated", "location": location}])
+
+    def mark_sent(self, email):
+        self.sent.add(email)
+        self._write([{"event": "sent", "email": email}])
+
+    def finish(self, totals):
+        self._write([{"event": "end", "totals": totals}])
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,129 @@
+import heapq
+import os
+from datetime import datetime, timedelta
+
+import pytz
+
+# Minutes between subscriber syncs while the daemon waits for the next wave
+DAEMON_SYNC_MINUTES = int(os.environ.get("DAEMON_SYNC_MINUTES", "15"))
+# Delay before retrying a wave whose pre-send sync failed
+DAEMON_RETRY_SECONDS = int(os.environ.get("DAEMON_RETRY_SECONDS", "300"))
+
+
+def next_wave(tz_name, after_utc, hour=7):
+    """
+    Start of the first local `hour` in `tz_name` whose hour has not ended
+    by `after_utc`, as a UTC datetime.
+
+    Each day is localised on its own, so the result follows DST changes:
+    a zone on UTC-5 in winter fires at 12:00 UTC and at 11:00 UTC in summer.
+    """
+    tz = pytz.timezone(tz_name)
+    day = after_utc.astimezone(tz).date()
+    for _ in range(3):
+        start = tz.localize(datetime(day.year, day.month, day.day, hour))
+        start_utc = start.astimezone(pytz.utc)
+        if start_utc + timedelta(hours=1) > after_utc:
+            return start_utc
+        day += timedelta(days=1)
+    return start_utc
+
+
+class WaveSchedule:
+    """
+    Priority queue of timezone waves: when each zone next reaches 7 AM.
+
+    Subscribers are grouped by zone (`zones` maps zone -> row ids), so one
+    heap entry covers everyone in it. Rescheduling a zone leaves its old
+    heap entry behind; entries that no longer match `due_at` are skipped
+    when popped.
+    """
+
+    def __init__(self, hour=7):
+        self.hour = hour
+        self.zones = {}
+        self.due_at = {}
+        self._heap = []
+
+    def schedule(self, tz_name, due_utc):
+        self.due_at[tz_name] = due_utc
+        heapq.heappush(self._heap, (due_utc, tz_name))
+
+    def rebuild(self, zones, now_utc):
+        """
+        Replace the zone -> row ids map after a sync. New zones get their
+        next wave; zones with no subscribers left are dropped. Zones
+        already scheduled keep their time.
+        """
+        self.zones = zones
+        for tz_name in list(self.due_at):
+            if tz_name not in zones:
+                del self.due_at[tz_name]
+        for tz_name in zones:
+            if tz_name not in self.due_at:
+                self.schedule(tz_name, next_wave(tz_name, now_utc, self.hour))
+
+    def _prune(self):
+        while self._heap and self.due_at.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def next_due(self):
+        """UTC time of the earliest wave, or None when nothing is scheduled"""
+        self._prune()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now_utc):
+        """Zones whose wave has started by `now_utc`"""
+        zones = []
+        self._prune()
+        while self._heap and self._heap[0][0] <= now_utc:
+            _, tz_name = heapq.heappop(self._heap)
+            del self.due_at[tz_name]
+            zones.append(tz_name)
+            self._prune()
+        return zones
+
+    def reschedule(self, zones, now_utc):
+        """Queue the following day's wave for zones that just ran"""
+        for tz_name in zones:
+            if tz_name in self.zones:
+                self.schedule(tz_name, next_wave(tz_name, now_utc + timedelta(hours=1), self.hour))
+
+    def retry(self, zones, when_utc):
+        for tz_name in zones:
+            if tz_name in self.zones:
+                self.schedule(tz_name, when_utc)
+
+    def row_ids(self, zones):
+        ids = []
+        for tz_name in zones:
+            ids.extend(self.zones.get(tz_name, ()))
+        return ids
+
+
+class UpcomingWaves:
+    """
+    Locations whose next 7 AM starts within `hours` of `now_utc`, for
+    pre-generation. Grouped by the wave's UTC date, which is the day the
+    send run will look the digest up under: {date: {location: (sub, wave)}}.
+    """
+
+    def __init__(self, now_utc, hours, hour=7):
+        self.now_utc = now_utc
+        self.horizon = now_utc + timedelta(hours=hours)
+        self.hour = hour
+        self.by_date = {}
+        self._waves = {}
+
+    def add(self, sub, tz_name):
+        wave = self._waves.get(tz_name)
+        if wave is None:
+            wave = next_wave(tz_name, self.now_utc, self.hour)
+            self._waves[tz_name] = wave
+        # A wave already under way is the send run's job
+        if self.now_utc < wave <= self.horizon:
+            day = self.by_date.setdefault(wave.strftime("%Y-%m-%d"), {})
+            day.setdefault(sub[4], (sub, wave))
+
+    def __len__(self):
+        return sum(len(day) for day in self.by_date.values())
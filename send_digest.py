@@ -1,30 +1,59 @@
 import os
 import requests
-from datetime import datetime
+from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import pytz
-from timezonefinder import TimezoneFinder
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-import time
 import sys
 import re
 import json
-from read_sheets import get_subscribers_from_sheets
+import threading
+import time
+from read_sheets import (
+    Subscriber, iter_snapshot_pages, iter_snapshot_rows, iter_subscriber_pages, mark_sent_in_sheets,
+    snapshot_version, sync_subscribers
+)
+from pipeline import run_pipeline
+from smtp_pool import SMTPPool
+from tz_index import TimezoneIndex, bucket_by_offset, due_offsets, local_date, offset_label
+from weather import WEATHER_CACHE_FILE, WeatherCache, fetch_weather_batch
+from news_cache import NewsCache
+from summary_cache import SummaryCache, article_key, weather_key
+from digest_template import DIGEST_SCHEMA, validate_payload, news_items, payload_items, render_digest
+from mime_cache import prepare_message
+from rate_limit import limiter
+from send_ledger import LEDGER_FILE, LEDGER_WRITE_BACK, SendLedger
+from run_journal import JOURNAL_FILE, RunJournal
+from retry_queue import RETRY_FILE, RetryQueue
+from sharding import in_shard, shard_from_argv, shard_path
+from locations import NEWSAPI_COUNTRIES, LocationIndex, country_name, display_name
+from scheduler import DAEMON_RETRY_SECONDS, DAEMON_SYNC_MINUTES, UpcomingWaves, WaveSchedule
+from freshness import horizon_hours, is_fresh, make_entry, stale_parts
+from deadline import BACKFILL_WAIT, GEMINI_TIMEOUT, DeadlineExceeded, DeadlineRunner
+
+from cache_store import CACHE_DIR, CacheStore, open_cache
+import metrics
 
 CACHE_FILE = "digest_cache.json"
+# "sqlite" (day-sharded store in digest_cache/) or "json" (single legacy file)
+CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "sqlite")
 
+@metrics.timed("cache_load")
 def load_cache():
+    if CACHE_BACKEND != "json":
+        return open_cache(directory=shard_path(CACHE_DIR, SHARD))
     try:
-        with open(CACHE_FILE, 'r') as f:
+        with open(shard_path(CACHE_FILE, SHARD), 'r') as f:
             return json.load(f)
     except (FileNotFoundError, json.JSONDecodeError):
         return {}
 
+@metrics.timed("cache_save")
 def save_cache(cache):
+    if isinstance(cache, CacheStore):
+        # Store writes each row through as it is assigned
+        return
     try:
-        with open(CACHE_FILE, 'w') as f:
+        with open(shard_path(CACHE_FILE, SHARD), 'w') as f:
             json.dump(cache, f, indent=2)
     except Exception as e:
         print(f"⚠️ Failed to save cache: {e}")
@@ -42,93 +71,195 @@ NEWS_API_KEY = os.environ.get("NEWS_API_KEY")
 SENDER_EMAIL = os.environ.get("SENDER_EMAIL")
 SENDER_PASSWORD = os.environ.get("SENDER_PASSWORD")
 
+# SMTP settings (point SMTP_HOST/SMTP_PORT at a local sink for load tests)
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "465"))
+SMTP_USE_SSL = os.environ.get("SMTP_USE_SSL", "1") == "1"
+SMTP_POOL_SIZE = int(os.environ.get("SMTP_POOL_SIZE", "2"))
+SMTP_MAX_PER_CONNECTION = int(os.environ.get("SMTP_MAX_PER_CONNECTION", "100"))
+# Seconds a send waits for a free pooled connection before failing
+SMTP_ACQUIRE_TIMEOUT = float(os.environ.get("SMTP_ACQUIRE_TIMEOUT", "60"))
+
+# API endpoints (point them at bench/fake_services.py for offline runs)
+NEWS_API_URL = os.environ.get("NEWS_API_URL", "https://newsapi.org/v2")
+ZENQUOTES_URL = os.environ.get("ZENQUOTES_URL", "https://zenquotes.io/api/today")
+GEMINI_API_ENDPOINT = os.environ.get("GEMINI_API_ENDPOINT")
+
 # Check for test mode flag
 TEST_MODE = '--test' in sys.argv
+CONCURRENT_MODE = '--concurrent' in sys.argv
+TLDR_MODE = '--tldr-cache' in sys.argv
+STRUCTURED_MODE = '--structured' in sys.argv
+RESUME_MODE = '--resume' in sys.argv
+# Stay running and send each timezone's wave at its 7 AM instead of polling hourly
+DAEMON_MODE = '--daemon' in sys.argv
+# Build digests ahead of time for locations whose 7 AM is within PREGEN_HOURS
+PREGEN_MODE = '--pregenerate' in sys.argv
+PREGEN_HOURS = horizon_hours(float(os.environ.get("PREGEN_HOURS", "2")))
+# `--shard i/N`: handle only the locations that hash to shard i of N
+SHARD = shard_from_argv(sys.argv)
+# Hours past 7 AM in which an interrupted run's recipients are still sent
+RESUME_GRACE_HOURS = int(os.environ.get("RESUME_GRACE_HOURS", "2"))
+# Max unseen articles per batched summary request
+SUMMARY_BATCH_SIZE = int(os.environ.get("SUMMARY_BATCH_SIZE", "40"))
+
+# Heavy clients are created on first use, so runs where nobody is due
+# never import the Gemini SDK or build the timezone polygons
+model = None
+tf = None
+
+def get_model():
+    """Gemini model, configured on first use"""
+    global model
+    if model is None:
+        import google.generativeai as genai
+        if GEMINI_API_ENDPOINT:
+            genai.configure(api_key=GEMINI_API_KEY, transport="rest",
+                            client_options={"api_endpoint": GEMINI_API_ENDPOINT})
+        else:
+            genai.configure(api_key=GEMINI_API_KEY)
+        model = genai.GenerativeModel("gemini-2.5-flash")
+    return model
 
-# Initialize Gemini
-import google.generativeai as genai
-genai.configure(api_key=GEMINI_API_KEY)
-model = genai.GenerativeModel("gemini-2.5-flash")
+def get_timezone_finder():
+    global tf
+    if tf is None:
+        from timezonefinder import TimezoneFinder
+        tf = TimezoneFinder()
+    return tf
 
-tf = TimezoneFinder()
+tz_index = TimezoneIndex(lambda lat, lon: get_timezone_finder().timezone_at(lat=lat, lng=lon))
+location_index = LocationIndex(tz_lookup=tz_index.tz_name)
 gemini_calls = 0
+# Gemini calls wait GEMINI_DEADLINE_SECONDS at most; late results backfill the cache
+generation = DeadlineRunner()
+smtp_pool = None
+# Send workers can ask for the pool at the same moment; only one builds it
+smtp_pool_lock = threading.Lock()
+weather_cache = WeatherCache(shard_path(WEATHER_CACHE_FILE, SHARD), shared_path=WEATHER_CACHE_FILE)
+news_cache = NewsCache()
+summary_cache = SummaryCache()
+# Each shard keeps its own digest cache, ledger and journal;
+# merge_shards.py folds them back together afterwards
+send_ledger = SendLedger(shard_path(LEDGER_FILE, SHARD), shared_path=LEDGER_FILE)
+journal = RunJournal(shard_path(JOURNAL_FILE, SHARD))
+# Failed sends are retried from the cached digest on later runs
+retry_queue = RetryQueue(shard_path(RETRY_FILE, SHARD))
+if SHARD:
+    # Provider quotas are shared by every shard
+    limiter.scale(1 / SHARD[1])
 
 # ----------------------------
 # TIME CHECK
 # ----------------------------
-def is_7am_local_time(lat, lon, last_sent_date):
+def local_now(lat, lon):
+    """Current time in the subscriber's timezone (None if unknown)"""
+    tz_name = tz_index.tz_name(lat, lon)
+    if not tz_name:
+        return None
+    return datetime.now(pytz.utc).astimezone(pytz.timezone(tz_name))
+
+def digest_date(day=None):
+    """Date line of a digest: the recipient's local day, else the runner's"""
+    return (day or datetime.now()).strftime("%A, %B %d, %Y")
+
+def digest_subject(day=None):
+    """Subject line matching the digest's date line"""
+    return f"Your SmartBrief for {digest_date(day)}"
+
+def is_7am_local_time(lat, lon, last_sent_date, email=None):
     """Check if it's 7-8 AM in subscriber's local timezone"""
     try:
-        tz_name = tf.timezone_at(lat=lat, lng=lon)
-        if not tz_name:
+        local_time = local_now(lat, lon)
+        if local_time is None:
             return False
         
-        local_tz = pytz.timezone(tz_name)
-        local_time = datetime.now(pytz.utc).astimezone(local_tz)
         today_str = local_time.strftime("%Y-%m-%d")
         
         if last_sent_date == today_str:
             return False
         
+        # The sheet's last_sent lags behind; the local ledger does not
+        if email and send_ledger.has_sent(email, today_str):
+            return False
+        
         return local_time.hour == 7
         
     except Exception as e:
         print(f"      ⚠️ Time check error: {e}")
         return False
 
+def is_due_now(sub, carry_over=False):
+    """
+    Final check before a subscriber is served. Carry-over recipients from
+    an interrupted run are past 7 AM by design, so only the send ledger
+    gates them.
+    """
+    if TEST_MODE:
+        return True
+    if not carry_over:
+        return is_7am_local_time(sub[2], sub[3], sub[6], sub[1])
+    local_time = local_now(sub[2], sub[3])
+    return local_time is not None and not send_ledger.has_sent(sub[1], local_time.strftime("%Y-%m-%d"))
+
+def select_due_subscribers(subscribers, now_utc):
+    """
+    Bucket subscribers by current UTC offset and keep only the buckets
+    where it is 7 AM, minus anyone already served today according to the
+    sheet or the send ledger. Returns (due, skipped_count).
+    """
+    buckets = bucket_by_offset(subscribers, tz_index, now_utc)
+    
+    due = []
+    for offset in due_offsets(buckets, now_utc):
+        date_str = local_date(now_utc, offset)
+        bucket = buckets[offset]
+        served = send_ledger.sent_on((sub[1] for sub in bucket), date_str)
+        pending = [
+            sub for sub in bucket
+            if sub[6] != date_str and sub[1] not in served
+        ]
+        note = f" ({len(bucket) - len(pending)} already served)" if len(pending) < len(bucket) else ""
+        print(f"   🕖 {offset_label(offset)}: {len(pending)} subscriber(s) at 7 AM{note}")
+        due.extend(pending)
+    
+    return due, len(subscribers) - len(due)
+
 # ----------------------------
 # FETCH WEATHER
 # ----------------------------
+@metrics.timed("fetch_weather")
 def fetch_weather(lat, lon, max_retries=3):
-    """Fetch weather with retry logic"""
-    for attempt in range(max_retries):
-        try:
-            url = (
-                f"https://api.open-meteo.com/v1/forecast"
-                f"?latitude={lat}&longitude={lon}"
-                "&current_weather=true"
-                "&daily=temperature_2m_max,temperature_2m_min,"
-                "apparent_temperature_max,apparent_temperature_min,"
-                "sunrise,sunset,precipitation_sum,uv_index_max,cloudcover_mean"
-                "&timezone=auto"
-            )
-            
-            if attempt > 0:
-                print(f"         ⏳ Retry {attempt}/{max_retries-1}...")
-            
-            response = requests.get(url, timeout=15)
-            data = response.json()
-            
-            current = data.get("current_weather", {})
-            daily = data.get("daily", {})
-            
-            feels_like = (
-                daily.get("apparent_temperature_max", [current.get("temperature")])[0] +
-                daily.get("apparent_temperature_min", [current.get("temperature")])[0]
-            ) / 2
-            
-            return {
-                "max": daily.get("temperature_2m_max", [0])[0],
-                "min": daily.get("temperature_2m_min", [0])[0],
-                "feels_like": round(feels_like, 1),
-                "sunrise": daily.get("sunrise", ["06:00"])[0].split("T")[1],
-                "sunset": daily.get("sunset", ["18:00"])[0].split("T")[1],
-                "uv_index": daily.get("uv_index_max", [0])[0]
-            }
-            
-        except Exception as e:
-            if attempt < max_retries - 1:
-                time.sleep(2)
-                continue
-            else:
-                print(f"         ❌ Weather failed")
-                return None
+    """Fetch weather for one location (served from the grid cache when possible)"""
+    weather = weather_cache.get(lat, lon)
+    if weather:
+        return weather
     
-    return None
+    fetch_weather_batch([(lat, lon)], weather_cache, max_retries=max_retries)
+    weather = weather_cache.get(lat, lon)
+    if not weather:
+        print(f"         ❌ Weather failed")
+    return weather
+
+def prefetch_weather(subscribers, cache, today_str):
+    """Fetch forecasts for every due location missing from today's cache in batches"""
+    locations = cache[today_str]["locations"]
+    coords = {}
+    for sub in subscribers:
+        if sub[4] not in coords and sub[4] not in locations:
+            coords[sub[4]] = (sub[2], sub[3])
+    
+    if not coords:
+        return
+    
+    print(f"🌤️  Prefetching weather for {len(coords)} location(s)...")
+    fetched = fetch_weather_batch(list(coords.values()), weather_cache)
+    print(f"   ✓ {fetched} forecast(s) fetched, rest served from cache\n")
 
 # ----------------------------
 # FETCH WORLDWIDE NEWS
 # ----------------------------
+@metrics.timed("fetch_news")
 def fetch_news(location=None, max_articles=5):
     """Fetch news with a cascading strategy: City -> Country -> World to ensure 5 articles."""
     news_list = []
@@ -161,21 +292,12 @@ def fetch_news(location=None, max_articles=5):
         city = None
         country_code = None
         
-        country_map = {
-            "united states": "us", "usa": "us", "us": "us",
-            "india": "in", "uk": "gb", "united kingdom": "gb",
-            "australia": "au", "canada": "ca", "germany": "de",
-            "france": "fr", "italy": "it", "japan": "jp",
-            "china": "cn", "brazil": "br"
-        }
-
         if location:
-            parts = [p.strip() for p in location.split(',')]
+            parts = [p.strip() for p in display_name(location).split(',')]
             if len(parts) > 0:
                 city = parts[0]
-            if len(parts) > 1:
-                country_name = parts[-1].lower()
-                country_code = country_map.get(country_name)
+            # ISO index by name, else the country of the location's timezone
+            country_code = location_index.country(location)
 
         # 2. Strategy: City Specific
         if city and len(news_list) < max_articles:
@@ -188,9 +310,7 @@ def fetch_news(location=None, max_articles=5):
                     "pageSize": 5,
                     "apiKey": NEWS_API_KEY
                 }
-                resp = requests.get("https://newsapi.org/v2/everything", params=params, timeout=10)
-                data = resp.json()
-                add_articles(data.get("articles", []))
+                add_articles(news_cache.fetch("city", f"{NEWS_API_URL}/everything", params))
             except Exception as e:
                 print(f"         ⚠️ City fetch failed: {e}")
 
@@ -198,14 +318,24 @@ def fetch_news(location=None, max_articles=5):
         if country_code and len(news_list) < max_articles:
             print(f"         🔎 Searching news for country: {country_code}")
             try:
-                params = {
-                    "country": country_code,
-                    "pageSize": 10,  # Fetch more to fill gaps
-                    "apiKey": NEWS_API_KEY
-                }
-                resp = requests.get("https://newsapi.org/v2/top-headlines", params=params, timeout=10)
-                data = resp.json()
-                add_articles(data.get("articles", []))
+                if country_code in NEWSAPI_COUNTRIES:
+                    url = f"{NEWS_API_URL}/top-headlines"
+                    params = {
+                        "country": country_code,
+                        "pageSize": 10,  # Fetch more to fill gaps
+                        "apiKey": NEWS_API_KEY
+                    }
+                else:
+                    # No headline feed for this country; search it by name
+                    url = f"{NEWS_API_URL}/everything"
+                    params = {
+                        "q": country_name(country_code),
+                        "language": "en",
+                        "sortBy": "publishedAt",
+                        "pageSize": 10,
+                        "apiKey": NEWS_API_KEY
+                    }
+                add_articles(news_cache.fetch("country", url, params))
             except Exception as e:
                  print(f"         ⚠️ Country fetch failed: {e}")
 
@@ -219,38 +349,41 @@ def fetch_news(location=None, max_articles=5):
                     "pageSize": 10,
                     "apiKey": NEWS_API_KEY
                 }
-                resp = requests.get("https://newsapi.org/v2/top-headlines", params=params, timeout=10)
-                data = resp.json()
-                add_articles(data.get("articles", []))
+                add_articles(news_cache.fetch("global", f"{NEWS_API_URL}/top-headlines", params))
             except Exception as e:
                  print(f"         ⚠️ Global fetch failed: {e}")
 
         # Final check
         if not news_list:
+            metrics.count("fallbacks", stage="fetch_news")
             return [{"title": "No specific news today", "description": "Check back tomorrow!", "url": "https://news.google.com"}]
             
         return news_list[:max_articles]
 
     except Exception as e:
         print(f"         ❌ News fetch critical error: {e}")
+        metrics.count("fallbacks", stage="fetch_news")
         return [{"title": "News Unavailable", "description": "Could not fetch news at this time.", "url": "https://news.google.com"}]
 
 # ----------------------------
 # FETCH QUOTE
 # ----------------------------
+@metrics.timed("fetch_quote")
 def fetch_quote():
     """Fetch daily quote from ZenQuotes"""
     try:
-        response = requests.get("https://zenquotes.io/api/today", timeout=10)
+        response = limiter.call("zenquotes", requests.get, ZENQUOTES_URL, timeout=10)
         data = response.json()
         if data and isinstance(data, list) and len(data) > 0:
             return {
                 "q": data[0].get("q", "No quote today"),
                 "a": data[0].get("a", "Unknown")
             }
+        metrics.count("fallbacks", stage="fetch_quote")
         return {"q": "The best way to predict the future is to create it.", "a": "Peter Drucker"}
     except Exception as e:
         print(f"         ⚠️ Quote failed: {e}")
+        metrics.count("fallbacks", stage="fetch_quote")
         return {"q": "The best way to predict the future is to create it.", "a": "Peter Drucker"}
 
 # ----------------------------
@@ -265,12 +398,29 @@ def clean_html_response(text):
     text = re.sub(r'</body>.*?</html>', '', text, flags=re.DOTALL | re.IGNORECASE)
     return text
 
+def gemini_token():
+    # Taken before generation.run() starts the deadline clock
+    limiter.acquire("gemini")
+
 # ----------------------------
 # AI MESSAGE
 # ----------------------------
-def ai_message(weather, location, news_list, quote):
-    """Generate brief"""
-    today = datetime.now().strftime("%A, %B %d, %Y")
+@metrics.timed("ai_message")
+def ai_message(weather, location, news_list, quote, key=None, day=None):
+    """
+    Generate brief. `key` is the (date, location) cache slot; if Gemini
+    misses its deadline the fallback is returned and the late result is
+    parked under it for apply_backfill(). `day` is the recipients' local
+    time on the day the digest goes out, used for its date line.
+    """
+    if TLDR_MODE:
+        return tldr_message(weather, location, news_list, quote, day)
+    if STRUCTURED_MODE:
+        return structured_message(weather, location, news_list, quote, key, day)
+    
+    today = digest_date(day)
+    # `location` is the cell-keyed digest key; the email shows the name
+    location = display_name(location)
     
     news_text = ""
     for i, a in enumerate(news_list[:5], 1):
@@ -322,120 +472,218 @@ Natural. All 5 + URLs."""
         print("         🤖 Generating...")
         global gemini_calls
         gemini_calls += 1
-        response = model.generate_content(prompt)
-        content = clean_html_response(response.text)
+        metrics.count("gemini_calls")
+        content = generation.run(
+            key, lambda response: clean_html_response(response.text),
+            limiter.call, "gemini", get_model().generate_content, prompt,
+            acquire=gemini_token, acquired=True,
+            request_options={"timeout": GEMINI_TIMEOUT}
+        )
         print("         ✓ Ready")
         return content
         
+    except DeadlineExceeded as e:
+        print(f"         ⏱️ {e}; sending the local digest, AI version will backfill")
+        metrics.count("fallbacks", stage="deadline")
+        return render_digest(today, location, weather, quote, news_items(news_list))
     except Exception as e:
         print(f"         ⚠️ Failed")
+        metrics.count("fallbacks", stage="ai_message")
+        return render_digest(today, location, weather, quote, news_items(news_list))
+
+# ----------------------------
+# STRUCTURED MESSAGE
+# ----------------------------
+def structured_message(weather, location, news_list, quote, key=None, day=None):
+    """Ask for a compact JSON payload and render it locally"""
+    today = digest_date(day)
+    location = display_name(location)
+    news_list = news_list[:5]
+    
+    news_text = ""
+    for i, a in enumerate(news_list, 1):
+        news_text += f"{i}. {a['title']}\n{(a['description'] or '')[:200]}\n\n"
+    
+    prompt = f"""Morning brief for {location}, {today}.
+Weather: high {weather['max']}°C, low {weather['min']}°C, feels {weather['feels_like']}°C, UV {weather['uv_index']}.
+
+Return JSON with:
+- "weather": 1-2 helpful plain-text sentences about the day
+- "articles": exactly {len(news_list)} objects in the same order as the news below, each with a short "headline" and a 1-2 sentence plain-text "tldr"
+
+NEWS:
+{news_text}"""
+    
+    try:
+        print("         🤖 Generating (structured)...")
+        global gemini_calls
+        gemini_calls += 1
+        metrics.count("gemini_calls")
+        def finish(response):
+            payload = validate_payload(json.loads(response.text), len(news_list))
+            return render_digest(today, location, weather, quote,
+                                 payload_items(payload, news_list), payload["weather"])
         
-        news_html = ''
-        for idx, article in enumerate(news_list[:5]):
-            border = '' if idx == 4 else 'border-bottom:1px solid #E2E8F0;'
-            news_html += f"""
-<div style="margin-bottom:18px;padding-bottom:18px;{border}">
-<p style="font-weight:700;margin:0 0 8px 0;font-size:1rem;color:#0F172A;line-height:1.5">{article['title'][:120]}</p>
-<p style="font-size:0.95rem;color:#334155;margin:0 0 10px 0;line-height:1.6">{article['description'][:180] if article['description'] else 'Full story available.'}</p>
-<a href="{article['url']}" style="color:#0D9488;font-size:0.9rem;text-decoration:none;font-weight:600">Read more →</a>
-</div>
-"""
+        content = generation.run(
+            key, finish,
+            limiter.call, "gemini", get_model().generate_content,
+            prompt,
+            acquire=gemini_token, acquired=True,
+            generation_config={
+                "response_mime_type": "application/json",
+                "response_schema": DIGEST_SCHEMA
+            },
+            request_options={"timeout": GEMINI_TIMEOUT}
+        )
+        print("         ✓ Ready")
+        return content
         
-        return f"""
-<h2 style="color:#0F172A;margin:0 0 10px 0;font-size:1.75rem;font-weight:700">Hello! 👋</h2>
-<p style="color:#334155;font-size:1rem;margin:0 0 32px 0">{today} • {location}</p>
+    except DeadlineExceeded as e:
+        print(f"         ⏱️ {e}; sending the local digest, AI version will backfill")
+        metrics.count("fallbacks", stage="deadline")
+        return render_digest(today, location, weather, quote, news_items(news_list))
+    except Exception as e:
+        print(f"         ⚠️ Failed: {e}")
+        metrics.count("fallbacks", stage="structured_message")
+        return render_digest(today, location, weather, quote, news_items(news_list))
 
-<div style="margin-bottom:28px;padding:20px;background:#F8FAFC;border-radius:12px;border-left:4px solid #6366F1">
-<p style="font-size:1.1rem;font-style:italic;color:#1E293B;margin:0 0 8px 0">"{quote['q']}"</p>
-<p style="font-size:0.9rem;color:#64748B;margin:0;font-weight:600">— {quote['a']}</p>
-</div>
+# ----------------------------
+# TLDR CACHE
+# ----------------------------
+@metrics.timed("summarise_batch")
+def summarise_batch(articles, weather_by_location):
+    """
+    One Gemini request for every article and weather sentence not yet in
+    the summary cache. Results are stored by content hash.
+    """
+    articles = [a for a in articles if article_key(a) not in summary_cache]
+    weather_by_location = {
+        loc: w for loc, w in weather_by_location.items()
+        if weather_key(loc, w) not in summary_cache
+    }
+    if not articles and not weather_by_location:
+        return
+    
+    news_text = ""
+    for a in articles:
+        news_text += f"[{article_key(a)}] {a['title']}\n{(a['description'] or '')[:200]}\n\n"
+    
+    weather_text = ""
+    for loc, w in weather_by_location.items():
+        weather_text += (f"[{weather_key(loc, w)}] {display_name(loc)}: high {w['max']}°C, low {w['min']}°C, "
+                         f"feels {w['feels_like']}°C, UV {w['uv_index']}\n")
+    
+    prompt = f"""Return ONLY JSON: {{"<id>": "<text>", ...}} using the ids in brackets.
+For each NEWS id: a 1-2 sentence plain-text TLDR.
+For each WEATHER id: 1-2 helpful plain-text sentences about the day.
 
-<div style="background:#ECFDF5;padding:28px;border-radius:16px;margin-bottom:28px;border-left:5px solid #14B8A6">
-<h3 style="color:#0D9488;font-size:1.2rem;margin:0 0 16px 0;font-weight:700">🌤️ Weather</h3>
-<div style="margin-bottom:14px">
-<span style="font-size:1rem;color:#0F172A;margin-right:20px"><strong>High:</strong> {weather['max']}°C</span>
-<span style="font-size:1rem;color:#0F172A;margin-right:20px"><strong>Low:</strong> {weather['min']}°C</span>
-<span style="font-size:1rem;color:#0F172A;margin-right:20px"><strong>Feels:</strong> {weather['feels_like']}°C</span>
-<span style="font-size:1rem;color:#0F172A"><strong>UV:</strong> {weather['uv_index']}</span>
-</div>
-<p style="font-size:1rem;color:#1E293B;line-height:1.7;margin:0 0 12px 0">Temperature from {weather['min']}°C to {weather['max']}°C. Conditions look good.</p>
-<p style="font-size:0.9rem;color:#334155;margin:0">☀️ {weather['sunrise']} • 🌙 {weather['sunset']}</p>
-</div>
+NEWS:
+{news_text}
+WEATHER:
+{weather_text}"""
+    
+    try:
+        print(f"         🤖 Summarising {len(articles)} article(s), {len(weather_by_location)} forecast(s)...")
+        global gemini_calls
+        gemini_calls += 1
+        metrics.count("gemini_calls")
+        summaries = generation.run(
+            None, lambda response: json.loads(response.text),
+            limiter.call, "gemini", get_model().generate_content,
+            prompt,
+            acquire=gemini_token, acquired=True,
+            generation_config={"response_mime_type": "application/json"},
+            request_options={"timeout": GEMINI_TIMEOUT}
+        )
+        for key, text in summaries.items():
+            if isinstance(text, str) and text.strip():
+                summary_cache.put(key, text.strip())
+        print("         ✓ Ready")
+    except DeadlineExceeded as e:
+        print(f"         ⏱️ Summary batch: {e}; digests use article descriptions")
+        metrics.count("fallbacks", stage="deadline")
+    except Exception as e:
+        print(f"         ⚠️ Summary batch failed: {e}")
+        metrics.count("fallbacks", stage="summarise_batch")
 
-<div style="background:#ffffff;padding:28px;border-radius:16px;border-left:5px solid #EF4444;box-shadow:0 4px 12px rgba(0,0,0,0.06)">
-<h3 style="color:#DC2626;font-size:1.2rem;margin:0 0 20px 0;font-weight:700">📰 Top 5 News • TLDR</h3>
-{news_html}
-</div>
+def tldr_message(weather, location, news_list, quote, day=None):
+    """Render a digest from cached TLDRs, summarising only unseen articles"""
+    news_list = news_list[:5]
+    summarise_batch(news_list, {location: weather})
+    
+    tldrs = {}
+    for a in news_list:
+        tldrs[a['url']] = summary_cache.get(article_key(a))
+    weather_note = summary_cache.get(weather_key(location, weather))
+    
+    return render_digest(digest_date(day), display_name(location), weather, quote, news_items(news_list, tldrs), weather_note)
 
-<p style="text-align:center;color:#334155;font-size:1rem;margin:24px 0 0 0;font-weight:600">Have a great day! 🚀</p>
-"""
+def prefetch_summaries(subscribers, cache, today_str):
+    """Summarise all due, uncached locations' news in as few requests as possible"""
+    locations = cache[today_str]["locations"]
+    articles = {}
+    weather_by_location = {}
+    
+    for sub in subscribers:
+        location = sub[4]
+        if location in locations or location in weather_by_location:
+            continue
+        weather = fetch_weather(sub[2], sub[3])
+        if not weather:
+            continue
+        weather_by_location[location] = weather
+        for a in fetch_news(location)[:5]:
+            articles.setdefault(article_key(a), a)
+    
+    if not weather_by_location:
+        return
+    
+    print(f"🧠 Summarising news for {len(weather_by_location)} location(s)...")
+    pending = list(articles.values())
+    forecasts = list(weather_by_location.items())
+    for start in range(0, max(len(pending), len(forecasts)), SUMMARY_BATCH_SIZE):
+        summarise_batch(
+            pending[start:start + SUMMARY_BATCH_SIZE],
+            dict(forecasts[start:start + SUMMARY_BATCH_SIZE])
+        )
+    summary_cache.save()
+    print()
+
+# ----------------------------
+# SMTP POOL
+# ----------------------------
+def get_smtp_pool():
+    """Shared pool of authenticated SMTP connections for this run"""
+    global smtp_pool
+    if smtp_pool is None:
+        with smtp_pool_lock:
+            if smtp_pool is None:
+                smtp_pool = SMTPPool(
+                    SMTP_HOST, SMTP_PORT,
+                    username=SENDER_EMAIL,
+                    password=SENDER_PASSWORD,
+                    use_ssl=SMTP_USE_SSL,
+                    size=SMTP_POOL_SIZE,
+                    max_per_connection=SMTP_MAX_PER_CONNECTION,
+                    acquire_timeout=SMTP_ACQUIRE_TIMEOUT
+                )
+    return smtp_pool
+
+def close_smtp_pool():
+    if smtp_pool is not None:
+        smtp_pool.close()
 
 # ----------------------------
 # SEND EMAIL - DARK MODE FIX
 # ----------------------------
+@metrics.timed("send_email")
 def send_email(to_email, subject, html_content):
     """Send email with high contrast for dark mode"""
     try:
-        msg = MIMEMultipart("alternative")
-        msg["From"] = SENDER_EMAIL
-        msg["To"] = to_email
-        msg["Subject"] = subject
-        
-        from urllib.parse import quote
-        unsubscribe_url = f"https://surya8055.github.io/SmartBrief/unsubscribe.html?email={quote(to_email)}"
-        
-        # Using much darker colors that show up in dark mode
-        full_html = f"""
-<!DOCTYPE html>
-<html>
-<head>
-  <meta charset="UTF-8">
-  <meta name="viewport" content="width=device-width, initial-scale=1.0">
-  <meta name="color-scheme" content="light only">
-  <meta name="supported-color-schemes" content="light">
-  <style>
-    * {{ color-scheme: light only !important; }}
-    body {{ background-color: #F0FDFA !important; }}
-  </style>
-</head>
-<body style="margin:0;padding:0;font-family:'Segoe UI',Arial,sans-serif;background-color:#F0FDFA !important;padding:40px 20px">
-  
-  <div style="max-width:700px;margin:0 auto;background-color:#ffffff !important;border-radius:24px;overflow:hidden;box-shadow:0 10px 40px rgba(0,0,0,0.1);border:1px solid #14B8A6">
-    
-    <!-- Header -->
-    <div style="background:linear-gradient(135deg,#14B8A6 0%,#1E40AF 100%);padding:40px 36px;text-align:center">
-      <div style="margin-bottom:14px">
-        <div style="display:inline-block;width:56px;height:56px;background-color:#ffffff !important;border-radius:14px;line-height:56px;text-align:center">
-          <span style="font-family:'Segoe UI',Arial,sans-serif;font-weight:900;font-size:1.7rem;color:#14B8A6 !important">SB</span>
-        </div>
-      </div>
-      <h1 style="color:#ffffff !important;font-size:2rem;font-weight:800;margin:0 0 6px 0">SmartBrief</h1>
-      <p style="color:#ffffff !important;font-size:1.05rem;margin:0">Start Your Day Smart</p>
-    </div>
-    
-    <!-- Content -->
-    <div style="padding:40px 36px;background-color:#ffffff !important;color:#0F172A !important">
-      {html_content}
-    </div>
-    
-    <!-- Footer -->
-    <div style="background-color:#F8FAFC !important;padding:24px 36px;border-top:1px solid #CBD5E1;text-align:center">
-      <p style="color:#334155 !important;font-size:0.9rem;margin:0">
-        <a href="{unsubscribe_url}" style="color:#0D9488 !important;text-decoration:none;font-weight:600">Unsubscribe</a> • © 2026 SmartBrief
-      </p>
-    </div>
-    
-  </div>
-  
-</body>
-</html>
-        """
-        
-        msg.attach(MIMEText(full_html, "html"))
-        
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465, timeout=15) as server:
-            server.login(SENDER_EMAIL, SENDER_PASSWORD)
-            server.sendmail(SENDER_EMAIL, to_email, msg.as_string())
+        # Envelope and body are encoded once per subject + digest;
+        # only the recipient header and unsubscribe link change here
+        prepared = prepare_message(SENDER_EMAIL, subject, html_content)
+        limiter.call("smtp", get_smtp_pool().send, SENDER_EMAIL, to_email, prepared.stamp(to_email))
         
         return True
         
@@ -443,62 +691,117 @@ def send_email(to_email, subject, html_content):
         print(f"         ❌ Send failed: {e}")
         return False
 
+def record_send(sub):
+    """Note a delivered digest in the journal and ledger (test sends skip the ledger)"""
+    journal.mark_sent(sub[1])
+    if TEST_MODE:
+        return
+    local_time = local_now(sub[2], sub[3])
+    if local_time is not None:
+        send_ledger.record(sub[0], sub[1], local_time.strftime("%Y-%m-%d"))
+
+def queue_retry(sub, cache_date, message=None, error=None):
+    """
+    Queue a subscriber whose digest didn't go out. With a message the
+    digest is already in cache[cache_date] and only the send is retried.
+    """
+    if TEST_MODE:
+        return
+    local_time = local_now(sub[2], sub[3])
+    if local_time is None:
+        return
+    kind = "send" if message else "fetch"
+    retry_queue.add(sub, local_time.strftime("%Y-%m-%d"), kind, cache_date, error)
+    metrics.count("retries_queued", kind=kind)
+
+def flush_ledger():
+    """Write ledger entries back to the sheet's last_sent column in batches"""
+    if not LEDGER_WRITE_BACK:
+        send_ledger.prune(write_back=False)
+        return
+    synced = send_ledger.flush(mark_sent_in_sheets)
+    if synced:
+        print(f"📝 Wrote last_sent back for {synced} subscriber(s)")
+
 # ----------------------------
-# MAIN
+# CACHED DIGESTS
 # ----------------------------
-def main():
-    print("\n" + "="*70)
-    print(f"🚀 SmartBrief Distribution")
-    
-    if TEST_MODE:
-        print(f"🧪 TEST MODE")
-    
-    now_utc = datetime.now(pytz.utc)
-    print(f"⏰ {now_utc.strftime('%Y-%m-%d %H:%M:%S %Z')}")
-    print("="*70 + "\n")
-    
-    # ------------------
-    # CACHE SETUP
-    # ------------------
-    today_str = now_utc.strftime("%Y-%m-%d")
-    cache = load_cache()
-    
-    # Initialize today's cache structure if missing
-    if today_str not in cache:
-        cache[today_str] = {
-            "quote": None,
-            "locations": {}
-        }
-    
-    # ------------------
-    # 1. QUOTE (Global)
-    # ------------------
-    print("� Checking quote...")
-    quote = cache[today_str].get("quote")
-    
-    if not quote:
-        print("   Fetching new quote...")
-        quote = fetch_quote()
-        cache[today_str]["quote"] = quote
+def cached_digest(entry, at_utc):
+    """Cached html that the freshness policy allows sending at `at_utc`, else None"""
+    if not entry:
+        return None
+    if not isinstance(entry, dict):
+        return entry
+    if stale_parts(entry, at_utc):
+        return None
+    return entry.get("html")
+
+def apply_backfill(cache, wait_s=0):
+    """Swap fallback digests for Gemini results that arrived after their deadline"""
+    def stored(key):
+        # The fallback may still be on its way into the cache
+        date_str, location = key
+        return date_str in cache and isinstance(cache[date_str]["locations"].get(location), dict)
+
+    applied = 0
+    for (date_str, location), html in generation.collect(wait_s, accept=stored):
+        locations = cache[date_str]["locations"]
+        locations[location] = dict(locations[location], html=html)
+        applied += 1
+    if applied:
         save_cache(cache)
-        print(f"   ✓ Saved: {quote['a']}")
+        metrics.count("backfilled", applied)
+        print(f"   🩹 {applied} late AI digest(s) written to the cache")
+    return applied
+
+def cache_result(entry, message):
+    if message:
+        return "hit"
+    return "stale" if entry else "miss"
+
+def fetch_inputs(sub, entry=None, at_utc=None):
+    """
+    Weather and news for generating a location's digest: from the
+    interrupted run's journal, from the still-fresh half of a stale cache
+    entry, or fetched. Returns (weather, news, stamps) where stamps go to
+    make_entry(), or None when the forecast fails.
+    """
+    _, _, lat, lon, location, _, _ = sub
+    # Only an interrupted run's data is reused; a fresh run fetches anew
+    if journal.resumed_from and location in journal.fetched:
+        print(f"   📒 Weather & news from interrupted run: {location}")
+        weather, news = journal.fetched[location]
+        return weather, news, {}
+
+    at_utc = at_utc or datetime.now(pytz.utc)
+    reuse = isinstance(entry, dict)
+    stamps = {}
+
+    if reuse and entry.get("weather") and is_fresh(entry, "weather", at_utc):
+        weather = entry["weather"]
+        stamps["weather_at"] = entry.get("weather_at")
     else:
-        print(f"   ✓ Loaded from cache: {quote['a']}")
-    
-    print("-" * 30)
+        print(f"   🌤️  Weather: {location}")
+        weather = fetch_weather(lat, lon, max_retries=3)
+        if not weather:
+            return None
 
-    # ------------------
-    # 2. SUBSCRIBERS
-    # ------------------
-    print("�📊 Reading subscribers...")
-    subscribers = get_subscribers_from_sheets()
-    
-    if not subscribers:
-        print("⚠️  No active subscribers\n")
-        return
-    
-    print(f"✅ Found {len(subscribers)} subscriber(s)\n")
-    
+    if reuse and entry.get("news") is not None and is_fresh(entry, "news", at_utc):
+        news = entry["news"]
+        stamps["news_at"] = entry.get("news_at")
+    else:
+        print(f"   📰 News: {location}")
+        news = fetch_news(location)
+        print(f"      ✓ {len(news)} articles")
+
+    journal.mark_fetched(location, weather, news)
+    return weather, news, stamps
+
+# ----------------------------
+# SEQUENTIAL RUN
+# ----------------------------
+def run_sequential(subscribers, cache, today_str, quote, carry_over=False):
+    """Process due subscribers one at a time (default mode)"""
     sent_count = 0
     skipped_count = 0
     failed_count = 0
@@ -510,7 +813,7 @@ def main():
         print(f"📧 [{idx}/{len(subscribers)}] {location}")
         print(f"{'='*60}")
         
-        if not TEST_MODE and not is_7am_local_time(lat, lon, last_sent):
+        if not is_due_now(sub, carry_over):
             print(f"   ⏭️  Skipping\n")
             skipped_count += 1
             continue
@@ -518,75 +821,591 @@ def main():
         if TEST_MODE:
             print(f"   🧪 TEST MODE")
         
+        message = None
+        # The recipient's local day dates both the subject and the body
+        day = local_now(lat, lon)
         try:
             # Check Cache for Location
-            message = None
+            if generation.pending:
+                apply_backfill(cache)
             cache_entry = cache[today_str]["locations"].get(location)
+            message = cached_digest(cache_entry, datetime.now(pytz.utc))
+            metrics.count("digest_cache", result=cache_result(cache_entry, message))
             
-            if cache_entry:
+            if message:
                 if isinstance(cache_entry, dict):
                     print("   📦 Using cached digest (expanded)...")
-                    message = cache_entry.get("html")
                 else:
                     print("   📦 Using cached digest (legacy string)...")
-                    message = cache_entry
             
             if not message:
                 # GENERATE NEW
-                print("   🌤️  Weather...")
-                weather = fetch_weather(lat, lon, max_retries=3)
-                
-                if not weather:
+                inputs = fetch_inputs(sub, cache_entry)
+                if not inputs:
                     failed_count += 1
-                    time.sleep(2)
+                    queue_retry(sub, today_str, error="weather fetch failed")
                     continue
-                print("      ✓ Done")
-                
-                print("   📰 News...")
-                news = fetch_news(location)
-                print(f"      ✓ {len(news)} articles")
+                weather, news, stamps = inputs
                 
                 print("   ✨ Generating...")
-                message = ai_message(weather, location, news, quote)
+                message = ai_message(weather, location, news, quote, key=(today_str, location), day=day)
                 print("      ✓ Done")
                 
                 # Save to cache (Expanded Format)
-                cache[today_str]["locations"][location] = {
-                    "html": message,
-                    "weather": weather,
-                    "news": news
-                }
+                cache[today_str]["locations"][location] = make_entry(message, weather, news, **stamps)
                 save_cache(cache)
+                journal.mark_generated(location)
                 print("      ✓ Saved to cache (with raw data)")
-                
-                time.sleep(2)
             
             print("   📤 Sending...")
-            today_subject = datetime.now().strftime("%A, %B %d, %Y")
-            subject = f"Your SmartBrief for {today_subject}"
             
-            if send_email(email, subject, message):
+            if send_email(email, digest_subject(day), message):
+                record_send(sub)
                 print("      ✓ Sent!")
                 sent_count += 1
             else:
                 failed_count += 1
-            
-            if idx < len(subscribers):
-                print(f"   ⏳ Wait 3s...")
-                time.sleep(3)
+                queue_retry(sub, today_str, message, "send failed")
             
         except Exception as e:
             failed_count += 1
             print(f"   ❌ FAILED: {e}")
-            time.sleep(2)
+            queue_retry(sub, today_str, message, str(e))
     
+    return {"sent": sent_count, "skipped": skipped_count, "failed": failed_count}
+
+# ----------------------------
+# CONCURRENT RUN
+# ----------------------------
+def run_concurrent(subscribers, cache, today_str, quote, carry_over=False):
+    """Run the distribution through the staged pipeline (--concurrent)"""
+    locations = cache[today_str]["locations"]
+
+    def is_due(sub):
+        return is_due_now(sub, carry_over)
+
+    stamps = {}
+
+    def get_cached(location):
+        if generation.pending:
+            apply_backfill(cache)
+        entry = locations.get(location)
+        message = cached_digest(entry, datetime.now(pytz.utc))
+        metrics.count("digest_cache", result=cache_result(entry, message))
+        return message
+
+    def fetch(sub):
+        inputs = fetch_inputs(sub, locations.get(sub[4]))
+        if not inputs:
+            return None
+        weather, news, stamps[sub[4]] = inputs
+        return weather, news
+
+    def generate(sub, weather, news):
+        print(f"   ✨ Generating: {sub[4]}")
+        return ai_message(weather, sub[4], news, quote, key=(today_str, sub[4]), day=local_now(sub[2], sub[3]))
+
+    def store(location, message, weather, news):
+        locations[location] = make_entry(message, weather, news, **stamps.pop(location, {}))
+        save_cache(cache)
+        journal.mark_generated(location)
+        print(f"      ✓ Saved to cache: {location}")
+
+    def send(sub, message):
+        if send_email(sub[1], digest_subject(local_now(sub[2], sub[3])), message):
+            record_send(sub)
+            print(f"      ✓ Sent: {sub[4]}")
+            return True
+        return False
+
+    def failed(sub, message):
+        queue_retry(sub, today_str, message, "send failed" if message else "fetch or generation failed")
+
+    return run_pipeline(subscribers, is_due, get_cached, fetch, generate, store, send, on_failed=failed)
+
+# ----------------------------
+# RETRY QUEUE
+# ----------------------------
+def queued_digest(cache, item, today_str):
+    """A queued item's digest from the cache, sent as rendered (None if evicted)"""
+    for date_str in (item.cache_date, today_str):
+        if date_str in cache:
+            entry = cache[date_str]["locations"].get(item.subscriber[4])
+            message = entry.get("html") if isinstance(entry, dict) else entry
+            if message:
+                return message
+    return None
+
+def drain_retries(items, cache, today_str, quote):
+    """
+    Retry queued failures whose backoff has elapsed. A queued send reuses
+    the cached HTML; only subscribers that never got a digest go back
+    through weather, news and Gemini. Returns sent / failed / dead counts.
+    """
+    stats = {"sent": 0, "failed": 0, "dead": 0}
+    for item in items:
+        sub = Subscriber(*item.subscriber)
+        local_time = local_now(sub.lat, sub.lon)
+        if local_time is None or local_time.strftime("%Y-%m-%d") != item.local_date:
+            retry_queue.expire(item, "delivery day passed")
+            stats["dead"] += 1
+            continue
+        if send_ledger.has_sent(sub.email, item.local_date):
+            retry_queue.succeeded(item)
+            continue
+
+        message = queued_digest(cache, item, today_str)
+        cache_date = item.cache_date
+        error = "send failed"
+        try:
+            if not message:
+                inputs = fetch_inputs(sub)
+                if inputs:
+                    weather, news, stamps = inputs
+                    message = ai_message(weather, sub.location, news, quote,
+                                         key=(today_str, sub.location), day=local_time)
+                    cache[today_str]["locations"][sub.location] = make_entry(message, weather, news, **stamps)
+                    save_cache(cache)
+                    cache_date = today_str
+                else:
+                    error = "weather fetch failed"
+            if message and send_email(sub.email, digest_subject(local_time), message):
+                record_send(sub)
+                retry_queue.succeeded(item)
+                stats["sent"] += 1
+                continue
+        except Exception as e:
+            error = str(e)
+
+        kind = "send" if message else "fetch"
+        if retry_queue.failed(item, error, kind=kind, cache_date=cache_date):
+            print(f"   ☠️  Giving up on {sub.email} after {item.attempts + 1} attempts: {error}")
+            stats["dead"] += 1
+        else:
+            stats["failed"] += 1
+    return stats
+
+# ----------------------------
+# MAIN
+# ----------------------------
+def resume_carry_over(now_utc):
+    """
+    Unsent subscribers from the interrupted run that are still inside
+    their 7 AM window (plus RESUME_GRACE_HOURS) on the same local day
+    """
+    carry_over = []
+    for sub in journal.unsent():
+        local_time = local_now(sub.lat, sub.lon)
+        if local_time is None or not 7 <= local_time.hour < 7 + RESUME_GRACE_HOURS:
+            continue
+        if send_ledger.has_sent(sub.email, local_time.strftime("%Y-%m-%d")):
+            continue
+        carry_over.append(sub)
+    return carry_over
+
+def load_day(today_str):
+    """Open the digest cache and make sure today's quote is in it"""
+    cache = load_cache()
+    return cache, day_quote(cache, today_str)
+
+def day_quote(cache, today_str):
+    """The day's quote, fetched and cached on first use"""
+    # Initialize today's cache structure if missing
+    if today_str not in cache:
+        cache[today_str] = {
+            "quote": None,
+            "locations": {}
+        }
+    
+    print("💬 Checking quote...")
+    quote = cache[today_str].get("quote")
+    
+    if not quote:
+        print("   Fetching new quote...")
+        quote = fetch_quote()
+        cache[today_str]["quote"] = quote
+        save_cache(cache)
+        print(f"   ✓ Saved: {quote['a']}")
+    else:
+        print(f"   ✓ Loaded from cache: {quote['a']}")
+    
+    print("-" * 30)
+    return quote
+
+# ----------------------------
+# PRE-GENERATION
+# ----------------------------
+def collect_upcoming(page, upcoming):
+    for sub in page:
+        tz_name = tz_index.tz_name(sub[2], sub[3])
+        if tz_name:
+            upcoming.add(sub, tz_name)
+
+def pregenerate(upcoming, cache=None):
+    """
+    Generate and cache digests for locations whose 7 AM is coming up
+    (--pregenerate), so the send run is cache reads plus SMTP. Entries
+    are checked against the freshness policy at their wave's start, and
+    only stale or missing ones are rebuilt. Returns the cache it used.
+    """
+    if not len(upcoming):
+        return cache
+    if cache is None:
+        cache = load_cache()
+
+    print(f"\n⏩ Pre-generating {len(upcoming)} location(s) due within {PREGEN_HOURS:g}h")
+    built = 0
+    deferred = 0
+    today_str = upcoming.now_utc.strftime("%Y-%m-%d")
+    for date_str, due in sorted(upcoming.by_date.items()):
+        if date_str > today_str:
+            # ZenQuotes only serves today's quote; that day's run fetches its own
+            print(f"   ⏭️  {len(due)} location(s) on {date_str}: left for that day's run")
+            deferred += len(due)
+            continue
+        quote = day_quote(cache, date_str)
+        locations = cache[date_str]["locations"]
+        if TLDR_MODE:
+            prefetch_summaries([sub for sub, _ in due.values()], cache, date_str)
+        for location, (sub, wave) in due.items():
+            entry = locations.get(location)
+            if cached_digest(entry, wave):
+                continue
+            try:
+                inputs = fetch_inputs(sub, entry, at_utc=wave)
+                if not inputs:
+                    continue
+                weather, news, stamps = inputs
+                print(f"   ✨ Generating: {location} (7 AM at {wave.strftime('%H:%M')} UTC)")
+                day = wave.astimezone(pytz.timezone(tz_index.tz_name(sub[2], sub[3])))
+                locations[location] = make_entry(
+                    ai_message(weather, location, news, quote, key=(date_str, location), day=day),
+                    weather, news, **stamps
+                )
+                save_cache(cache)
+                built += 1
+                metrics.count("pregenerated")
+            except Exception as e:
+                print(f"   ❌ Pre-generation failed for {location}: {e}")
+
+    apply_backfill(cache)
+    news_cache.save()
+    summary_cache.save()
+    print(f"   ✓ {built} digest(s) pre-generated, {deferred} deferred, "
+          f"{len(upcoming) - built - deferred} already fresh or failed")
+    return cache
+
+def main():
+    return run_distribution(iter_subscriber_pages(), datetime.now(pytz.utc), resume=RESUME_MODE)
+
+def run_distribution(pages, now_utc, resume=False):
+    """One distribution run over `pages` of subscribers; returns the totals"""
+    print("\n" + "="*70)
+    print(f"🚀 SmartBrief Distribution")
+    
+    if TEST_MODE:
+        print(f"🧪 TEST MODE")
+    
+    # Offsets are cached per run; a daemon's next wave may be past a DST change
+    tz_index.reset_offsets()
+    print(f"⏰ {now_utc.strftime('%Y-%m-%d %H:%M:%S %Z')}")
+    print("="*70 + "\n")
+    
+    today_str = now_utc.strftime("%Y-%m-%d")
+    # Cache and quote are loaded when the first due subscriber turns up,
+    # so hourly runs where nobody is at 7 AM exit without touching them
+    cache = None
+    quote = None
+
+    # ------------------
+    # RUN JOURNAL
+    # ------------------
+    resuming = resume and journal.replay(today_str)
+    if resuming:
+        print(f"📒 Resuming run {journal.resumed_from}: "
+              f"{len(journal.sent)} sent, {len(journal.generated)} generated, "
+              f"{len(journal.fetched)} fetched")
+    elif RunJournal(journal.path).replay(today_str):
+        print("⚠️  Previous run was interrupted; pass --resume to continue it")
+    journal.start(today_str, resume=resuming)
+
+    # ------------------
+    # 2. SUBSCRIBERS
+    # ------------------
+    print("�📊 Reading subscribers...")
+    
+    if CONCURRENT_MODE:
+        print("⚡ Concurrent mode: fetch → generate → send")
+    
+    if SHARD:
+        print(f"🧩 Shard {SHARD[0]}/{SHARD[1]}: locations hashed to this worker only")
+    
+    totals = {"sent": 0, "skipped": 0, "failed": 0}
+    subscriber_count = 0
+    upcoming = UpcomingWaves(now_utc, PREGEN_HOURS) if PREGEN_MODE else None
+    
+    def distribute(due, carry_over=False):
+        nonlocal cache, quote
+        if cache is None:
+            cache, quote = load_day(today_str)
+        
+        journal.mark_queued(due)
+        prefetch_weather(due, cache, today_str)
+        if TLDR_MODE:
+            prefetch_summaries(due, cache, today_str)
+        
+        if CONCURRENT_MODE:
+            stats = run_concurrent(due, cache, today_str, quote, carry_over)
+        else:
+            stats = run_sequential(due, cache, today_str, quote, carry_over)
+        for key in totals:
+            totals[key] += stats[key]
+    
+    # Earlier failures first; their HTML is already in the cache
+    retries = [] if TEST_MODE else retry_queue.due(now_utc)
+    if retries:
+        cache, quote = load_day(today_str)
+        print(f"🔁 Retrying {len(retries)} queued failure(s)...")
+        retried = drain_retries(retries, cache, today_str, quote)
+        totals["sent"] += retried["sent"]
+        metrics.count("retries", retried["sent"], result="sent")
+        metrics.count("retries", retried["failed"], result="failed")
+        metrics.count("retries", retried["dead"], result="dead")
+        print(f"   ✓ {retried['sent']} sent, {retried['failed']} backing off, "
+              f"{retried['dead']} dead-lettered\n")
+    
+    # Work one page at a time so memory stays flat as the list grows
+    for page in pages:
+        # Spelling variants of one place share a digest (and a shard)
+        page = location_index.canonicalise(page)
+        if SHARD:
+            page = [sub for sub in page if in_shard(sub[4], SHARD)]
+        subscriber_count += len(page)
+        if upcoming is not None:
+            collect_upcoming(page, upcoming)
+        
+        if TEST_MODE:
+            due = [sub for sub in page if sub[1] not in journal.sent]
+        else:
+            due, skipped = select_due_subscribers(page, now_utc)
+            totals["skipped"] += skipped
+        
+        if due:
+            distribute(due)
+    
+    # Recipients the interrupted run picked whose 7 AM has since passed
+    if resuming and not TEST_MODE:
+        carry_over = resume_carry_over(now_utc)
+        if carry_over:
+            print(f"\n📒 Carrying over {len(carry_over)} subscriber(s) from the interrupted run")
+            distribute(carry_over, carry_over=True)
+    
+    distributed = cache is not None
+    if upcoming is not None:
+        cache = pregenerate(upcoming, cache)
+    if cache is not None and generation.pending:
+        print(f"\n⏳ Waiting up to {BACKFILL_WAIT:g}s for {generation.pending} late AI digest(s)")
+        apply_backfill(cache, BACKFILL_WAIT)
+    # Stragglers past the backfill wait are abandoned, not waited on at exit
+    generation.shutdown()
+    
+    tz_index.save()
+    location_index.save()
+    if location_index.merged:
+        print(f"📍 {location_index.merged} subscriber location(s) folded into a known place's name")
+    flush_ledger()
+    retry_queue.prune()
+    journal.finish(totals)
+    
+    if not subscriber_count and not distributed:
+        print("⚠️  No active subscribers\n")
+    elif not distributed:
+        print(f"\n😴 None of {subscriber_count} subscriber(s) due right now\n")
+    else:
+        if subscriber_count:
+            print(f"\n✅ Processed {subscriber_count} subscriber(s)")
+        
+        close_smtp_pool()
+        with metrics.span("state_save"):
+            news_cache.save()
+            summary_cache.save()
+        print_summary(totals["sent"], totals["skipped"], totals["failed"])
+    
+    if isinstance(cache, CacheStore):
+        cache.close()
+    export_metrics(totals, subscriber_count)
+    return totals
+
+# ----------------------------
+# DAEMON
+# ----------------------------
+def build_zone_map():
+    """Timezone -> row ids for every subscriber in the local snapshot"""
+    zones = {}
+    for page in iter_snapshot_pages():
+        for sub in page:
+            tz_name = tz_index.tz_name(sub[2], sub[3])
+            if tz_name:
+                zones.setdefault(tz_name, []).append(sub[0])
+    tz_index.save()
+    return zones
+
+def pregenerate_waves(schedule, now_utc, done):
+    """Pre-generate the daemon's waves starting within PREGEN_HOURS, once per wave"""
+    horizon = now_utc + timedelta(hours=PREGEN_HOURS)
+    for key in [key for key in done if key[1] <= now_utc]:
+        done.discard(key)
+    zones = [
+        tz_name for tz_name, due in schedule.due_at.items()
+        if now_utc < due <= horizon and (tz_name, due) not in done
+    ]
+    if not zones:
+        return
+
+    upcoming = UpcomingWaves(now_utc, PREGEN_HOURS)
+    for page in iter_snapshot_rows(schedule.row_ids(zones)):
+        page = location_index.canonicalise(page)
+        if SHARD:
+            page = [sub for sub in page if in_shard(sub[4], SHARD)]
+        collect_upcoming(page, upcoming)
+
+    cache = pregenerate(upcoming)
+    if isinstance(cache, CacheStore):
+        cache.close()
+    done.update((tz_name, schedule.due_at[tz_name]) for tz_name in zones)
+
+def run_daemon():
+    """
+    Long-running scheduler (--daemon). Each subscriber's zone gets its
+    next 7 AM in UTC, kept in a priority queue; the process sleeps until
+    the earliest wave and runs a distribution for that wave's subscribers
+    only. The sheet is re-synced every DAEMON_SYNC_MINUTES and right
+    before each wave, so new subscribers join the schedule and
+    unsubscribes are honoured.
+    """
+    print("\n" + "="*70)
+    print("🛰️  SmartBrief daemon")
+    print("="*70 + "\n")
+
+    schedule = WaveSchedule()
+    version = None
+    next_sync = None
+    synced = False
+    resume = RESUME_MODE
+    pregenerated = set()
+
+    def refresh(now_utc):
+        nonlocal version, next_sync, synced
+        print("🔄 Syncing subscribers...")
+        synced = sync_subscribers()
+        next_sync = now_utc + timedelta(minutes=DAEMON_SYNC_MINUTES)
+        if not synced:
+            return
+        latest = snapshot_version()
+        # A classic full-list endpoint has no revision or ETag to compare
+        if latest == version and latest != (None, None):
+            return
+        version = latest
+        schedule.rebuild(build_zone_map(), now_utc)
+        count = sum(len(ids) for ids in schedule.zones.values())
+        print(f"🗓️  {count} subscriber(s) in {len(schedule.zones)} timezone(s)")
+
+    try:
+        while True:
+            now_utc = datetime.now(pytz.utc)
+            wave_at = schedule.next_due()
+            if next_sync is None or now_utc >= next_sync or (wave_at and wave_at <= now_utc):
+                refresh(now_utc)
+
+            zones = schedule.pop_due(now_utc)
+            if zones:
+                if not synced:
+                    # Never send from a snapshot that may be missing unsubscribes
+                    retry_at = now_utc + timedelta(seconds=DAEMON_RETRY_SECONDS)
+                    print(f"⚠️  Sync failed; retrying {len(zones)} zone(s) at {retry_at.strftime('%H:%M')} UTC")
+                    schedule.retry(zones, retry_at)
+                    continue
+                row_ids = schedule.row_ids(zones)
+                print(f"\n🌊 Wave: {len(row_ids)} subscriber(s) in {', '.join(sorted(zones))}")
+                run_distribution(iter_snapshot_rows(row_ids), datetime.now(pytz.utc), resume=resume)
+                resume = False
+                schedule.reschedule(zones, now_utc)
+                continue
+
+            if synced and retry_queue.due(now_utc):
+                # Between waves, a run over no subscribers just drains the queue
+                run_distribution([], now_utc)
+
+            if PREGEN_MODE and synced:
+                pregenerate_waves(schedule, now_utc, pregenerated)
+
+            wave_at = schedule.next_due()
+            wake_at = min(t for t in (wave_at, next_sync) if t is not None)
+            if wave_at:
+                print(f"💤 Next wave at {wave_at.strftime('%Y-%m-%d %H:%M')} UTC")
+            time.sleep(max(1.0, (wake_at - datetime.now(pytz.utc)).total_seconds()))
+    except KeyboardInterrupt:
+        tz_index.save()
+        location_index.save()
+        print("\n👋 Daemon stopped")
+
+def export_metrics(totals, subscriber_count):
+    """Fold end-of-run counts into the metrics report and write it"""
+    if not metrics.ENABLED:
+        return
+    metrics.gauge("subscribers", subscriber_count)
+    for outcome, value in totals.items():
+        metrics.gauge("subscribers_processed", value, outcome=outcome)
+    for name, cache_obj in (("weather", weather_cache), ("summary", summary_cache)):
+        metrics.gauge("cache_lookups", cache_obj.hits, cache=name, result="hit")
+        metrics.gauge("cache_lookups", cache_obj.misses, cache=name, result="miss")
+    for tier, counts in news_cache.report().items():
+        metrics.gauge("news_requests", counts["calls"], tier=tier, result="called")
+        metrics.gauge("news_requests", counts["saved"], tier=tier, result="saved")
+    for provider, usage in limiter.report().items():
+        metrics.gauge("rate_limit_wait_seconds", usage["wait_s"], provider=provider)
+    smtp_stats = smtp_pool.latency_stats() if smtp_pool else None
+    if smtp_stats:
+        metrics.gauge("smtp_connections", smtp_stats["connects"])
+    for state, value in retry_queue.counts().items():
+        metrics.gauge("retry_queue", value, state=state)
+    latency = generation.report()
+    if latency:
+        for quantile in ("p50", "p95", "p99"):
+            metrics.gauge("generation_latency_seconds", round(latency[f"{quantile}_ms"] / 1000, 4), quantile=quantile)
+        metrics.gauge("generation_deadline_missed", latency["missed"])
+    metrics.write_report()
+
+def print_summary(sent_count, skipped_count, failed_count):
     print("\n" + "="*70)
     print(f"📊 Summary:")
     print(f"   ✅ Sent: {sent_count}")
     print(f"   ⏭️  Skipped: {skipped_count}")
     print(f"   ❌ Failed: {failed_count}")
     print(f"   ✨ Gemini API Calls: {gemini_calls}")
+    latency = generation.report()
+    if latency:
+        print(f"   ⏱️  Generation: p50 {latency['p50_ms']}ms / p95 {latency['p95_ms']}ms / "
+              f"p99 {latency['p99_ms']}ms, {latency['missed']} over the {generation.deadline:g}s deadline")
+    if TLDR_MODE:
+        print(f"   🧠 TLDR cache: {summary_cache.hits} hit(s), {summary_cache.misses} miss(es)")
+    for tier, counts in news_cache.report().items():
+        if counts["calls"] or counts["saved"]:
+            print(f"   📰 News ({tier}): {counts['calls']} call(s), {counts['saved']} saved")
+    for provider, usage in limiter.report().items():
+        if usage["wait_s"] or usage["throttles"]:
+            print(f"   ⏱️  {provider}: waited {usage['wait_s']}s, throttled {usage['throttles']}x")
+    smtp_stats = smtp_pool.latency_stats() if smtp_pool else None
+    if smtp_stats:
+        print(f"   📤 SMTP: {smtp_stats['count']} msgs over {smtp_stats['connects']} connection(s), "
+              f"p50 {smtp_stats['p50_ms']}ms / p95 {smtp_stats['p95_ms']}ms")
+    if retry_queue.exists():
+        queued = retry_queue.counts()
+        print(f"   🔁 Retry queue: {queued['pending']} pending, {queued['dead']} dead-lettered")
     print("="*70 + "\n")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    if DAEMON_MODE:
+        run_daemon()
+    else:
+        main()
\ No newline at end of file
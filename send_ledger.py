@@ -0,0 +1,188 @@
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta, timezone
+
+LEDGER_FILE = "send_ledger.db"
+# Write sends back to the sheet's last_sent column. Needs a doPost()
+# that handles {"action": "mark_sent"}; until then the ledger is the record
+LEDGER_WRITE_BACK = os.environ.get("LEDGER_WRITE_BACK", "0") == "1"
+# Ledger rows written back to the sheet per request
+LEDGER_BATCH_SIZE = int(os.environ.get("LEDGER_BATCH_SIZE", "200"))
+# Synced rows older than this many days are dropped
+LEDGER_RETENTION_DAYS = int(os.environ.get("LEDGER_RETENTION_DAYS", "7"))
+# The sheet's last_sent is only compared with a subscriber's local today,
+# so an unsynced row older than this can no longer matter to the sheet
+LEDGER_SYNC_HORIZON_DAYS = int(os.environ.get("LEDGER_SYNC_HORIZON_DAYS", "2"))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sends (
+    email TEXT NOT NULL,
+    local_date TEXT NOT NULL,
+    row_id INTEGER,
+    sent_at TEXT NOT NULL,
+    synced INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (email, local_date)
+);
+CREATE INDEX IF NOT EXISTS sends_unsynced ON sends (synced, local_date);
+"""
+
+
+class SendLedger:
+    """
+    Local record of every digest sent, keyed by email and the subscriber's
+    local date.
+
+    A row is written as soon as the SMTP server accepts a message, so a
+    rerun inside the same 7 AM hour skips people who were already served.
+    Rows are then written back to the sheet's last_sent column in batches.
+
+    A shard's ledger is given the main ledger as `shared_path`; lookups
+    consult both, so reruns after merge_shards.py still skip served people.
+    """
+
+    def __init__(self, path=LEDGER_FILE, retention_days=LEDGER_RETENTION_DAYS, shared_path=None,
+                 sync_horizon_days=LEDGER_SYNC_HORIZON_DAYS):
+        self.path = path
+        self.shared_path = shared_path if shared_path != path else None
+        self.retention_days = retention_days
+        self.sync_horizon_days = sync_horizon_days
+        self.recorded = 0
+        self._conn = None
+        self._lock = threading.Lock()
+        # Each database the lookup reads takes its own (local_date, *emails)
+        self.lookup = "SELECT email FROM sends WHERE local_date = ? AND email IN ({marks})"
+        self.lookup_dbs = 1
+
+    @property
+    def conn(self):
+        # Opened on first use; the pipeline records sends from worker threads
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+            if self.shared_path and os.path.exists(self.shared_path):
+                self._conn.execute("ATTACH DATABASE ? AS shared", (self.shared_path,))
+                self.lookup = (
+                    "SELECT email FROM sends WHERE local_date = ? AND email IN ({marks}) "
+                    "UNION SELECT email FROM shared.sends WHERE local_date = ? AND email IN ({marks})"
+                )
+                self.lookup_dbs = 2
+        return self._conn
+
+    def sent_on(self, emails, local_date):
+        """Subset of `emails` that already received the `local_date` digest"""
+        emails = list(emails)
+        found = set()
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(emails), 500):
+                chunk = emails[start:start + 500]
+                conn = self.conn
+                query = self.lookup.format(marks=",".join("?" * len(chunk)))
+                params = []
+                for _ in range(self.lookup_dbs):
+                    params += [local_date] + chunk
+                rows = conn.execute(query, params).fetchall()
+                found.update(row[0] for row in rows)
+        return found
+
+    def has_sent(self, email, local_date):
+        return bool(self.sent_on([email], local_date))
+
+    def record(self, row_id, email, local_date):
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR IGNORE INTO sends (email, local_date, row_id, sent_at) VALUES (?, ?, ?, ?)",
+                (email, local_date, row_id, datetime.now(timezone.utc).isoformat(timespec="seconds"))
+            )
+            self.recorded += 1
+
+    def unsynced(self, limit):
+        with self._lock:
+            return self.conn.execute(
+                "SELECT email, local_date, row_id FROM sends WHERE synced = 0 "
+                "ORDER BY local_date, row_id LIMIT ?",
+                (limit,)
+            ).fetchall()
+
+    def mark_synced(self, rows):
+        with self._lock:
+            self.conn.executemany(
+                "UPDATE sends SET synced = 1 WHERE email = ? AND local_date = ?",
+                [(email, local_date) for email, local_date, _ in rows]
+            )
+
+    def flush(self, write_back, batch_size=LEDGER_BATCH_SIZE):
+        """
+        Send unsynced rows to `write_back([(row_id, local_date), ...])` in
+        batches. A batch that fails stays unsynced and is retried on the
+        next run, until it falls behind the sync horizon and is dropped.
+        Returns the number of rows synced.
+        """
+        if self._conn is None and not os.path.exists(self.path):
+            return 0
+
+        synced = 0
+        while True:
+            rows = self.unsynced(batch_size)
+            if not rows:
+                break
+            if not write_back([(row_id, local_date) for _, local_date, row_id in rows]):
+                break
+            self.mark_synced(rows)
+            synced += len(rows)
+            if len(rows) < batch_size:
+                break
+
+        self.prune()
+        return synced
+
+    def prune(self, write_back=True):
+        """
+        Drop synced rows past retention and unsynced rows past the sync
+        horizon. Without write-back nothing is ever synced, so every row
+        just follows retention.
+        """
+        if self._conn is None and not os.path.exists(self.path):
+            return 0
+        now = datetime.now(timezone.utc)
+        cutoff = (now - timedelta(days=self.retention_days)).strftime("%Y-%m-%d")
+        horizon = (now - timedelta(days=self.sync_horizon_days)).strftime("%Y-%m-%d")
+        with self._lock:
+            if not write_back:
+                self.conn.execute("DELETE FROM sends WHERE local_date < ?", (cutoff,))
+                return 0
+            self.conn.execute("DELETE FROM sends WHERE synced = 1 AND local_date < ?", (cutoff,))
+            dropped = self.conn.execute(
+                "DELETE FROM sends WHERE synced = 0 AND local_date < ?", (horizon,)
+            ).rowcount
+        if dropped:
+            print(f"⚠️  Dropped {dropped} ledger row(s) from before {horizon} that were never written back to the sheet")
+        return dropped
+
+    def merge(self, path):
+        """Fold another ledger file (e.g. one shard's) into this one"""
+        source = sqlite3.connect(path)
+        try:
+            rows = source.execute(
+                "SELECT email, local_date, row_id, sent_at, synced FROM sends"
+            ).fetchall()
+        finally:
+            source.close()
+
+        with self._lock:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "INSERT INTO sends (email, local_date, row_id, sent_at, synced) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (email, local_date) DO UPDATE SET synced = max(synced, excluded.synced)",
+                rows
+            )
+            self.conn.execute("COMMIT")
+        return len(rows)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
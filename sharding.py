@@ -0,0 +1,72 @@
+import hashlib
+import os
+import re
+import unicodedata
+
+
+def parse_shard(spec):
+    """'i/N' -> (i, N) with 0 <= i < N"""
+    index, sep, count = spec.partition("/")
+    if not sep or not index.isdigit() or not count.isdigit():
+        raise ValueError(f"shard must look like i/N, got {spec!r}")
+    index, count = int(index), int(count)
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"shard index must be in 0..{count - 1}, got {spec!r}")
+    return index, count
+
+
+def shard_from_argv(argv):
+    """`--shard i/N` or `--shard=i/N` from the command line, else None"""
+    for pos, arg in enumerate(argv):
+        if arg == "--shard" and pos + 1 < len(argv):
+            return parse_shard(argv[pos + 1])
+        if arg.startswith("--shard="):
+            return parse_shard(arg.split("=", 1)[1])
+    return None
+
+
+def location_key(location):
+    """Normalise a location so 'New York,  United States' and 'new york, united states' match"""
+    text = unicodedata.normalize("NFKC", location or "").casefold()
+    text = re.sub(r"\s*,\s*", ",", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def jump_hash(key, buckets):
+    """
+    Jump consistent hash (Lamping & Veach): going from N to N+1 shards
+    moves only 1/(N+1) of the keys.
+    """
+    key = int.from_bytes(hashlib.sha1(key.encode("utf-8")).digest()[:8], "big")
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return b
+
+
+def shard_of(location, count):
+    return jump_hash(location_key(location), count)
+
+
+def in_shard(location, shard):
+    """True when `location` belongs to `shard` ((i, N) or None for everything)"""
+    if shard is None:
+        return True
+    index, count = shard
+    return shard_of(location, count) == index
+
+
+def shard_path(path, shard):
+    """'send_ledger.db' -> 'send_ledger.shard-0-of-4.db' (unchanged without a shard)"""
+    if shard is None:
+        return path
+    root, ext = os.path.splitext(path.rstrip("/"))
+    return f"{root}.shard-{shard[0]}-of-{shard[1]}{ext}"
+
+
+def shard_glob(path):
+    """Glob pattern matching every shard_path() of `path`"""
+    root, ext = os.path.splitext(path.rstrip("/"))
+    return f"{root}.shard-*-of-*{ext}"
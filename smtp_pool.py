@@ -0,0 +1,161 @@
+import smtplib
+import threading
+import time
+
+
+class PoolTimeout(smtplib.SMTPException):
+    """No connection came free within the pool's acquire timeout"""
+
+
+class SMTPPool:
+    """
+    Small pool of authenticated SMTP connections kept open for a whole run.
+
+    Each connection sends up to `max_per_connection` messages before it is
+    recycled. A dropped connection (SMTPServerDisconnected or a 421 reply)
+    is replaced and the message retried transparently.
+
+    At most `size` connections are open at once. A sender that finds none
+    idle waits on a condition until one is released or discarded (freeing
+    a slot to open a replacement), and raises PoolTimeout after
+    `acquire_timeout` seconds.
+    """
+
+    def __init__(self, host, port, username=None, password=None, use_ssl=True,
+                 size=2, max_per_connection=100, timeout=15, max_retries=2, acquire_timeout=60):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_ssl = use_ssl
+        self.size = size
+        self.max_per_connection = max_per_connection
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.acquire_timeout = acquire_timeout
+
+        self._idle = []
+        self._cond = threading.Condition()
+        self._open = 0
+        self.latencies = []
+        self.connects = 0
+        self.reconnects = 0
+
+    # ------------------
+    # CONNECTIONS
+    # ------------------
+    def _connect(self):
+        if self.use_ssl:
+            server = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout)
+        else:
+            server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.username and self.password:
+            server.login(self.username, self.password)
+        self.connects += 1
+        return [server, 0]
+
+    def _acquire(self):
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._open < self.size:
+                    self._open += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f"no SMTP connection free after {self.acquire_timeout:g}s")
+                self._cond.wait(remaining)
+
+        try:
+            return self._connect()
+        except Exception:
+            self._free_slot()
+            raise
+
+    def _release(self, conn):
+        if conn[1] >= self.max_per_connection:
+            self._discard(conn)
+        else:
+            with self._cond:
+                self._idle.append(conn)
+                self._cond.notify()
+
+    def _discard(self, conn):
+        try:
+            conn[0].quit()
+        except Exception:
+            pass
+        self._free_slot()
+
+    def _free_slot(self):
+        # A waiter can now open a replacement connection
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    # ------------------
+    # SEND
+    # ------------------
+    def send(self, from_addr, to_addrs, msg):
+        """Send one message, returning its latency in seconds"""
+        start = time.perf_counter()
+
+        for attempt in range(self.max_retries + 1):
+            conn = self._acquire()
+            try:
+                conn[0].sendmail(from_addr, to_addrs, msg)
+            except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException) as e:
+                dropped = (
+                    isinstance(e, smtplib.SMTPServerDisconnected) or
+                    e.smtp_code == 421
+                )
+                if not dropped:
+                    self._release(conn)
+                    raise
+                self._discard(conn)
+                if attempt == self.max_retries:
+                    raise
+                self.reconnects += 1
+                continue
+            except smtplib.SMTPRecipientsRefused:
+                self._release(conn)
+                raise
+            except Exception:
+                self._discard(conn)
+                raise
+
+            conn[1] += 1
+            self._release(conn)
+            break
+
+        latency = time.perf_counter() - start
+        self.latencies.append(latency)
+        return latency
+
+    def close(self):
+        """Quit every idle connection"""
+        with self._cond:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            self._discard(conn)
+
+    # ------------------
+    # STATS
+    # ------------------
+    def latency_stats(self):
+        """Per-message latency summary in milliseconds"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        count = len(ordered)
+        return {
+            "count": count,
+            "avg_ms": round(sum(ordered) / count * 1000, 1),
+            "p50_ms": round(ordered[count // 2] * 1000, 1),
+            "p95_ms": round(ordered[min(count - 1, int(count * 0.95))] * 1000, 1),
+            "max_ms": round(ordered[-1] * 1000, 1),
+            "connects": self.connects,
+            "reconnects": self.reconnects
+        }
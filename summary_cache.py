@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+SUMMARY_CACHE_FILE = "summary_cache.json"
+# Seconds a generated TLDR / weather sentence is kept
+SUMMARY_CACHE_TTL = int(os.environ.get("SUMMARY_CACHE_TTL", str(3 * 24 * 3600)))
+
+
+def article_key(article):
+    """Content address for a news article (URL + title)"""
+    raw = f"{article.get('url', '')}|{article.get('title', '')}"
+    return "a:" + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def weather_key(location, weather):
+    """Content address for one location's weather sentence"""
+    raw = location + "|" + json.dumps(weather, sort_keys=True)
+    return "w:" + hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class SummaryCache:
+    """
+    Generated TLDRs and weather sentences, keyed by content hash.
+
+    An article that reaches many locations through the shared country and
+    global news tiers is summarised once and reused everywhere.
+    """
+
+    def __init__(self, path=SUMMARY_CACHE_FILE, ttl=SUMMARY_CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = None
+
+    @property
+    def entries(self):
+        """Summaries still within the TTL, read from disk on first use"""
+        if self._entries is None:
+            try:
+                with open(self.path, 'r') as f:
+                    entries = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                entries = {}
+
+            now = time.time()
+            self._entries = {
+                key: entry for key, entry in entries.items()
+                if now - entry.get("created_at", 0) < self.ttl
+            }
+            self.dirty = len(self._entries) != len(entries)
+        return self._entries
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["text"]
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def put(self, key, text):
+        with self._lock:
+            self.entries[key] = {"created_at": time.time(), "text": text}
+            self.dirty = True
+
+    def save(self):
+        if self._entries is None or not self.dirty:
+            return
+        try:
+            with self._lock:
+                with open(self.path, 'w') as f:
+                    json.dump(self.entries, f, separators=(",", ":"))
+                self.dirty = False
+        except Exception as e:
+            print(f"⚠️ Failed to save summary cache: {e}")
@@ -0,0 +1,14 @@
+import os
+import sys
+
+import pytest
+
+# The modules live flat in the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Run in an empty directory, as send_digest and merge_shards do in CI"""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
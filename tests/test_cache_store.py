@@ -0,0 +1,59 @@
+import json
+import os
+
+from cache_store import CACHE_DIR, LEGACY_CACHE_FILE, CacheStore, open_cache
+
+QUOTE = {"q": "Well begun is half done.", "a": "Aristotle"}
+NEWS = [{"title": "Headline", "url": "https://example.com/a", "description": "d"}]
+HTML = "<div>quote</div>\n<h2>Weather</h2>\n<div>news item</div>\n<p>Bye</p>"
+
+
+def test_day_reads_back_what_was_written(workdir):
+    store = CacheStore(CACHE_DIR)
+    store["2026-10-18"] = {"quote": QUOTE, "locations": {}}
+    day = store["2026-10-18"]
+    day["locations"]["Lagos, Nigeria @s14m"] = {"html": HTML, "weather": {"max": 31}, "news": NEWS}
+    day["locations"]["Paris, France @u09t"] = "<p>legacy string entry</p>"
+    store.close()
+
+    store = CacheStore(CACHE_DIR)
+    day = store["2026-10-18"]
+    assert day["quote"] == QUOTE
+    assert day["locations"]["Lagos, Nigeria @s14m"] == {"html": HTML, "weather": {"max": 31}, "news": NEWS}
+    assert day["locations"]["Paris, France @u09t"] == "<p>legacy string entry</p>"
+    assert sorted(day["locations"]) == ["Lagos, Nigeria @s14m", "Paris, France @u09t"]
+    assert "2026-10-19" not in store
+
+
+def test_repeated_blocks_are_stored_once(workdir):
+    store = CacheStore(CACHE_DIR)
+    for date in ("2026-10-17", "2026-10-18"):
+        store[date] = {"quote": QUOTE, "locations": {
+            f"City {n}": {"html": HTML, "news": NEWS} for n in range(10)
+        }}
+    # Three HTML blocks and one article, however many days and locations use them
+    assert store.fragments.stats()["fragments"] == 4
+    store.close()
+
+
+def test_eviction_drops_old_days_and_their_fragments(workdir):
+    store = CacheStore(CACHE_DIR, retention_days=7)
+    store["2026-10-01"] = {"quote": QUOTE, "locations": {"Old": {"html": "<div>only old</div>"}}}
+    store["2026-10-18"] = {"quote": QUOTE, "locations": {"New": {"html": HTML}}}
+
+    assert store.evict("2026-10-18") == ["2026-10-01"]
+    assert store.dates() == ["2026-10-18"]
+    assert store.fragments.stats()["fragments"] == 3
+    assert store["2026-10-18"]["locations"]["New"]["html"] == HTML
+    store.close()
+
+
+def test_legacy_json_is_migrated_once(workdir):
+    with open(LEGACY_CACHE_FILE, "w") as f:
+        json.dump({"2026-10-18": {"quote": QUOTE, "locations": {"Rome, Italy": "<p>ciao</p>"}}}, f)
+
+    store = open_cache(today="2026-10-18")
+    assert store["2026-10-18"]["locations"]["Rome, Italy"] == "<p>ciao</p>"
+    store.close()
+    assert not os.path.exists(LEGACY_CACHE_FILE)
+    assert os.path.exists(LEGACY_CACHE_FILE + ".migrated")
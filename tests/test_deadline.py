@@ -0,0 +1,70 @@
+import threading
+import time
+
+import pytest
+
+from deadline import DeadlineExceeded, DeadlineRunner
+
+
+@pytest.fixture
+def runner():
+    runner = DeadlineRunner(deadline=0.2, workers=2)
+    yield runner
+    runner.shutdown()
+
+
+def test_fast_calls_are_finished_in_the_caller(runner):
+    assert runner.run(("2026-10-18", "Lagos"), str.upper, lambda: "digest") == "DIGEST"
+    assert runner.pending == 0
+    assert runner.report()["count"] == 1
+
+
+def test_late_calls_are_parked_and_collected(runner):
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return "late digest"
+
+    with pytest.raises(DeadlineExceeded):
+        runner.run(("2026-10-18", "Lagos"), str.upper, slow)
+    assert runner.pending == 1
+    assert runner.collect() == []
+
+    release.set()
+    assert runner.collect(wait_s=2) == [(("2026-10-18", "Lagos"), "LATE DIGEST")]
+    assert runner.pending == 0
+    assert runner.missed == 1
+
+
+def test_collect_leaves_refused_keys_parked(runner):
+    with pytest.raises(DeadlineExceeded):
+        runner.run("kept", str, lambda: time.sleep(0.3) or "x")
+    assert runner.collect(wait_s=2, accept=lambda key: False) == []
+    assert runner.pending == 1
+
+
+def test_failed_late_calls_are_dropped(runner):
+    def slow_failure():
+        time.sleep(0.3)
+        raise RuntimeError("gemini 500")
+
+    with pytest.raises(DeadlineExceeded):
+        runner.run("key", str, slow_failure)
+    assert runner.collect(wait_s=2) == []
+    assert runner.pending == 0
+
+
+def test_token_wait_does_not_count_against_the_deadline(runner):
+    # 0.3 s for the rate-limit token, 0.05 s for the call, 0.2 s deadline
+    assert runner.run("key", str, lambda: time.sleep(0.05) or "ok", acquire=lambda: time.sleep(0.3)) == "ok"
+    assert max(runner.latencies) < 0.2
+
+
+def test_shutdown_abandons_parked_calls(runner):
+    with pytest.raises(DeadlineExceeded):
+        runner.run("key", str, lambda: time.sleep(5))
+    runner.shutdown()
+    assert runner.pending == 0
+    # A later run gets a fresh pool
+    assert runner.run("next", str, lambda: "ok") == "ok"
@@ -0,0 +1,38 @@
+from datetime import datetime, timedelta, timezone
+
+from freshness import MAX_AGE, horizon_hours, is_fresh, make_entry, stale_parts
+
+NOW = datetime(2026, 10, 18, 7, tzinfo=timezone.utc)
+
+
+def stamped(weather_age, news_age):
+    return make_entry(
+        "<p>digest</p>", {"max": 20}, [],
+        weather_at=(NOW - weather_age).isoformat(timespec="seconds"),
+        news_at=(NOW - news_age).isoformat(timespec="seconds"),
+    )
+
+
+def test_parts_go_stale_on_their_own_max_age():
+    entry = stamped(MAX_AGE["weather"] + timedelta(minutes=1), MAX_AGE["news"] - timedelta(minutes=1))
+    assert not is_fresh(entry, "weather", NOW)
+    assert is_fresh(entry, "news", NOW)
+    assert stale_parts(entry, NOW) == ["weather"]
+
+
+def test_entries_are_checked_at_their_send_time():
+    entry = stamped(timedelta(0), timedelta(0))
+    assert stale_parts(entry, NOW) == []
+    assert stale_parts(entry, NOW + MAX_AGE["news"] + timedelta(minutes=1)) == ["weather", "news"]
+
+
+def test_unstamped_and_legacy_entries_count_as_fresh():
+    assert stale_parts("<p>legacy html</p>", NOW) == []
+    assert stale_parts({"html": "<p>x</p>"}, NOW) == []
+    assert stale_parts({"html": "<p>x</p>", "news_at": "garbage"}, NOW) == ["news"]
+
+
+def test_pregeneration_horizon_never_outlives_the_shortest_max_age():
+    shortest = min(MAX_AGE.values()).total_seconds() / 3600
+    assert horizon_hours(1) == min(1, shortest)
+    assert horizon_hours(48) == shortest
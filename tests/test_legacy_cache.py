@@ -0,0 +1,63 @@
+import json
+import random
+
+import pytest
+
+from cache_store import iter_legacy_cache
+
+TRICKY_STRINGS = ["", "plain", 'quote " inside', "back\\slash\\", "]}{[", "naïve 中文 🌤️", "line\nbreak", "\\u0041"]
+
+
+def random_value(rng, depth=0):
+    roll = rng.random()
+    if depth > 3 or roll < 0.3:
+        return rng.choice([None, True, False, 0, -3, 1.5, 1e-7, *TRICKY_STRINGS])
+    if roll < 0.6:
+        return [random_value(rng, depth + 1) for _ in range(rng.randint(0, 4))]
+    return {rng.choice(TRICKY_STRINGS) + str(n): random_value(rng, depth + 1) for n in range(rng.randint(0, 4))}
+
+
+def random_cache(rng):
+    cache = {}
+    for _ in range(rng.randint(0, 6)):
+        cache[f"2026-10-{rng.randint(1, 28):02d}"] = {
+            "quote": random_value(rng),
+            "locations": {f"Place {n}": random_value(rng) for n in range(rng.randint(0, 3))},
+        }
+    return cache
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 64, 1 << 16])
+def test_scanner_matches_json_load(tmp_path, chunk_size):
+    rng = random.Random(chunk_size)
+    path = tmp_path / "digest_cache.json"
+    for _ in range(60):
+        cache = random_cache(rng)
+        path.write_text(
+            json.dumps(cache, ensure_ascii=rng.random() < 0.5, indent=rng.choice([None, 2])),
+            encoding="utf-8"
+        )
+        with open(path, encoding="utf-8") as f:
+            expected = json.load(f)
+        assert dict(iter_legacy_cache(str(path), chunk_size=chunk_size)) == expected
+
+
+def test_selects_and_orders_dates_before_decoding(tmp_path):
+    path = tmp_path / "digest_cache.json"
+    path.write_text(json.dumps({
+        "2026-10-16": {"quote": None, "locations": {}},
+        "2026-10-18": {"quote": None, "locations": {"A": "<p>a</p>"}},
+        "2026-10-17": {"quote": None, "locations": {"B": "<p>b</p>"}},
+    }))
+
+    days = list(iter_legacy_cache(str(path), lambda date: date >= "2026-10-17", newest_first=True, chunk_size=5))
+    assert [date for date, _ in days] == ["2026-10-18", "2026-10-17"]
+    assert days[1][1]["locations"] == {"B": "<p>b</p>"}
+
+
+@pytest.mark.parametrize("text", ["[]", '{"2026-10-18": {"quote": null}', '{"2026-10-18" {}}', "{1: {}}", ""])
+def test_malformed_files_raise(tmp_path, text):
+    path = tmp_path / "digest_cache.json"
+    path.write_text(text)
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_legacy_cache(str(path), chunk_size=4))
@@ -0,0 +1,80 @@
+import random
+
+from locations import LocationIndex, display_name, name_key, parse_country
+from read_sheets import Subscriber
+
+
+def index(tmp_path, **kwargs):
+    return LocationIndex(path=str(tmp_path / "location_index.json"), **kwargs)
+
+
+def test_spelling_variants_share_one_key(tmp_path):
+    locations = index(tmp_path)
+    keys = {
+        locations.canonical("New York, USA", 40.78, -73.97),
+        locations.canonical("new york,United States", 40.65, -73.95),
+        locations.canonical("New  York , U.S.A.", 40.71, -74.01),
+    }
+    assert len(keys) == 1
+    assert display_name(keys.pop()) == "New York, USA"
+
+
+def test_one_city_is_one_digest_across_cell_edges(tmp_path):
+    locations = index(tmp_path)
+    rng = random.Random(1)
+    # ±0.3° spans several precision-4 cells around Lagos
+    keys = {
+        locations.canonical("Lagos, Nigeria", 6.52 + rng.uniform(-0.15, 0.15), 3.38 + rng.uniform(-0.15, 0.15))
+        for _ in range(500)
+    }
+    assert len(keys) == 1
+
+
+def test_same_name_far_apart_stays_separate(tmp_path):
+    locations = index(tmp_path)
+    oregon = locations.canonical("Portland, United States", 45.52, -122.68)
+    maine = locations.canonical("Portland, United States", 43.66, -70.26)
+    assert oregon != maine
+    assert display_name(oregon) == display_name(maine) == "Portland, United States"
+
+
+def test_different_names_in_one_cell_stay_separate(tmp_path):
+    locations = index(tmp_path)
+    assert locations.canonical("Jersey City, USA", 40.72, -74.05) != locations.canonical("New York, USA", 40.71, -74.01)
+
+
+def test_keys_survive_a_restart(tmp_path):
+    first = index(tmp_path)
+    key = first.canonical("Lagos, Nigeria", 6.52, 3.38)
+    first.save()
+    assert index(tmp_path).canonical("lagos, nigeria", 6.55, 3.40) == key
+
+
+def test_precision_change_rebuilds_the_index(tmp_path):
+    first = index(tmp_path, precision=4)
+    key = first.canonical("Lagos, Nigeria", 6.52, 3.38)
+    first.save()
+    assert index(tmp_path, precision=3).canonical("Lagos, Nigeria", 6.52, 3.38) != key
+
+
+def test_canonicalise_counts_folded_spellings(tmp_path):
+    locations = index(tmp_path)
+    page = [
+        Subscriber(2, "a@example.com", 48.86, 2.35, "Paris, France", "", ""),
+        Subscriber(3, "b@example.com", 48.85, 2.34, "paris, france", "", ""),
+    ]
+    subs = locations.canonicalise(page)
+    assert subs[0].location == subs[1].location
+    assert subs[1].email == "b@example.com"
+    assert locations.merged == 1
+
+
+def test_countries_from_names_aliases_and_timezones(tmp_path):
+    assert name_key("Berlin,Deutschland") == name_key("berlin, Germany") == "berlin, de"
+    assert parse_country("Seoul, South Korea") == "kr"
+    assert parse_country("Somewhere, Atlantis") is None
+
+    locations = index(tmp_path, tz_lookup=lambda lat, lon: "Asia/Kolkata")
+    key = locations.canonical("Bengaluru", 12.97, 77.59)
+    assert locations.country(key) == "in"
+    assert locations.country(locations.canonical("Lyon, France", 45.76, 4.84)) == "fr"
@@ -0,0 +1,71 @@
+import email
+import re
+from email.header import decode_header, make_header
+from urllib.parse import quote
+
+import pytest
+
+from digest_template import EMAIL_TEMPLATE
+from mime_cache import UNSUBSCRIBE_URL, PreparedMessage, prepare_message
+
+SENDER = "brief@example.com"
+SUBJECT = "Your SmartBrief for Sunday, October 18, 2026"
+DIGEST = "<div><h2>Café ☕ weather</h2><p>Sunny, 21°C — 東京</p></div>"
+
+
+def expected_pattern(html_content, to_email):
+    """The message body the old per-recipient path built, allowing the padding spaces"""
+    url = UNSUBSCRIBE_URL.format(quote(to_email))
+    full = EMAIL_TEMPLATE.substitute(html_content=html_content, unsubscribe_url=url)
+    before, after = full.split(url)
+    tag_start = before.rindex("<a ")
+    return (
+        re.escape(before[:tag_start]) + " {0,2}" +
+        re.escape(before[tag_start:] + url + after[:1]) + " {0,2}" +
+        re.escape(after[1:])
+    )
+
+
+def parse(raw):
+    msg = email.message_from_string(raw)
+    (part,) = msg.get_payload()
+    return msg, part.get_payload(decode=True).decode("utf-8")
+
+
+@pytest.mark.parametrize("to_email", ["a@example.com", "first.last+tag@example.co.uk", "x&y=z@example.org"])
+def test_stamped_message_round_trips(to_email):
+    prepared = PreparedMessage(SENDER, SUBJECT, DIGEST)
+    msg, body = parse(prepared.stamp(to_email))
+
+    assert msg["From"] == SENDER
+    assert msg["To"] == to_email
+    assert str(make_header(decode_header(msg["Subject"]))) == SUBJECT
+    assert re.fullmatch(expected_pattern(DIGEST, to_email), body, re.S)
+
+
+def test_recipients_do_not_leak_into_each_other():
+    prepared = PreparedMessage(SENDER, SUBJECT, DIGEST)
+    _, first = parse(prepared.stamp("first@example.com"))
+    msg, second = parse(prepared.stamp("second@example.com"))
+
+    assert "first%40example.com" in first and "first" not in second
+    assert msg["To"] == "second@example.com"
+
+
+@pytest.mark.parametrize("length", range(6))
+def test_padding_works_for_every_alignment(length):
+    html = DIGEST + "x" * length
+    _, body = parse(PreparedMessage(SENDER, SUBJECT, html).stamp("a@example.com"))
+    assert re.fullmatch(expected_pattern(html, "a@example.com"), body, re.S)
+
+
+@pytest.mark.parametrize("to_email", ["bad\n@example.com", "bad\r@example.com", "ünï@example.com"])
+def test_unsafe_recipients_are_rejected(to_email):
+    with pytest.raises(ValueError):
+        PreparedMessage(SENDER, SUBJECT, DIGEST).stamp(to_email)
+
+
+def test_prepared_once_per_subject_and_digest():
+    first = prepare_message(SENDER, SUBJECT, DIGEST)
+    assert prepare_message(SENDER, SUBJECT, DIGEST) is first
+    assert prepare_message(SENDER, SUBJECT.replace("18", "19"), DIGEST) is not first
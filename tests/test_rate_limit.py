@@ -0,0 +1,100 @@
+import smtplib
+
+import pytest
+
+import rate_limit
+from rate_limit import RateLimiter, Throttled, TokenBucket, is_throttle, parse_retry_after
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Record sleeps instead of taking them"""
+    taken = []
+    monkeypatch.setattr(rate_limit.time, "sleep", taken.append)
+    return taken
+
+
+def test_burst_is_free_then_tokens_cost_one_interval(sleeps):
+    bucket = TokenBucket(rate=10, burst=3)
+    assert [bucket.acquire() for _ in range(3)] == [0.0, 0.0, 0.0]
+    wait = bucket.acquire()
+    assert 0.09 < wait <= 0.1
+    assert sleeps == [wait]
+
+
+def test_throttles_halve_the_rate_and_successes_restore_it(sleeps):
+    bucket = TokenBucket(rate=8, burst=1)
+    for _ in range(6):
+        bucket.throttled()
+    assert bucket.rate == 0.5  # never below 1/16 of the base rate
+    for _ in range(20):
+        bucket.succeeded()
+    assert bucket.rate == 8
+
+
+def test_retry_after_blocks_the_bucket(sleeps):
+    bucket = TokenBucket(rate=100, burst=10)
+    bucket.throttled(retry_after=2)
+    assert 1.9 < bucket.acquire() <= 2
+
+
+def test_call_retries_throttles_and_slows_the_provider(sleeps):
+    limiter = RateLimiter({"gemini": "100/10"})
+    replies = [Throttled(retry_after=1.5), Throttled(retry_after=0.5), "ok"]
+
+    def flaky():
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    assert limiter.call("gemini", flaky) == "ok"
+    assert 1.5 in sleeps and 0.5 in sleeps
+    assert limiter.buckets["gemini"].throttles == 2
+
+
+def test_call_gives_up_after_max_retries(sleeps):
+    limiter = RateLimiter({"newsapi": "100/10"})
+
+    def throttled():
+        raise Throttled(retry_after=0.1)
+
+    with pytest.raises(Throttled):
+        limiter.call("newsapi", throttled, max_retries=1)
+
+
+def test_other_errors_are_not_retried(sleeps):
+    limiter = RateLimiter({"newsapi": "100/10"})
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise KeyError("boom")
+
+    with pytest.raises(KeyError):
+        limiter.call("newsapi", broken)
+    assert calls == [1]
+
+
+def test_acquired_call_skips_the_first_token(sleeps):
+    limiter = RateLimiter({"gemini": "1/1"})
+    limiter.acquire("gemini")
+    limiter.call("gemini", lambda: None, acquired=True)
+    assert sleeps == []
+
+
+def test_scale_divides_every_rate():
+    limiter = RateLimiter({"smtp": "4/10", "gemini": "0.2/2"})
+    limiter.scale(1 / 4)
+    assert limiter.buckets["smtp"].rate == 1
+    assert limiter.buckets["gemini"].rate == pytest.approx(0.05)
+
+
+def test_throttle_detection():
+    assert parse_retry_after("3") == 3.0
+    assert parse_retry_after("-1") == 0.0
+    assert parse_retry_after("Wed, 21 Oct 2026 07:28:00 GMT") is None
+    assert is_throttle(Throttled())
+    assert is_throttle(smtplib.SMTPResponseException(421, b"try later"))
+    assert not is_throttle(smtplib.SMTPResponseException(550, b"no such user"))
+    assert not is_throttle(ValueError())
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+
+from read_sheets import Subscriber
+from retry_queue import RetryQueue
+
+SUB = Subscriber(2, "a@example.com", 6.52, 3.38, "Lagos, Nigeria @s14m", "", "")
+DAY = "2026-10-18"
+
+
+def later(minutes):
+    return datetime.now(timezone.utc) + timedelta(minutes=minutes)
+
+
+def queue(path="retry_queue.db"):
+    return RetryQueue(path, max_attempts=3, backoff_minutes=5, cap_minutes=60)
+
+
+def test_items_come_due_after_their_backoff(workdir):
+    retries = queue()
+    retries.add(SUB, DAY, "send", DAY, "smtp 421")
+    retries.add(SUB, DAY, "fetch", DAY, "ignored duplicate")
+
+    assert retries.due() == []
+    (item,) = retries.due(later(6))
+    assert (item.email, item.kind, item.attempts, item.last_error) == (SUB.email, "send", 1, "smtp 421")
+    assert Subscriber(*item.subscriber) == SUB
+
+
+def test_backoff_doubles_up_to_the_cap(workdir):
+    retries = queue()
+    assert [retries.backoff(n) for n in (1, 2, 3, 6)] == [
+        timedelta(minutes=5), timedelta(minutes=10), timedelta(minutes=20), timedelta(minutes=60)
+    ]
+
+
+def test_failures_dead_letter_after_max_attempts(workdir):
+    retries = queue()
+    retries.add(SUB, DAY, "fetch", DAY, "weather fetch failed")
+    (item,) = retries.due(later(6))
+    assert not retries.failed(item, "still failing", kind="send")
+
+    (item,) = retries.due(later(30))
+    assert item.kind == "send" and item.attempts == 2
+    assert retries.failed(item, "gave up")
+    assert retries.due(later(600)) == []
+    assert retries.counts() == {"pending": 0, "dead": 1}
+    assert retries.dead_letters() == [(SUB.email, DAY, "send", 3, "gave up")]
+
+
+def test_success_and_expiry_take_items_off_the_queue(workdir):
+    retries = queue()
+    retries.add(SUB, DAY, "send", DAY)
+    retries.add(SUB._replace(email="b@example.com"), DAY, "send", DAY)
+    first, second = sorted(retries.due(later(6)))
+
+    retries.succeeded(first)
+    retries.expire(second, "delivery day passed")
+    assert retries.counts() == {"pending": 0, "dead": 1}
+
+
+def test_merge_keeps_the_further_along_copy(workdir):
+    shard = queue("retry_queue.shard-0-of-2.db")
+    shard.add(SUB, DAY, "fetch", DAY, "first")
+    (item,) = shard.due(later(6))
+    shard.failed(item, "second", kind="send")
+    shard.close()
+
+    main = queue()
+    main.add(SUB, DAY, "fetch", DAY, "older")
+    assert main.merge("retry_queue.shard-0-of-2.db") == 1
+    (item,) = main.due(later(30))
+    assert (item.attempts, item.kind, item.last_error) == (2, "send", "second")
+
+
+def test_clean_runs_never_create_the_file(workdir):
+    retries = queue()
+    assert retries.due() == [] and retries.counts() == {"pending": 0, "dead": 0}
+    assert not (workdir / "retry_queue.db").exists()
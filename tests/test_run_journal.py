@@ -0,0 +1,71 @@
+from read_sheets import Subscriber
+from run_journal import RunJournal
+
+DAY = "2026-10-18"
+ALICE = Subscriber(2, "alice@example.com", 40.71, -74.01, "New York, USA @dr5r", "", "")
+BOB = Subscriber(3, "bob@example.com", 51.51, -0.13, "London, UK @gcpv", "", "")
+
+
+def crashed_run(path):
+    """A run that queued two people, served one and was killed mid-write"""
+    journal = RunJournal(path)
+    journal.start(DAY)
+    journal.mark_queued([ALICE, BOB])
+    journal.mark_fetched(ALICE.location, {"max": 20}, [{"title": "t"}])
+    journal.mark_generated(ALICE.location)
+    journal.mark_sent(ALICE.email)
+    journal._file.write('{"event":"sent","ema')
+    journal._file.close()
+
+
+def test_replay_after_crash_restores_progress(workdir):
+    crashed_run("run_journal.jsonl")
+
+    journal = RunJournal("run_journal.jsonl")
+    assert journal.replay(DAY)
+    assert journal.sent == {ALICE.email}
+    assert journal.generated == {ALICE.location}
+    assert journal.fetched[ALICE.location] == ({"max": 20}, [{"title": "t"}])
+    assert journal.unsent() == [BOB]
+
+
+def test_resumed_run_appends_and_finishes(workdir):
+    crashed_run("run_journal.jsonl")
+
+    journal = RunJournal("run_journal.jsonl")
+    assert journal.replay(DAY)
+    journal.start(DAY, resume=True)
+    journal.mark_sent(BOB.email)
+    journal.finish({"sent": 1})
+
+    # Both runs' sends are on record, and a finished run is not resumed
+    again = RunJournal("run_journal.jsonl")
+    assert not again.replay(DAY)
+    with open("run_journal.jsonl") as f:
+        text = f.read()
+    assert ALICE.email in text and BOB.email in text
+
+
+def test_other_days_are_not_resumed(workdir):
+    crashed_run("run_journal.jsonl")
+    assert not RunJournal("run_journal.jsonl").replay("2026-10-19")
+
+
+def test_fresh_start_forgets_the_previous_run(workdir):
+    crashed_run("run_journal.jsonl")
+
+    journal = RunJournal("run_journal.jsonl")
+    assert journal.replay(DAY)
+    journal.start(DAY)
+    assert journal.sent == set() and journal.unsent() == []
+
+    # The new run's journal replaced the old one on disk
+    replayed = RunJournal("run_journal.jsonl")
+    assert replayed.replay(DAY)
+    assert replayed.sent == set() and replayed.unsent() == []
+
+
+def test_missing_journal_has_nothing_to_resume(workdir):
+    journal = RunJournal("run_journal.jsonl")
+    assert not journal.replay(DAY)
+    assert journal.resumed_from is None
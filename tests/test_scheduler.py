@@ -0,0 +1,82 @@
+from datetime import datetime
+
+import pytz
+
+from scheduler import UpcomingWaves, WaveSchedule, next_wave
+
+
+def utc(*args):
+    return pytz.utc.localize(datetime(*args))
+
+
+def test_next_wave_follows_us_dst_start():
+    # New York springs forward on 2026-03-08: 7 AM moves from 12:00 to 11:00 UTC
+    assert next_wave("America/New_York", utc(2026, 3, 7, 5)) == utc(2026, 3, 7, 12)
+    assert next_wave("America/New_York", utc(2026, 3, 7, 13)) == utc(2026, 3, 8, 11)
+
+
+def test_next_wave_follows_us_dst_end():
+    # ...and falls back on 2026-11-01
+    assert next_wave("America/New_York", utc(2026, 10, 31, 5)) == utc(2026, 10, 31, 11)
+    assert next_wave("America/New_York", utc(2026, 10, 31, 12)) == utc(2026, 11, 1, 12)
+
+
+def test_next_wave_follows_southern_dst():
+    # Sydney moves to AEDT on 2026-10-04, so its 7 AM is 20:00 UTC the day before
+    assert next_wave("Australia/Sydney", utc(2026, 10, 2, 22)) == utc(2026, 10, 3, 20)
+    assert next_wave("Australia/Sydney", utc(2026, 10, 1, 22)) == utc(2026, 10, 2, 21)
+
+
+def test_wave_under_way_is_still_current():
+    assert next_wave("Asia/Kolkata", utc(2026, 10, 18, 1, 59)) == utc(2026, 10, 18, 1, 30)
+    assert next_wave("Asia/Kolkata", utc(2026, 10, 18, 2, 30)) == utc(2026, 10, 19, 1, 30)
+
+
+def test_reschedule_across_dst_start():
+    schedule = WaveSchedule()
+    schedule.rebuild({"America/New_York": [2, 3], "Asia/Kolkata": [4]}, utc(2026, 3, 7, 5))
+    assert schedule.next_due() == utc(2026, 3, 7, 12)
+
+    now = utc(2026, 3, 7, 12, 0, 5)
+    due = schedule.pop_due(now)
+    assert due == ["America/New_York"]
+    assert schedule.row_ids(due) == [2, 3]
+
+    # The next wave is 23 hours later, after the clocks change
+    schedule.reschedule(due, now)
+    assert schedule.due_at["America/New_York"] == utc(2026, 3, 8, 11)
+
+
+def test_reschedule_across_dst_end():
+    schedule = WaveSchedule()
+    schedule.rebuild({"America/New_York": [2]}, utc(2026, 10, 31, 5))
+    now = utc(2026, 10, 31, 11, 0, 5)
+    schedule.reschedule(schedule.pop_due(now), now)
+    assert schedule.next_due() == utc(2026, 11, 1, 12)
+
+
+def test_rebuild_drops_zones_and_skips_stale_entries():
+    schedule = WaveSchedule()
+    schedule.rebuild({"America/New_York": [2], "Europe/London": [3]}, utc(2026, 10, 18, 0))
+    schedule.retry(["Europe/London"], utc(2026, 10, 18, 9))
+    schedule.rebuild({"Europe/London": [3]}, utc(2026, 10, 18, 1))
+
+    assert schedule.pop_due(utc(2026, 10, 18, 8)) == []
+    assert schedule.pop_due(utc(2026, 10, 18, 12)) == ["Europe/London"]
+    assert schedule.next_due() is None
+
+
+def test_upcoming_waves_groups_by_utc_date():
+    upcoming = UpcomingWaves(utc(2026, 10, 18, 21, 30), hours=5)
+    yakutsk = (2, "a@example.com", 62.0, 129.7, "Yakutsk @x", "", "")
+    delhi = (3, "b@example.com", 28.6, 77.2, "Delhi @y", "", "")
+    london = (4, "c@example.com", 51.5, -0.1, "London @z", "", "")
+    upcoming.add(yakutsk, "Asia/Yakutsk")
+    upcoming.add(delhi, "Asia/Kolkata")
+    upcoming.add(london, "Europe/London")
+
+    assert upcoming.by_date == {
+        "2026-10-18": {"Yakutsk @x": (yakutsk, utc(2026, 10, 18, 22))},
+        "2026-10-19": {"Delhi @y": (delhi, utc(2026, 10, 19, 1, 30))},
+    }
+    assert len(upcoming) == 2
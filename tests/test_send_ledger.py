@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta, timezone
+
+from send_ledger import SendLedger
+
+
+def days_ago(n):
+    return (datetime.now(timezone.utc) - timedelta(days=n)).strftime("%Y-%m-%d")
+
+
+def test_rerun_skips_recipients_already_served(workdir):
+    first = SendLedger("send_ledger.db")
+    first.record(2, "a@example.com", "2026-10-18")
+    first.record(2, "a@example.com", "2026-10-18")
+    first.close()
+
+    # A second process on the same day sees the first run's sends
+    rerun = SendLedger("send_ledger.db")
+    assert rerun.sent_on(["a@example.com", "b@example.com"], "2026-10-18") == {"a@example.com"}
+    assert rerun.has_sent("a@example.com", "2026-10-18")
+    assert not rerun.has_sent("a@example.com", "2026-10-19")
+    assert rerun.conn.execute("SELECT COUNT(*) FROM sends").fetchone()[0] == 1
+
+
+def test_shard_lookup_reads_the_main_ledger(workdir):
+    main = SendLedger("send_ledger.db")
+    main.record(2, "a@example.com", "2026-10-18")
+    main.close()
+
+    shard = SendLedger("send_ledger.shard-0-of-2.db", shared_path="send_ledger.db")
+    shard.record(3, "b@example.com", "2026-10-18")
+    emails = ["a@example.com", "b@example.com", "c@example.com"]
+    assert shard.sent_on(emails, "2026-10-18") == {"a@example.com", "b@example.com"}
+
+
+def test_lookup_handles_more_emails_than_one_batch(workdir):
+    ledger = SendLedger("send_ledger.db")
+    emails = [f"user{n}@example.com" for n in range(1200)]
+    for n, email in enumerate(emails[::3]):
+        ledger.record(n, email, "2026-10-18")
+    assert ledger.sent_on(emails, "2026-10-18") == set(emails[::3])
+
+
+def test_flush_marks_rows_synced_in_batches(workdir):
+    ledger = SendLedger("send_ledger.db")
+    for n in range(5):
+        ledger.record(n, f"user{n}@example.com", days_ago(0))
+    batches = []
+
+    assert ledger.flush(lambda rows: batches.append(rows) or True, batch_size=2) == 5
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert ledger.unsynced(10) == []
+
+
+def test_failed_write_back_keeps_rows_until_the_sync_horizon(workdir):
+    ledger = SendLedger("send_ledger.db", sync_horizon_days=2)
+    for n in (0, 1, 3, 5):
+        ledger.record(n, f"user{n}@example.com", days_ago(n))
+
+    assert ledger.flush(lambda rows: False) == 0
+    left = sorted(date for _, date, _ in ledger.unsynced(10))
+    assert left == [days_ago(1), days_ago(0)]
+
+
+def test_without_write_back_rows_follow_retention(workdir):
+    ledger = SendLedger("send_ledger.db", retention_days=7, sync_horizon_days=2)
+    for n in (0, 3, 8):
+        ledger.record(n, f"user{n}@example.com", days_ago(n))
+
+    assert ledger.prune(write_back=False) == 0
+    assert ledger.sent_on(["user0@example.com", "user3@example.com"], days_ago(3)) == {"user3@example.com"}
+    assert not ledger.has_sent("user8@example.com", days_ago(8))
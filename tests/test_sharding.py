@@ -0,0 +1,132 @@
+import fnmatch
+import glob
+import os
+
+import pytest
+
+import merge_shards
+from cache_store import CACHE_DIR, CacheStore
+from read_sheets import Subscriber
+from retry_queue import RETRY_FILE, RetryQueue
+from run_journal import JOURNAL_FILE, RunJournal
+from send_ledger import LEDGER_FILE, SendLedger
+from sharding import in_shard, location_key, parse_shard, shard_glob, shard_of, shard_path
+from weather import WEATHER_CACHE_FILE, WeatherCache
+
+DAY = "2026-10-18"
+LOCATIONS = [f"City {n}, Country {n % 7} @c{n:03d}" for n in range(2000)]
+
+
+def test_parse_shard():
+    assert parse_shard("0/4") == (0, 4)
+    assert parse_shard("3/4") == (3, 4)
+    for spec in ("4/4", "1", "-1/2", "a/b", "0/0"):
+        with pytest.raises(ValueError):
+            parse_shard(spec)
+
+
+def test_every_location_lands_in_exactly_one_shard():
+    for location in LOCATIONS[:200]:
+        owners = [index for index in range(4) if in_shard(location, (index, 4))]
+        assert owners == [shard_of(location, 4)]
+        assert in_shard(location, None)
+
+
+def test_shards_are_roughly_even():
+    counts = [0] * 4
+    for location in LOCATIONS:
+        counts[shard_of(location, 4)] += 1
+    assert min(counts) > len(LOCATIONS) / 4 * 0.8
+
+
+def test_spelling_variants_share_a_shard():
+    assert location_key("New York,  United States") == location_key("new york, united states")
+    assert shard_of("New York,  United States", 8) == shard_of("new york, united states", 8)
+
+
+def test_adding_a_shard_moves_only_its_share():
+    moved = [location for location in LOCATIONS if shard_of(location, 4) != shard_of(location, 5)]
+    # Jump hashing only moves keys onto the new shard, about 1/5 of them
+    assert all(shard_of(location, 5) == 4 for location in moved)
+    assert 0.15 < len(moved) / len(LOCATIONS) < 0.25
+
+
+def test_shard_paths():
+    assert shard_path("send_ledger.db", None) == "send_ledger.db"
+    assert shard_path("send_ledger.db", (1, 4)) == "send_ledger.shard-1-of-4.db"
+    assert shard_path("digest_cache/", (0, 2)) == "digest_cache.shard-0-of-2"
+    assert fnmatch.fnmatch(shard_path("run_journal.jsonl", (3, 4)), shard_glob("run_journal.jsonl"))
+
+
+def run_shard(shard, subscribers):
+    """What one `send_digest.py --shard i/N` run leaves behind"""
+    mine = [sub for sub in subscribers if in_shard(sub.location, shard)]
+    ledger = SendLedger(shard_path(LEDGER_FILE, shard), shared_path=LEDGER_FILE)
+    store = CacheStore(shard_path(CACHE_DIR, shard))
+    queue = RetryQueue(shard_path(RETRY_FILE, shard))
+    weather = WeatherCache(shard_path(WEATHER_CACHE_FILE, shard), shared_path=WEATHER_CACHE_FILE)
+    journal = RunJournal(shard_path(JOURNAL_FILE, shard))
+    journal.start(DAY)
+    journal.mark_queued(mine)
+
+    store[DAY] = {"quote": {"q": "q", "a": "a"}, "locations": {}}
+    for sub in mine:
+        store[DAY]["locations"][sub.location] = {"html": f"<p>{sub.location}</p>"}
+        weather.put(sub.lat, sub.lon, {"max": sub.row_id})
+        if sub.row_id % 5:
+            ledger.record(sub.row_id, sub.email, DAY)
+            journal.mark_sent(sub.email)
+        else:
+            queue.add(sub, DAY, "send", DAY, "send failed")
+    journal.finish({"sent": len(journal.sent)})
+    weather.save()
+    for closable in (ledger, store, queue):
+        closable.close()
+    return mine
+
+
+def test_shard_outputs_merge_back_into_the_main_state(workdir):
+    subscribers = [
+        Subscriber(n, f"user{n}@example.com", n / 10, n / 10, LOCATIONS[n], "", "")
+        for n in range(40)
+    ]
+    served = [run_shard((index, 3), subscribers) for index in range(3)]
+    assert sorted(sub.row_id for part in served for sub in part) == list(range(40))
+
+    merge_shards.main()
+
+    ledger = SendLedger(LEDGER_FILE)
+    emails = [sub.email for sub in subscribers]
+    assert ledger.sent_on(emails, DAY) == {sub.email for sub in subscribers if sub.row_id % 5}
+
+    store = CacheStore(CACHE_DIR)
+    assert sorted(store[DAY]["locations"]) == sorted(sub.location for sub in subscribers)
+    store.close()
+
+    assert RetryQueue(RETRY_FILE).counts() == {"pending": 8, "dead": 0}
+    weather = WeatherCache(WEATHER_CACHE_FILE)
+    assert all(weather.get(sub.lat, sub.lon) == {"max": sub.row_id} for sub in subscribers)
+
+    journal = RunJournal(JOURNAL_FILE)
+    assert not journal.replay(DAY)  # every shard finished
+    assert not glob.glob("*.shard-*")
+
+
+def test_interrupted_shard_leaves_a_resumable_merged_journal(workdir):
+    subs = [Subscriber(n, f"user{n}@example.com", 1.0, 1.0, LOCATIONS[n], "", "") for n in range(6)]
+    for index in range(2):
+        journal = RunJournal(shard_path(JOURNAL_FILE, (index, 2)))
+        journal.start(DAY)
+        mine = [sub for sub in subs if in_shard(sub.location, (index, 2))]
+        journal.mark_queued(mine)
+        journal.mark_sent(mine[0].email)
+        if index == 0:
+            journal.finish({"sent": 1})
+
+    merge_shards.main()
+
+    journal = RunJournal(JOURNAL_FILE)
+    assert journal.replay(DAY)
+    assert len(journal.sent) == 2
+    assert len(journal.unsent()) == len(subs) - 2
+    assert not os.path.exists(shard_path(JOURNAL_FILE, (0, 2)))
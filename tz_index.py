@@ -0,0 +1,99 @@
+import json
+import os
+from datetime import timedelta
+
+import pytz
+
+TZ_INDEX_FILE = "tz_index.json"
+
+
+class TimezoneIndex:
+    """
+    Persisted lat/lon -> IANA timezone lookup.
+
+    Coordinates are rounded to `precision` decimals (2 ≈ 1 km) so a
+    subscriber only ever pays for one polygon lookup. `finder(lat, lon)`
+    is only called on a miss.
+    """
+
+    def __init__(self, finder, path=TZ_INDEX_FILE, precision=2):
+        self.finder = finder
+        self.path = path
+        self.precision = precision
+        self.dirty = False
+        self.zones = {}
+        self._offsets = {}
+
+        try:
+            with open(path, 'r') as f:
+                self.zones = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.zones = {}
+
+    def key(self, lat, lon):
+        return f"{round(lat, self.precision)},{round(lon, self.precision)}"
+
+    def tz_name(self, lat, lon):
+        key = self.key(lat, lon)
+        tz_name = self.zones.get(key)
+        if tz_name is None and key not in self.zones:
+            tz_name = self.finder(lat, lon)
+            self.zones[key] = tz_name
+            self.dirty = True
+        return tz_name
+
+    def utc_offset(self, tz_name, now_utc):
+        """Current UTC offset for a zone, computed once per zone per run"""
+        offset = self._offsets.get(tz_name)
+        if offset is None:
+            offset = now_utc.astimezone(pytz.timezone(tz_name)).utcoffset()
+            self._offsets[tz_name] = offset
+        return offset
+
+    def reset_offsets(self):
+        """Forget cached offsets so a long-lived process sees DST changes"""
+        self._offsets = {}
+
+    def save(self):
+        if not self.dirty:
+            return
+        try:
+            # Per-process temp file: sharded runs may save side by side
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.zones, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except Exception as e:
+            print(f"⚠️ Failed to save timezone index: {e}")
+
+
+def bucket_by_offset(subscribers, index, now_utc):
+    """Group subscribers by their zone's current UTC offset"""
+    buckets = {}
+    for sub in subscribers:
+        tz_name = index.tz_name(sub[2], sub[3])
+        if not tz_name:
+            continue
+        offset = index.utc_offset(tz_name, now_utc)
+        buckets.setdefault(offset, []).append(sub)
+    return buckets
+
+
+def due_offsets(buckets, now_utc, hour=7):
+    """Offsets whose local clock currently reads `hour`"""
+    return [
+        offset for offset in buckets
+        if (now_utc + offset).hour == hour
+    ]
+
+
+def local_date(now_utc, offset):
+    return (now_utc + offset).strftime("%Y-%m-%d")
+
+
+def offset_label(offset):
+    minutes = int(offset / timedelta(minutes=1))
+    sign = "+" if minutes >= 0 else "-"
+    minutes = abs(minutes)
+    return f"UTC{sign}{minutes // 60:02d}:{minutes % 60:02d}"
@@ -1,61 +1,242 @@
+import argparse
 import json
 import os
+from collections import Counter
+
+from cache_store import CACHE_DIR, CacheStore, iter_legacy_cache
+from fragments import FRAGMENT_FILE, FragmentStore
 
 CACHE_FILE = "digest_cache.json"
 
-def main():
-    if not os.path.exists(CACHE_FILE):
-        print(f"❌ Cache file not found: {CACHE_FILE}")
+# API calls one generated digest costs: forecast, news search, Gemini
+CALLS_PER_DIGEST = {"open_meteo": 1, "newsapi": 1, "gemini": 1}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Inspect the SmartBrief digest cache")
+    parser.add_argument("--date", help="only this day (YYYY-MM-DD)")
+    parser.add_argument("--since", help="only this day and later (YYYY-MM-DD)")
+    parser.add_argument("--location", help="only locations containing this text")
+    parser.add_argument("--stats", action="store_true", help="per-day statistics instead of entries")
+    return parser.parse_args()
+
+
+def selected(date, args):
+    if args.date and date != args.date:
+        return False
+    return not (args.since and date < args.since)
+
+
+# ----------------------------
+# DAY SOURCES
+# ----------------------------
+class LegacyDay:
+    """A day from the old JSON file, filtered the same way as a store shard"""
+
+    def __init__(self, day):
+        self.quote = day.get("quote")
+        self.locations = day.get("locations") or {}
+
+    def rows(self, match=None):
+        needle = (match or "").casefold()
+        for location in sorted(self.locations):
+            if needle in location.casefold():
+                yield location, self.locations[location]
+
+    def names(self, match=None):
+        needle = (match or "").casefold()
+        return [location for location in self.locations if needle in location.casefold()]
+
+    def stats(self, match=None):
+        stats = {"entries": 0, "bytes": 0, "expanded": 0, "legacy": 0}
+        for _, entry in self.rows(match):
+            stats["entries"] += 1
+            stats["bytes"] += len(json.dumps(entry).encode("utf-8"))
+            stats["expanded" if isinstance(entry, dict) else "legacy"] += 1
+        return stats
+
+
+class StoreDay:
+    """A day shard from digest_cache/; rows are streamed from SQLite"""
+
+    def __init__(self, shard):
+        self.quote = shard["quote"]
+        self.locations = shard["locations"]
+
+    def rows(self, match=None):
+        return self.locations.rows(match)
+
+    def names(self, match=None):
+        return self.locations.names(match)
+
+    def stats(self, match=None):
+        return self.locations.stats(match)
+
+
+def iter_days(args):
+    """
+    (date, day) for the selected days, newest first. Store shards are
+    opened one at a time and unselected days are never opened.
+    """
+    if os.path.isdir(CACHE_DIR):
+        store = CacheStore()
+        try:
+            for date in sorted(store.dates(), reverse=True):
+                if selected(date, args):
+                    yield date, StoreDay(store[date])
+        finally:
+            store.close()
         return
 
+    # The legacy file is scanned for dates, then decoded one day at a time
+    for date, day in iter_legacy_cache(CACHE_FILE, lambda date: selected(date, args), newest_first=True):
+        yield date, LegacyDay(day)
+
+
+def recipients_by_location():
+    """Current subscribers per canonical location, from the local snapshot (or None)"""
+    # Only stats mode needs these (and their heavier imports)
+    from read_sheets import SNAPSHOT_FILE, iter_snapshot_pages
+    from locations import LocationIndex
+
+    if not os.path.exists(SNAPSHOT_FILE):
+        return None
+
+    index = LocationIndex()
+    counts = Counter()
+    for page in iter_snapshot_pages(SNAPSHOT_FILE):
+        for sub in index.canonicalise(page):
+            counts[sub.location] += 1
+    return counts
+
+
+def fragment_stats():
+    """Size of the shared fragment store, or None for a cache without one"""
+    path = os.path.join(CACHE_DIR, FRAGMENT_FILE)
+    if not os.path.exists(path):
+        return None
+    store = FragmentStore(path)
     try:
-        with open(CACHE_FILE, 'r') as f:
-            cache = json.load(f)
-    except json.JSONDecodeError:
-        print(f"❌ Cache file is empty or corrupted.")
+        return store.stats()
+    finally:
+        store.close()
+
+
+# ----------------------------
+# REPORTS
+# ----------------------------
+def print_entries(date, day, args):
+    print(f"\n[DATE: {date}]")
+
+    # Display Quote
+    quote = day.quote
+    if quote:
+        print(f"   - Quote: \"{quote.get('q')}\" - {quote.get('a')}")
+    else:
+        print("   - No quote cached.")
+
+    # Display Locations
+    shown = 0
+    for loc, entry in day.rows(args.location):
+        if not shown:
+            print("   - Locations cached:")
+        shown += 1
+        if isinstance(entry, dict):
+            # Expanded Format
+            weather = entry.get("weather", {})
+            news = entry.get("news", [])
+            print(f"      * {loc}:")
+            print(f"        🌤️  Weather: {weather.get('max')}°C / {weather.get('min')}°C (Feels: {weather.get('feels_like')}°C)")
+            print(f"        📰 News Headlines ({len(news)}):")
+            for a in news[:5]:
+                print(f"           - {(a.get('title') or '')[:80]}...")
+                print(f"             URL: {a.get('url')}")
+        else:
+            # Legacy Format
+            html_size = len(entry)
+            print(f"      * {loc} ({html_size} bytes) [Legacy Format]")
+
+    if shown:
+        print(f"   - {shown} location(s)")
+    else:
+        print("   - No locations cached.")
+
+
+def print_stats(days, args):
+    recipients = recipients_by_location()
+    per_digest = sum(CALLS_PER_DIGEST.values())
+
+    print(f"{'DATE':<12}{'ENTRIES':>9}{'EXPANDED':>10}{'LEGACY':>8}{'BYTES':>12}{'B/ENTRY':>9}{'SAVED':>9}")
+    totals = Counter()
+    for date, day in days:
+        stats = day.stats(args.location)
+        saved = 0
+        if recipients is not None:
+            # Every extra recipient of a cached location skips one generation
+            saved = per_digest * sum(
+                max(recipients.get(location, 0) - 1, 0) for location in day.names(args.location)
+            )
+        per_entry = stats["bytes"] // stats["entries"] if stats["entries"] else 0
+        print(
+            f"{date:<12}{stats['entries']:>9}{stats['expanded']:>10}{stats['legacy']:>8}"
+            f"{stats['bytes']:>12,}{per_entry:>9,}{saved:>9,}"
+        )
+        totals.update(stats)
+        totals["days"] += 1
+        totals["saved"] += saved
+
+    if not totals["days"]:
+        print("No matching days.")
+        return
+
+    per_entry = totals["bytes"] // totals["entries"] if totals["entries"] else 0
+    print(
+        f"{'TOTAL':<12}{totals['entries']:>9}{totals['expanded']:>10}{totals['legacy']:>8}"
+        f"{totals['bytes']:>12,}{per_entry:>9,}{totals['saved']:>9,}"
+    )
+    fragments = fragment_stats()
+    if fragments:
+        # BYTES above is the rows only; shared HTML and articles live here
+        print(
+            f"\n🧩 Fragments (all days): {fragments['fragments']:,} unique, "
+            f"{fragments['bytes']:,} bytes stored ({fragments['raw_bytes']:,} before zlib)"
+        )
+    if recipients is None:
+        print("\n💡 No subscribers.db snapshot; API calls saved can't be estimated")
+    else:
+        breakdown = ", ".join(
+            f"{name} {totals['saved'] // per_digest * calls:,}" for name, calls in CALLS_PER_DIGEST.items()
+        )
+        print(
+            f"\n💰 Estimated API calls saved: {totals['saved']:,} ({breakdown}), "
+            f"based on {sum(recipients.values()):,} current subscribers"
+        )
+
+
+def main():
+    args = parse_args()
+
+    if not os.path.isdir(CACHE_DIR) and not os.path.exists(CACHE_FILE):
+        print(f"❌ Cache file not found: {CACHE_FILE}")
         return
 
     print("\n" + "="*70)
     print("--- SmartBrief Cache Viewer ---")
     print("="*70)
 
-    dates = sorted(cache.keys(), reverse=True)
-    if not dates:
-        print("Empty cache.")
-        return
-
-    for date in dates:
-        print(f"\n[DATE: {date}]")
-        day_data = cache[date]
-        
-        # Display Quote
-        quote = day_data.get("quote")
-        if quote:
-            print(f"   - Quote: \"{quote.get('q')}\" - {quote.get('a')}")
-        else:
-            print("   - No quote cached.")
-
-        # Display Locations
-        locations = day_data.get("locations", {})
-        if locations:
-            print(f"   - Locations cached ({len(locations)}):")
-            for loc, entry in locations.items():
-                if isinstance(entry, dict):
-                    # Expanded Format
-                    weather = entry.get("weather", {})
-                    news = entry.get("news", [])
-                    print(f"      * {loc}:")
-                    print(f"        🌤️  Weather: {weather.get('max')}°C / {weather.get('min')}°C (Feels: {weather.get('feels_like')}°C)")
-                    print(f"        📰 News Headlines ({len(news)}):")
-                    for a in news[:5]:
-                        print(f"           - {a.get('title')[:80]}...")
-                        print(f"             URL: {a.get('url')}")
-                else:
-                    # Legacy Format
-                    html_size = len(entry)
-                    print(f"      * {loc} ({html_size} bytes) [Legacy Format]")
+    try:
+        if args.stats:
+            print_stats(iter_days(args), args)
         else:
-            print("   - No locations cached.")
+            shown = 0
+            for date, day in iter_days(args):
+                print_entries(date, day, args)
+                shown += 1
+            if not shown:
+                print("Empty cache." if not (args.date or args.since) else "No matching days.")
+    except json.JSONDecodeError:
+        print(f"❌ Cache file is empty or corrupted.")
+        return
 
     print("\n" + "="*70 + "\n")
 
@@ -0,0 +1,201 @@
+import json
+import os
+import time
+
+import requests
+
+import metrics
+from rate_limit import Throttled, limiter, parse_retry_after
+
+FORECAST_URL = os.environ.get("OPEN_METEO_URL", "https://api.open-meteo.com/v1/forecast")
+FORECAST_PARAMS = {
+    "current_weather": "true",
+    "daily": (
+        "temperature_2m_max,temperature_2m_min,"
+        "apparent_temperature_max,apparent_temperature_min,"
+        "sunrise,sunset,precipitation_sum,uv_index_max,cloudcover_mean"
+    ),
+    "timezone": "auto"
+}
+
+WEATHER_CACHE_FILE = "weather_cache.json"
+# Grid size in degrees (0.1 ≈ 11 km); nearby subscribers share one forecast
+WEATHER_GRID = float(os.environ.get("WEATHER_GRID", "0.1"))
+# Seconds a cached forecast stays valid
+WEATHER_TTL = int(os.environ.get("WEATHER_TTL", "10800"))
+# Coordinates per Open-Meteo request
+WEATHER_BATCH_SIZE = int(os.environ.get("WEATHER_BATCH_SIZE", "50"))
+
+
+def snap(lat, lon, grid=WEATHER_GRID):
+    """Snap a coordinate to the centre of its grid cell"""
+    if grid <= 0:
+        return round(lat, 4), round(lon, 4)
+    return round(round(lat / grid) * grid, 4), round(round(lon / grid) * grid, 4)
+
+
+def parse_weather(data):
+    """Reduce an Open-Meteo forecast to the fields the digest uses"""
+    current = data.get("current_weather", {})
+    daily = data.get("daily", {})
+
+    feels_like = (
+        daily.get("apparent_temperature_max", [current.get("temperature")])[0] +
+        daily.get("apparent_temperature_min", [current.get("temperature")])[0]
+    ) / 2
+
+    return {
+        "max": daily.get("temperature_2m_max", [0])[0],
+        "min": daily.get("temperature_2m_min", [0])[0],
+        "feels_like": round(feels_like, 1),
+        "sunrise": daily.get("sunrise", ["06:00"])[0].split("T")[1],
+        "sunset": daily.get("sunset", ["18:00"])[0].split("T")[1],
+        "uv_index": daily.get("uv_index_max", [0])[0]
+    }
+
+
+def _read_entries(path):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+class WeatherCache:
+    """
+    Grid-keyed forecasts with an expiry, persisted between runs.
+
+    A shard's cache is given the main cache as `shared_path`: it starts
+    from those forecasts but only writes its own file, which
+    merge_shards.py folds back in.
+    """
+
+    def __init__(self, path=WEATHER_CACHE_FILE, ttl=WEATHER_TTL, grid=WEATHER_GRID, shared_path=None):
+        self.path = path
+        self.shared_path = shared_path if shared_path != path else None
+        self.ttl = ttl
+        self.grid = grid
+        self.dirty = False
+        self.hits = 0
+        self.misses = 0
+        self._entries = None
+
+    @property
+    def entries(self):
+        """Forecasts still within the TTL, read from disk on first use"""
+        if self._entries is None:
+            entries = _read_entries(self.shared_path) if self.shared_path else {}
+            entries.update(_read_entries(self.path))
+
+            now = time.time()
+            self._entries = {
+                key: entry for key, entry in entries.items()
+                if now - entry.get("fetched_at", 0) < self.ttl
+            }
+            self.dirty = len(self._entries) != len(entries)
+        return self._entries
+
+    def key(self, lat, lon):
+        lat, lon = snap(lat, lon, self.grid)
+        return f"{lat},{lon}"
+
+    def fresh(self, lat, lon):
+        """The cell's entry if it is still within the TTL, else None"""
+        entry = self.entries.get(self.key(lat, lon))
+        if entry and time.time() - entry["fetched_at"] < self.ttl:
+            return entry
+        return None
+
+    def get(self, lat, lon):
+        entry = self.fresh(lat, lon)
+        if entry:
+            self.hits += 1
+            return entry["data"]
+        self.misses += 1
+        return None
+
+    def put(self, lat, lon, weather):
+        self.entries[self.key(lat, lon)] = {"fetched_at": time.time(), "data": weather}
+        self.dirty = True
+
+    def save(self):
+        if self._entries is None or not self.dirty:
+            return
+        try:
+            # Write-then-rename, so a kill mid-write never leaves a torn file
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(self.entries, f, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+            self.dirty = False
+        except Exception as e:
+            print(f"⚠️ Failed to save weather cache: {e}")
+
+    def merge(self, path):
+        """Fold another cache file (e.g. one shard's) in; the newer forecast per cell wins"""
+        merged = 0
+        for key, entry in _read_entries(path).items():
+            current = self.entries.get(key)
+            if current is None or entry.get("fetched_at", 0) > current.get("fetched_at", 0):
+                self.entries[key] = entry
+                self.dirty = True
+                merged += 1
+        return merged
+
+
+def _request_forecasts(params, expected):
+    response = requests.get(FORECAST_URL, params=params, timeout=15)
+    if response.status_code == 429:
+        raise Throttled("Open-Meteo 429", parse_retry_after(response.headers.get("Retry-After")))
+    data = response.json()
+    # A single coordinate comes back as an object, several as a list
+    results = data if isinstance(data, list) else [data]
+    if len(results) != expected:
+        raise ValueError(f"expected {expected} forecasts, got {len(results)}")
+    # Fail here (and retry) rather than caching a half-parsed error body
+    for result in results:
+        parse_weather(result)
+    return results
+
+
+@metrics.timed("weather_batch")
+def fetch_weather_batch(coords, cache, max_retries=3, batch_size=WEATHER_BATCH_SIZE):
+    """
+    Fetch forecasts for many coordinates in a few multi-coordinate requests.
+    Coordinates are snapped to the cache grid and de-duplicated first; cells
+    with a forecast still within the TTL are not requested (expired ones
+    are, so a long-lived process keeps refreshing them). Returns the number of
+    forecasts fetched.
+    """
+    cells = []
+    seen = set()
+    for lat, lon in coords:
+        cell = snap(lat, lon, cache.grid)
+        if cell in seen or cache.fresh(*cell):
+            continue
+        seen.add(cell)
+        cells.append(cell)
+
+    fetched = 0
+    for start in range(0, len(cells), batch_size):
+        chunk = cells[start:start + batch_size]
+        params = dict(FORECAST_PARAMS)
+        params["latitude"] = ",".join(str(lat) for lat, _ in chunk)
+        params["longitude"] = ",".join(str(lon) for _, lon in chunk)
+
+        try:
+            results = limiter.call(
+                "open_meteo", _request_forecasts, params, len(chunk),
+                max_retries=max_retries - 1, retry_on=(Exception,)
+            )
+        except Exception as e:
+            print(f"         ❌ Weather batch failed ({len(chunk)} locations): {e}")
+            continue
+
+        for (lat, lon), result in zip(chunk, results):
+            cache.put(lat, lon, parse_weather(result))
+        fetched += len(chunk)
+
+    cache.save()
+    return fetched